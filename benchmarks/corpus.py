@@ -0,0 +1,90 @@
+"""
+Fixed benchmark corpus of worksheet sentences.
+
+Sentences are built from templates and inflected word forms with a seeded
+random generator, so every run sees the same few thousand sentences without
+shipping them as data. Each entry is (word, sentence, masked), where masked
+blanks the inflected form the way LexiGen's masking does.
+"""
+import random
+
+# Everyday vocabulary with the forms a sentence may use
+WORD_FORMS = [
+    ("apple", ["apple", "apples"]),
+    ("borrow", ["borrow", "borrows", "borrowed", "borrowing"]),
+    ("careful", ["careful", "carefully"]),
+    ("decide", ["decide", "decides", "decided", "deciding", "decision"]),
+    ("eager", ["eager", "eagerly"]),
+    ("forget", ["forget", "forgets", "forgot", "forgotten", "forgetting"]),
+    ("gentle", ["gentle", "gently"]),
+    ("hurry", ["hurry", "hurries", "hurried", "hurrying"]),
+    ("imagine", ["imagine", "imagined", "imagination"]),
+    ("journey", ["journey", "journeys"]),
+    ("kindness", ["kindness"]),
+    ("listen", ["listen", "listens", "listened", "listening"]),
+    ("measure", ["measure", "measured", "measurement"]),
+    ("notice", ["notice", "noticed", "noticing"]),
+    ("ordinary", ["ordinary"]),
+    ("patient", ["patient", "patiently", "patience"]),
+    ("quiet", ["quiet", "quietly"]),
+    ("remember", ["remember", "remembers", "remembered"]),
+    ("suggest", ["suggest", "suggested", "suggestion"]),
+    ("travel", ["travel", "travels", "travelled", "traveling"]),
+    ("useful", ["useful"]),
+    ("visit", ["visit", "visits", "visited", "visiting"]),
+    ("wonder", ["wonder", "wondered", "wonderful"]),
+    ("yellow", ["yellow"]),
+    ("arrive", ["arrive", "arrived", "arrival"]),
+    ("believe", ["believe", "believed", "belief"]),
+    ("celebrate", ["celebrate", "celebrated", "celebration"]),
+    ("discover", ["discover", "discovered", "discovery"]),
+    ("explain", ["explain", "explained", "explanation"]),
+    ("famous", ["famous"]),
+    ("gather", ["gather", "gathered", "gathering"]),
+    ("honest", ["honest", "honestly", "honesty"]),
+    ("improve", ["improve", "improved", "improvement"]),
+    ("juggle", ["juggle", "juggled", "juggling"]),
+    ("knowledge", ["knowledge"]),
+    ("laugh", ["laugh", "laughed", "laughing", "laughter"]),
+    ("mistake", ["mistake", "mistakes"]),
+    ("neighbor", ["neighbor", "neighbors"]),
+    ("offer", ["offer", "offered", "offering"]),
+    ("prepare", ["prepare", "prepared", "preparing", "preparation"])
+]
+
+BENCHMARK_WORDS = [word for word, _ in WORD_FORMS]
+
+SENTENCE_TEMPLATES = [
+    "The children {form} in the garden before lunch.",
+    "My grandmother always said that {form} matters more than money.",
+    "\"{form}!\" shouted the coach as the team ran onto the field.",
+    "We talked about {form} during the long drive to the coast.",
+    "Nobody expected the {form} to change the whole town.",
+    "After the storm, they {form} near the old bridge, hoping for news.",
+    "Is it {form} to leave the window open at night?",
+    "She wrote {form} in her notebook, then underlined it twice.",
+    "The museum guide explained the {form} to a group of curious students.",
+    "Although it was late, he {form} the letter and smiled."
+]
+
+# A little extra text so sentences vary in length like real model output
+SENTENCE_TAILS = [
+    "",
+    " Everyone agreed it was the best day of the year.",
+    " It took a while, but in the end it was worth it.",
+    " The teacher wrote the date on the board."
+]
+
+def blank(form):
+    return form[0] + "_" * (len(form) - 1)
+
+def get_corpus(count=3000, seed=0):
+    """Return count (word, sentence, masked) entries; the same count and seed give the same corpus."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        word, forms = rng.choice(WORD_FORMS)
+        form = rng.choice(forms)
+        template = rng.choice(SENTENCE_TEMPLATES) + rng.choice(SENTENCE_TAILS)
+        corpus.append((word, template.format(form=form), template.format(form=blank(form))))
+    return corpus
@@ -0,0 +1,103 @@
+"""
+Stand-in for llama_cpp.Llama, for benchmarking the local-model path without a GGUF file.
+
+FakeLlama implements the parts of the llama_cpp API that APIService uses:
+completions (streamed or not) with usage, tokenize/eval/reset for prefix
+reuse, and save_state/load_state. Decoding time is simulated per token.
+"""
+import time
+from benchmarks.ollama_simulator import SentenceGenerator
+
+class FakeLlamaState:
+    """Saved KV state; only its size matters to APIService."""
+
+    def __init__(self, tokens, bytes_per_token=4096):
+        self.tokens = list(tokens)
+        self.llama_state_size = len(self.tokens) * bytes_per_token
+
+class FakeLlama:
+    """
+    Imitates llama_cpp.Llama(model_path=..., **options).
+
+    prompt_seconds_per_token and seconds_per_token set how long prompt
+    evaluation and decoding take; tokens of the prompt already in the
+    evaluated state are not evaluated again, like llama_cpp's prefix matching.
+    """
+
+    # Simulated timings, overridable by benchmarks before the model is loaded
+    load_seconds = 0.0
+    prompt_seconds_per_token = 0.0002
+    seconds_per_token = 0.002
+    invalid_rate = 0.0
+
+    def __init__(self, model_path, n_ctx=2048, **options):
+        self.model_path = model_path
+        self._n_ctx = n_ctx
+        self.options = options
+        self._evaluated = []
+        # Sentences come from the same generator as the Ollama simulator
+        self._generator = SentenceGenerator(invalid_rate=self.invalid_rate, seed=0)
+        time.sleep(self.load_seconds)
+
+    def n_ctx(self):
+        return self._n_ctx
+
+    def tokenize(self, text, add_bos=True, special=False):
+        # One token per whitespace-separated word is close enough for timing
+        return [hash(word) & 0xFFFF for word in text.decode("utf-8", errors="replace").split()]
+
+    def reset(self):
+        self._evaluated = []
+
+    def eval(self, tokens):
+        time.sleep(self.prompt_seconds_per_token * len(tokens))
+        self._evaluated.extend(tokens)
+
+    def save_state(self):
+        return FakeLlamaState(self._evaluated)
+
+    def load_state(self, state):
+        self._evaluated = list(state.tokens)
+
+    def _evaluate_prompt(self, prompt):
+        tokens = self.tokenize(prompt.encode("utf-8"))
+        shared = 0
+        for evaluated, token in zip(self._evaluated, tokens):
+            if evaluated != token:
+                break
+            shared += 1
+        time.sleep(self.prompt_seconds_per_token * (len(tokens) - shared))
+        self._evaluated = tokens
+        return len(tokens)
+
+    def __call__(self, prompt, max_tokens=128, stream=False, echo=False, stopping_criteria=None,
+                 grammar=None, **options):
+        prompt_tokens = self._evaluate_prompt(prompt)
+        text = self._generator.complete(prompt, json_format=grammar is not None)
+        pieces = text.split(" ")[:max_tokens]
+        pieces = [piece + " " for piece in pieces[:-1]] + pieces[-1:]
+
+        if stream:
+            return self._stream(pieces, stopping_criteria)
+
+        generated = []
+        for piece in pieces:
+            if stopping_criteria is not None and any(criterion(None, None) for criterion in stopping_criteria):
+                break
+            time.sleep(self.seconds_per_token)
+            generated.append(piece)
+        return {
+            "choices": [{"text": "".join(generated), "index": 0, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(generated),
+                "total_tokens": prompt_tokens + len(generated)
+            }
+        }
+
+    def _stream(self, pieces, stopping_criteria):
+        for piece in pieces:
+            if stopping_criteria is not None and any(criterion(None, None) for criterion in stopping_criteria):
+                return
+            time.sleep(self.seconds_per_token)
+            yield {"choices": [{"text": piece, "index": 0, "finish_reason": None}]}
@@ -0,0 +1,247 @@
+"""
+Microbenchmarks for the per-token text processing behind masking and export.
+
+Times stemming, lemmatizing, word matching, masking and answer-key extraction
+over the fixed corpus in benchmarks/corpus.py, and compares each stage with
+the baseline stored in benchmarks/baselines.json. Exits with status 1 if any
+stage got slower than its baseline by more than its tolerance, could not run
+for lack of NLTK data, or has no baseline yet.
+
+    python -m benchmarks.microbench                      # compare with the baselines
+    python -m benchmarks.microbench --update-baselines   # record new baselines
+
+Baselines are per sentence, so smaller corpora (--sentences) can still be
+compared. They depend on the machine; record them on the machine that checks them.
+--update-baselines times the stages in several separate processes and records,
+with each stage's baseline, a tolerance at least twice as wide as the spread
+between them, so run-to-run noise alone does not fail the gate.
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import statistics
+import subprocess
+import nltk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.word_processor import WordProcessor
+from models.worksheet import create_masked_sentence, extract_blanked_words
+from benchmarks.corpus import get_corpus
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_TOLERANCE = 0.25
+# Sentence tokenizer parameters word_tokenize loads for the masking stage
+PUNKT_RESOURCE = "tokenizers/punkt_tab/english"
+PUNKT_STAGES = {"mask"}
+# Shortest timed run; fast stages loop over the corpus until they take this long
+MIN_RUN_SECONDS = 0.2
+# Separate processes --update-baselines times each stage in; noise between
+# processes is larger than between runs in one process
+BASELINE_PROCESSES = 3
+# A recorded tolerance is at least this many times the spread between those processes
+SPREAD_MULTIPLE = 2
+
+def get_stages(word_processor):
+    """Return (name, function) pairs; each function processes the whole corpus once."""
+    def stem(corpus):
+        for _, sentence, _ in corpus:
+            for token in sentence.split():
+                word_processor.get_word_stem(token.lower())
+
+    def lemmatize(corpus):
+        for _, sentence, _ in corpus:
+            for token in sentence.split():
+                word_processor.get_word_derivatives(token.lower())
+
+    def match(corpus):
+        for word, sentence, _ in corpus:
+            for token in sentence.split():
+                word_processor.is_word_match(token, word)
+
+    def mask(corpus):
+        for word, sentence, _ in corpus:
+            create_masked_sentence(word_processor, word, sentence)
+
+    def answer_key(corpus):
+        for _, sentence, masked in corpus:
+            extract_blanked_words(sentence, masked)
+
+    return [("stem", stem), ("lemmatize", lemmatize), ("match", match), ("mask", mask),
+            ("answer_key", answer_key)]
+
+def time_stage(function, corpus, repeat):
+    """
+    Return the seconds per sentence of each of repeat runs.
+
+    A run passes over the corpus as many times as it takes to last
+    MIN_RUN_SECONDS, so fast stages are not timed in the clock's noise.
+    """
+    started = time.perf_counter()
+    function(corpus)
+    loops = max(1, math.ceil(MIN_RUN_SECONDS / (time.perf_counter() - started)))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            function(corpus)
+        timings.append((time.perf_counter() - started) / (loops * len(corpus)))
+    return timings
+
+def get_spread(timings):
+    """Return how far apart the fastest and slowest timings are, relative to their median."""
+    return (max(timings) - min(timings)) / statistics.median(timings)
+
+def has_punkt_params():
+    """Return True if the Punkt data is installed and not an empty placeholder."""
+    try:
+        path = nltk.data.find(PUNKT_RESOURCE)
+    except LookupError:
+        return False
+    # Empty parameter files tokenize without abbreviations, which times differently
+    return any(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def run_in_processes(sentences, repeat, stage_names, processes=BASELINE_PROCESSES):
+    """
+    Time the stages in separate interpreter processes, one after another.
+
+    Returns {name: median seconds per sentence of each process}, None for
+    stages that cannot run.
+    """
+    command = [sys.executable, "-m", "benchmarks.microbench", "--timings-json",
+               "--sentences", str(sentences), "--repeat", str(repeat)]
+    for name in stage_names or ():
+        command += ["--stage", name]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    medians = {}
+    for _ in range(processes):
+        output = subprocess.run(command, cwd=root, check=True, capture_output=True, text=True).stdout
+        for name, timings in json.loads(output).items():
+            if timings is None:
+                medians[name] = None
+            elif name not in medians or medians[name] is not None:
+                medians.setdefault(name, []).append(statistics.median(timings))
+    return medians
+
+def save_baselines(results, tolerance, sentences, path=BASELINES_PATH):
+    """Record the median of each stage's timings and a tolerance at least SPREAD_MULTIPLE times their spread."""
+    baselines = load_baselines(path)
+    stages = baselines.get("stages", {})
+    tolerances = baselines.get("tolerances", {})
+    # Stages that could not run keep their previous baseline
+    for name, timings in results.items():
+        if timings is None:
+            continue
+        stages[name] = round(statistics.median(timings), 9)
+        tolerances[name] = round(max(tolerance, SPREAD_MULTIPLE * get_spread(timings)), 2)
+    data = {"tolerance": tolerance, "sentences": sentences, "stages": stages, "tolerances": tolerances}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def run(sentences=3000, repeat=5, stage_names=None):
+    """Time every stage and return {name: seconds per sentence of each run}, None for stages that cannot run."""
+    corpus = get_corpus(sentences)
+    word_processor = WordProcessor("English")
+    punkt_usable = has_punkt_params()
+    results = {}
+    for name, function in get_stages(word_processor):
+        if stage_names and name not in stage_names:
+            continue
+        if name in PUNKT_STAGES and not punkt_usable:
+            results[name] = None
+            continue
+        try:
+            # Warm up lazy NLTK loading so it is not charged to the first run
+            function(corpus[:10])
+        except LookupError:
+            # The NLTK data the stage needs is not installed
+            results[name] = None
+            continue
+        results[name] = time_stage(function, corpus, repeat)
+    return results
+
+def compare(results, baselines, tolerance=None):
+    """
+    Return report lines and whether every stage's median is within tolerance of its baseline.
+
+    tolerance overrides the per-stage tolerances of the baselines file. A stage
+    that could not run or has no baseline fails the comparison too, since the
+    gate would otherwise pass without checking it.
+    """
+    stages = baselines.get("stages", {})
+    tolerances = baselines.get("tolerances", {})
+    default_tolerance = baselines.get("tolerance", DEFAULT_TOLERANCE)
+    lines = []
+    passed = True
+    for name, timings in results.items():
+        baseline = stages.get(name)
+        if timings is None:
+            lines.append(f"{name:<12} SKIPPED (missing NLTK data)")
+            passed = False
+            continue
+        seconds = statistics.median(timings)
+        line = f"{name:<12} {seconds * 1e6:10.1f} us/sentence  spread {get_spread(timings):6.1%}"
+        if baseline:
+            allowed = tolerance if tolerance is not None else tolerances.get(name, default_tolerance)
+            change = seconds / baseline - 1
+            status = "ok"
+            if change > allowed:
+                status = "SLOWER"
+                passed = False
+            line += f"  baseline {baseline * 1e6:10.1f}  {change:+7.1%} of {allowed:.0%}  {status}"
+        else:
+            line += "  NO BASELINE"
+            passed = False
+        lines.append(line)
+    return lines, passed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark masking and answer-key extraction.")
+    parser.add_argument("--sentences", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage; the median is compared")
+    parser.add_argument("--stage", action="append", help="only run this stage (repeatable)")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help=f"allowed slowdown for every stage, e.g. 0.25 for 25%% (default: each stage's "
+                             f"tolerance from the baselines file, else {DEFAULT_TOLERANCE}); with "
+                             f"--update-baselines, the smallest tolerance to record")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--update-baselines", action="store_true",
+                        help=f"record new baselines from {BASELINE_PROCESSES} separate processes")
+    parser.add_argument("--timings-json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.timings_json:
+        # One of the processes --update-baselines times the stages in
+        print(json.dumps(run(args.sentences, args.repeat, args.stage)))
+        return 0
+
+    baselines = load_baselines(args.baselines)
+    if args.update_baselines:
+        results = run_in_processes(args.sentences, args.repeat, args.stage)
+        minimum = args.tolerance if args.tolerance is not None else baselines.get("tolerance", DEFAULT_TOLERANCE)
+        save_baselines(results, minimum, args.sentences, args.baselines)
+        baselines = load_baselines(args.baselines)
+        lines, passed = compare(results, baselines)
+    else:
+        results = run(args.sentences, args.repeat, args.stage)
+        lines, passed = compare(results, baselines, args.tolerance)
+    print("\n".join(lines))
+    if not passed:
+        print("Failed: at least one stage was skipped, has no baseline or is slower than its baseline "
+              "by more than its tolerance.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
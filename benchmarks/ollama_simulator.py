@@ -0,0 +1,272 @@
+"""
+Local stand-in for an Ollama server, for benchmarks and offline development.
+
+Speaks the parts of the Ollama API that LexiGen uses: /api/generate
+(streamed or not, with format "json" for batched prompts), /api/version and
+/api/tags. Latency, decoding speed, parallelism and failures are configurable,
+so throughput can be measured without a GPU.
+
+Run it on its own with:
+
+    python -m benchmarks.ollama_simulator --port 11434 --latency 0.2 --failure-rate 0.05
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SIMULATOR_VERSION = "0.0.0-simulator"
+
+# Sentences returned when no canned outputs are given; {word} is the requested word
+DEFAULT_OUTPUTS = [
+    "The teacher asked us to use the word {word} in a sentence.",
+    "She wrote {word} on the board before the lesson began.",
+    "Nobody in the class could explain what {word} meant.",
+    "He looked up {word} in the dictionary after dinner."
+]
+
+# Words are quoted in LexiGen's prompts, e.g. "... the word 'apple' ..."
+QUOTED_WORD_PATTERN = re.compile(r"'([^']+)'")
+# Batched prompts list one numbered task per word
+BATCH_TASK_PATTERN = re.compile(r"^\d+\. .*?'([^']*)'", re.M)
+
+class SentenceGenerator:
+    """Canned model output: a sentence for the word quoted in a prompt, or a JSON batch."""
+
+    def __init__(self, outputs=None, invalid_rate=0.0, seed=None):
+        self.outputs = outputs or DEFAULT_OUTPUTS
+        self.invalid_rate = invalid_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, json_format=False):
+        """Return the text the simulated model generates for prompt."""
+        if json_format:
+            words = BATCH_TASK_PATTERN.findall(prompt)
+            return json.dumps({"sentences": [{"word": word, "sentence": self.sentence(word)} for word in words]})
+        match = QUOTED_WORD_PATTERN.search(prompt)
+        return self.sentence(match.group(1) if match else "word")
+
+    def sentence(self, word):
+        with self._lock:
+            template = self._random.choice(self.outputs)
+            invalid = self._random.random() < self.invalid_rate
+        if invalid:
+            # A sentence without the word fails LexiGen's stem check and triggers a retry
+            return template.replace("{word}", "it")
+        return template.format(word=word)
+
+class OllamaSimulator:
+    """
+    Threaded HTTP server that answers like Ollama.
+
+    latency is the mean time to first token in seconds and jitter the standard
+    deviation around it; tokens_per_second sets decoding speed. At most
+    max_parallel requests are decoded at once and the rest queue, like
+    OLLAMA_NUM_PARALLEL; with max_queue set, requests beyond it get a 503.
+    failure_rate is the share of requests answered with a 500 error, and
+    invalid_rate the share of sentences that leave out the requested word.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.05, jitter=0.0, tokens_per_second=200.0,
+                 max_parallel=4, max_queue=None, failure_rate=0.0, invalid_rate=0.0, outputs=None,
+                 models=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.max_parallel = max_parallel
+        self.max_queue = max_queue
+        self.failure_rate = failure_rate
+        self.generator = SentenceGenerator(outputs, invalid_rate, seed)
+        self.models = models or [{
+            "name": "simulator:latest",
+            "size": 2019393189,
+            "details": {"family": "llama", "parameter_size": "3.2B", "quantization_level": "Q4_K_M"}
+        }]
+        self.stats = {"requests": 0, "failures": 0, "rejected": 0, "max_waiting": 0}
+        self._random = random.Random(seed)
+        self._slots = threading.Semaphore(max_parallel)
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    def start(self):
+        """Serve on a background thread and return self."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ollama-simulator")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def draw_failure(self):
+        """Decide whether the current request fails, and count it if so."""
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.stats["failures"] += 1
+            return failed
+
+    def get_latency(self):
+        with self._lock:
+            latency = self._random.gauss(self.latency, self.jitter) if self.jitter else self.latency
+        return max(0.0, latency)
+
+    def acquire_slot(self):
+        """Wait for a decoding slot; return False if the queue is full."""
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.max_queue is not None and self._waiting >= self.max_queue:
+                self.stats["rejected"] += 1
+                return False
+            self._waiting += 1
+            self.stats["max_waiting"] = max(self.stats["max_waiting"], self._waiting)
+        self._slots.acquire()
+        with self._lock:
+            self._waiting -= 1
+        return True
+
+    def release_slot(self):
+        self._slots.release()
+
+def _make_handler(simulator):
+    class OllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, obj, status=200):
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_chunk(self, obj):
+            line = (json.dumps(obj) + "\n").encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.endswith("/version"):
+                self._send_json({"version": SIMULATOR_VERSION})
+            elif self.path.endswith("/tags"):
+                self._send_json({"models": simulator.models})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json({"error": "invalid JSON"}, 400)
+                return
+            if not self.path.endswith("/generate"):
+                self._send_json({"error": "not found"}, 404)
+                return
+
+            if not simulator.acquire_slot():
+                self._send_json({"error": "server busy"}, 503)
+                return
+            try:
+                self._generate(request)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client cancelled the request
+                pass
+            finally:
+                simulator.release_slot()
+
+        def _generate(self, request):
+            started = time.perf_counter()
+            time.sleep(simulator.get_latency())
+            if simulator.draw_failure():
+                self._send_json({"error": "simulated failure"}, 500)
+                return
+
+            prompt = request.get("prompt", "")
+            text = simulator.generator.complete(prompt, json_format=request.get("format") == "json")
+            tokens = text.split(" ")
+            token_delay = 1.0 / simulator.tokens_per_second if simulator.tokens_per_second else 0.0
+            if not prompt:
+                # A request without a prompt only loads the model
+                tokens = []
+
+            def final(eval_started):
+                return {
+                    "model": request.get("model"),
+                    "response": "",
+                    "done": True,
+                    "prompt_eval_count": len(prompt.split()),
+                    "eval_count": len(tokens),
+                    "eval_duration": int((time.perf_counter() - eval_started) * 1e9),
+                    "load_duration": 0,
+                    "total_duration": int((time.perf_counter() - started) * 1e9)
+                }
+
+            eval_started = time.perf_counter()
+            if request.get("stream", True):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for index, token in enumerate(tokens):
+                    time.sleep(token_delay)
+                    piece = token if index == len(tokens) - 1 else token + " "
+                    self._send_chunk({"model": request.get("model"), "response": piece, "done": False})
+                self._send_chunk(final(eval_started))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            else:
+                time.sleep(token_delay * len(tokens))
+                result = final(eval_started)
+                result["response"] = " ".join(tokens)
+                self._send_json(result)
+
+    return OllamaHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a simulated Ollama server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--max-parallel", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=None)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    simulator = OllamaSimulator(args.host, args.port, args.latency, args.jitter, args.tokens_per_second,
+                                args.max_parallel, args.max_queue, args.failure_rate, args.invalid_rate,
+                                seed=args.seed)
+    print(f"Simulated Ollama listening on {simulator.url}")
+    try:
+        simulator.start()._thread.join()
+    except KeyboardInterrupt:
+        simulator.stop()
+
+if __name__ == "__main__":
+    main()
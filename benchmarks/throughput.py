@@ -0,0 +1,184 @@
+"""
+End-to-end throughput benchmark for worksheet generation.
+
+Drives the real APIService and GenerationService against the Ollama simulator
+(or FakeLlama for the local-model path), then masks every sentence and builds
+and saves the docx the way Export does. Reports words/s, p50/p95 latency,
+retries and the time spent in each stage.
+
+    python -m benchmarks.throughput --words 200 --latency 0.3 --jitter 0.1 --failure-rate 0.02
+    python -m benchmarks.throughput --backend local --words 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# Run from a checkout: make the application packages importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.config import DEFAULT_CONFIG
+from models.word_processor import WordProcessor
+from models.worksheet import create_masked_sentence, build_worksheet
+from services.settings_service import SettingsService
+from services.generation_service import GenerationService
+from services.metrics_service import METRIC_CALL, METRIC_SENTENCE, percentile
+import services.api_service as api_module
+from benchmarks.ollama_simulator import OllamaSimulator
+from benchmarks.fake_llama import FakeLlama
+from benchmarks.corpus import BENCHMARK_WORDS
+
+def get_words(count):
+    """Return count benchmark words, cycling through the corpus vocabulary."""
+    return [BENCHMARK_WORDS[i % len(BENCHMARK_WORDS)] for i in range(count)]
+
+def create_settings(args, config_path):
+    """Defaults plus the benchmark's overrides; nothing is read from or saved to the user's settings."""
+    settings_service = SettingsService(config_path)
+    settings_service.settings.update({
+        "response_cache_enabled": False,
+        "prefetch_enabled": False,
+        "warm_up_model": False,
+        "stream_generation": not args.no_stream,
+        "max_concurrent_requests": args.concurrency,
+        "adaptive_concurrency": args.adaptive,
+        "batch_prompt_size": args.batch_prompt_size,
+        "parallel_candidates": args.parallel_candidates,
+        "hedge_requests": args.hedge
+    })
+    return settings_service
+
+def create_api_service(args, settings_service, simulator_url):
+    api_service = api_module.APIService("English", simulator_url, settings_service, WordProcessor("English"))
+    if args.backend == "local":
+        # The benchmark's own backend: FakeLlama takes the place of llama_cpp.Llama
+        FakeLlama.seconds_per_token = 1.0 / args.tokens_per_second
+        FakeLlama.invalid_rate = args.invalid_rate
+        api_module.Llama = FakeLlama
+        api_module.LLAMA_CPP_AVAILABLE = True
+        api_service.api_url = "models"
+        api_service.model = "benchmark.gguf"
+        api_service.using_local_model = True
+        api_service.load_local_model_async(api_service.model_catalog.get_path(api_service.model)).result()
+    else:
+        api_service.model = "simulator:latest"
+        api_service.select_remote_backend()
+    api_service.server_connected = True
+    return api_service
+
+def run_benchmark(args):
+    """Run one benchmark and return its report as a dict."""
+    simulator = None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.backend == "remote":
+            simulator = OllamaSimulator(latency=args.latency, jitter=args.jitter,
+                                        tokens_per_second=args.tokens_per_second, max_parallel=args.max_parallel,
+                                        failure_rate=args.failure_rate, invalid_rate=args.invalid_rate,
+                                        seed=args.seed).start()
+        settings_service = create_settings(args, os.path.join(temp_dir, "settings.yaml"))
+        api_service = create_api_service(args, settings_service, simulator.url if simulator else None)
+        generation_service = GenerationService(api_service, settings_service)
+        words = get_words(args.words)
+        prompt_template = DEFAULT_CONFIG["generation_prompt"]
+
+        try:
+            stages = {}
+            started = time.perf_counter()
+            on_partial = (lambda index, text: None) if not args.no_stream else None
+            results = generation_service.generate_batch(words, prompt_template, on_partial=on_partial)
+            stages["generate"] = time.perf_counter() - started
+
+            sentences = [(word, sentence) for word, sentence, error in results if sentence]
+            if not args.no_export:
+                started = time.perf_counter()
+                masked = [create_masked_sentence(api_service.word_processor, word, sentence)
+                          for word, sentence in sentences]
+                stages["mask"] = time.perf_counter() - started
+
+                started = time.perf_counter()
+                entries = [(masked_sentence, sentence, word, None)
+                           for masked_sentence, (word, sentence) in zip(masked, sentences)]
+                document = build_worksheet("Benchmark", entries)
+                stages["build_docx"] = time.perf_counter() - started
+
+                started = time.perf_counter()
+                document.save(os.path.join(temp_dir, "benchmark.docx"))
+                stages["save_docx"] = time.perf_counter() - started
+        finally:
+            api_service.close()
+            if simulator:
+                simulator.stop()
+
+    sentence_records = api_service.metrics.get_records(METRIC_SENTENCE)
+    call_records = api_service.metrics.get_records(METRIC_CALL)
+    sentence_latencies = [record["latency"] for record in sentence_records]
+    call_latencies = [record["latency"] for record in call_records]
+    report = {
+        "backend": args.backend,
+        "words": len(words),
+        "succeeded": len(sentences),
+        "failed": len(words) - len(sentences),
+        "words_per_second": len(words) / stages["generate"] if stages["generate"] else None,
+        "word_latency_p50": percentile(sentence_latencies, 50),
+        "word_latency_p95": percentile(sentence_latencies, 95),
+        "call_latency_p50": percentile(call_latencies, 50),
+        "call_latency_p95": percentile(call_latencies, 95),
+        "calls": len(call_records),
+        "validation_retries": sum(record["retries"] for record in sentence_records),
+        "failover_retries": sum(record["retries"] for record in call_records),
+        "invalid_words": sum(1 for record in sentence_records if not record["valid"]),
+        "stages": stages
+    }
+    if simulator:
+        report["simulator"] = dict(simulator.stats)
+    return report
+
+def format_report(report):
+    def seconds(value):
+        return f"{value * 1000:.0f} ms" if value is not None else "-"
+
+    lines = [
+        f"backend            {report['backend']}",
+        f"words              {report['words']} ({report['succeeded']} ok, {report['failed']} failed)",
+        f"throughput         {report['words_per_second']:.1f} words/s",
+        f"word latency       p50 {seconds(report['word_latency_p50'])}, p95 {seconds(report['word_latency_p95'])}",
+        f"call latency       p50 {seconds(report['call_latency_p50'])}, p95 {seconds(report['call_latency_p95'])}",
+        f"backend calls      {report['calls']}",
+        f"retries            {report['validation_retries']} validation, {report['failover_retries']} failover",
+    ]
+    for stage, duration in report["stages"].items():
+        lines.append(f"{stage:<19}{seconds(duration)}")
+    if "simulator" in report:
+        lines.append(f"simulator          {report['simulator']}")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end worksheet generation.")
+    parser.add_argument("--backend", choices=["remote", "local"], default="remote")
+    parser.add_argument("--words", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--max-parallel", type=int, default=4, help="requests the simulator decodes at once")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONFIG["max_concurrent_requests"])
+    parser.add_argument("--adaptive", action="store_true", help="use the adaptive concurrency limit")
+    parser.add_argument("--batch-prompt-size", type=int, default=0)
+    parser.add_argument("--parallel-candidates", type=int, default=1)
+    parser.add_argument("--hedge", action="store_true")
+    parser.add_argument("--no-stream", action="store_true")
+    parser.add_argument("--no-export", action="store_true", help="skip masking and docx export")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from models.config import VERSION
 from tkinter import messagebox
 from models.translations import get_translation, load_translations
 import traceback
+import logging
 import os
 import sys
 
@@ -42,6 +43,7 @@ if libllama_path:
     os.environ['LLAMA_CPP_LIB'] = libllama_path
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     try:
         root = tk.Tk()
         app = MainWindow(root)
@@ -13,7 +13,50 @@ DEFAULT_CONFIG = {
     "context_attachment_prompt": "Complete the generation task with the context: \n{context}\nGeneration task:\n",
     "analysis_prompt": "Analyze the grammatical usage of '{word}' in this sentence: '{sentence}'\nFocus on:\n1. Tense (e.g., Present Simple, Past Perfect)\n2. Voice (Active/Passive)\n3. Mood (Indicative/Subjunctive)\n4. Function (e.g., Subject, Object, Modifier)\n\nKeep the analysis concise and technical. Output in 1 line. Example format:\n\"Present Simple, Active Voice. Functions as the subject of the sentence.\" ",
     "analysis_tense_prompt": "Analyze the grammatical usage of '{word}' in this sentence: '{sentence}', hint: this sentence used {tense} tense.\nFocus on:\n1. Tense (e.g., Present Simple, Past Perfect)\n2. Voice (Active/Passive)\n3. Mood (Indicative/Subjunctive)\n4. Function (e.g., Subject, Object, Modifier)\n\nKeep the analysis concise and technical. Output in 1 line. Example format:\n\"Present Simple, Active Voice. Functions as the subject of the sentence.\" ",
-    "tense_prompt": "Create a simple sentence using the word '{word}' using {tense} tense. The sentence should be clear and educational."
+    "tense_prompt": "Create a simple sentence using the word '{word}' using {tense} tense. The sentence should be clear and educational.",
+    "batch_generation_prompt": "Complete each numbered task below. Each task asks for exactly one sentence.\n{tasks}\n\nRespond only with JSON of the form {{\"sentences\": [{{\"word\": \"<word>\", \"sentence\": \"<sentence>\"}}]}}, with one entry per task in the same order.",
+    "max_concurrent_requests": 4,
+    "api_endpoints": [],
+    "endpoint_dispatch": "least_loaded",
+    "adaptive_concurrency": True,
+    "adaptive_concurrency_max": 16,
+    "http_pool_size": 8,
+    "http_connect_timeout": 5,
+    "http_read_timeout": 300,
+    "batch_timeout": 900,
+    "stream_generation": True,
+    "warm_up_model": True,
+    "ollama_keep_alive": "30m",
+    "response_cache_enabled": True,
+    "response_cache_max_mb": 32,
+    "prefetch_enabled": True,
+    "prefetch_depth": 2,
+    "prefetch_max_kb": 256,
+    "batch_prompt_size": 0,
+    "parallel_candidates": 1,
+    "hedge_requests": False,
+    "hedge_percentile": 95,
+    "local_prefix_cache_states": 4,
+    "local_prefix_cache_mb": 512,
+    "local_prefix_cache_min_tokens": 256,
+    "local_model_defaults": {
+        "n_ctx": 2048,
+        "n_threads": None,
+        "n_batch": 512,
+        "use_mmap": True,
+        "use_mlock": False
+    },
+    "local_model_options": {},
+    "local_model_pool_size": 2,
+    "local_model_pool_mb": 6144,
+    "local_model_idle_minutes": 10,
+    "heartbeat_interval": 30,
+    "heartbeat_max_interval": 300,
+    "model_list_ttl": 300,
+    "metrics_window": 500,
+    "profiling_enabled": False,
+    "profile_top_n": 30,
+    "tracing_enabled": False
 }
 
 def get_assets_path():
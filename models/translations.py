@@ -11,6 +11,10 @@ TRANSLATIONS = {
         "server_status": "Server Status:",
         "server_status_checking": "Server Status: Checking...",
         "server_status_connected": "Server Status: Connected",
+        "server_status_warming": "Server Status: Warming up model...",
+        "server_status_loading": "Server Status: Loading model...",
+        "server_status_idle": "Server Status: Connected (model released while idle, {size} MB freed)",
+        "server_status_reloaded": "Server Status: Connected (model reloaded in {seconds:.1f} s)",
         "server_status_error": "Server Status: Error",
         "server_status_not_connected": "Server Status: Not Connected",
         "check_server": "Check Server",
@@ -71,6 +75,10 @@ TRANSLATIONS = {
         "prompt_error_msg": "Failed to read prompt file: {error}\nUsing default prompt.",
         "generation_error_msg": "Failed to generate sentence: {error}\nPlease check server settings and connection.",
         "unexpected_error_msg": "An unexpected error occurred: {error}",
+        "generation_timeout_msg": "Generation was stopped after {seconds} seconds. Sentences that finished in time were kept.",
+        "concurrency_status": "Parallel requests: {limit}",
+        "hedge_status": "Hedged: {hedge_rate:.0%}, won: {win_rate:.0%}",
+        "metrics_status": "Latency p50 {p50:.1f}s, p95 {p95:.1f}s",
         "startup_error_msg": "Error starting application:\n{error}",
         "using_default_prompt": "Using default prompt",
         "using_custom_prompt": "Using custom prompt",
@@ -118,6 +126,7 @@ TRANSLATIONS = {
         "loading_model_message": "Loading model: {model}\nPlease wait...",
         "local_model_loaded_msg": "Successfully loaded local model: {model}",
         "local_model_error_msg": "Failed to load local model. Error: {error}",
+        "local_model_not_loaded_msg": "No local model is loaded.",
         "local_model_not_found_msg": "Local model file not found: {model}",
         "local_models_dir_error_msg": "Local models directory not found. Please place GGUF models in LexiGenAssets/models directory.",
         "menu_button_main": "Menu",
@@ -137,6 +146,10 @@ TRANSLATIONS = {
         "server_status": "服务器状态:",
         "server_status_checking": "服务器状态: 检查中...",
         "server_status_connected": "服务器状态: 已连接",
+        "server_status_warming": "服务器状态: 正在预热模型...",
+        "server_status_loading": "服务器状态: 正在加载模型...",
+        "server_status_idle": "服务器状态: 已连接（空闲时已释放模型，释放 {size} MB）",
+        "server_status_reloaded": "服务器状态: 已连接（模型已在 {seconds:.1f} 秒内重新加载）",
         "server_status_error": "服务器状态: 错误",
         "server_status_not_connected": "服务器状态: 未连接",
         "check_server": "检查服务器",
@@ -197,6 +210,10 @@ TRANSLATIONS = {
         "prompt_error_msg": "读取提示词文件失败: {error}\n使用默认提示词。",
         "generation_error_msg": "生成句子失败: {error}\n请检查服务器设置和连接。",
         "unexpected_error_msg": "发生意外错误: {error}",
+        "generation_timeout_msg": "生成已在 {seconds} 秒后停止，已完成的句子已保留。",
+        "concurrency_status": "并行请求: {limit}",
+        "hedge_status": "对冲请求: {hedge_rate:.0%}，胜出: {win_rate:.0%}",
+        "metrics_status": "延迟 p50 {p50:.1f}秒，p95 {p95:.1f}秒",
         "startup_error_msg": "启动应用程序失败:\n{error}",
         "using_default_prompt": "使用默认提示词",
         "using_custom_prompt": "使用自定义提示词",
@@ -244,6 +261,7 @@ TRANSLATIONS = {
         "loading_model_message": "正在加载模型: {model}\n请稍候...",
         "local_model_loaded_msg": "成功加载本地模型: {model}",
         "local_model_error_msg": "加载本地模型失败。错误: {error}",
+        "local_model_not_loaded_msg": "没有已加载的本地模型。",
         "local_model_not_found_msg": "找不到本地模型文件: {model}",
         "local_models_dir_error_msg": "找不到本地模型目录。请将GGUF模型放置在LexiGenAssets/models目录中。",
         "menu_button_main": "菜单",
@@ -0,0 +1,154 @@
+from docx import Document
+from docx.shared import Pt
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from nltk import word_tokenize
+from services.trace_service import tracer
+
+# Punctuation stripped from a word before comparing it with its blank
+WORD_PUNCTUATION = '.,!?;:"\'()'
+
+def create_masked_sentence(word_processor, word, sentence):
+    """Create a masked sentence by identifying and masking the target word."""
+    with tracer.span("masking", word=word):
+        return _mask_sentence(word_processor, word, sentence)
+
+def _mask_sentence(word_processor, word, sentence):
+    # Get the base form of the input word
+    target_word = word.lower()
+
+    # Tokenize the sentence
+    with tracer.span("tokenization"):
+        words = word_tokenize(sentence)
+    masked_words = {}
+
+    # Process each word in the sentence
+    for original_word in words:
+        # Skip non-alphabetic words
+        if not original_word.isalpha():
+            continue
+
+        # Check if the word matches the target word or its variations
+        if word_processor.is_word_match(original_word, target_word):
+            masked_word = original_word[0] + '_' * (len(original_word) - 1)
+            masked_words[original_word] = masked_word
+
+    # Create the masked sentence
+    masked_sentence = sentence
+    for original, masked in sorted(masked_words.items(), key=lambda x: len(x[0]), reverse=True):
+        masked_sentence = masked_sentence.replace(original, masked)
+
+    return masked_sentence
+
+def extract_blanked_words(original, masked):
+    """Extract the words of original that have been blanked out in masked."""
+    blank_answers = []
+
+    # If there's no underscore in the masked sentence, there are no blanks
+    if '_' not in masked:
+        return []
+
+    # First, identify indices where blanks appear
+    orig_words = original.split()
+    mask_words = masked.split()
+
+    # Make sure the sentences have the same word count
+    if len(orig_words) != len(mask_words):
+        # Different word count indicates mismatch, fall back to advanced parsing
+        return extract_blanks_by_pattern(original, masked)
+
+    # Compare words at the same positions
+    for orig_word, mask_word in zip(orig_words, mask_words):
+        clean_orig = orig_word.strip(WORD_PUNCTUATION)
+        clean_mask = mask_word.strip(WORD_PUNCTUATION)
+
+        # Check if this is a blanked word (has underscores)
+        if '_' in clean_mask:
+            # Extract the original word without punctuation
+            if clean_orig not in blank_answers:
+                blank_answers.append(clean_orig)
+
+    # If we didn't find any blanks with the direct approach, try advanced pattern matching
+    if not blank_answers:
+        return extract_blanks_by_pattern(original, masked)
+
+    return blank_answers
+
+def extract_blanks_by_pattern(original, masked):
+    """Extract blanks using pattern matching for more complex cases."""
+    blank_answers = []
+
+    # Find all masks (patterns of first letter followed by underscores)
+    mask_patterns = []
+    for word in masked.split():
+        clean_word = word.strip(WORD_PUNCTUATION)
+        if len(clean_word) > 1 and '_' in clean_word:
+            # Get the pattern of the masked word
+            mask_patterns.append((clean_word, len(clean_word), clean_word[0].lower()))
+
+    # For each mask pattern, find the corresponding word in the original
+    for mask, length, first_letter in mask_patterns:
+        for word in original.split():
+            clean_word = word.strip(WORD_PUNCTUATION)
+            if (len(clean_word) == length and
+                clean_word[0].lower() == first_letter and
+                clean_word.lower() not in [w.lower() for w in blank_answers]):
+                blank_answers.append(clean_word)
+                break
+
+    return blank_answers
+
+def build_worksheet(title, entries, include_analysis=False):
+    """
+    Build the exported worksheet: numbered exercises, then an answer key on a new page.
+
+    entries are (displayed_text, original_sentence, word, analysis) tuples in
+    worksheet order; displayed_text is what the sentence row shows, blanked or
+    not. Returns the python-docx Document without saving it.
+    """
+    with tracer.span("docx_build", sentences=len(entries)):
+        return _build_document(title, entries, include_analysis)
+
+def _build_document(title, entries, include_analysis):
+    doc = Document()
+
+    # Add title
+    title_paragraph = doc.add_paragraph()
+    title_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    title_run = title_paragraph.add_run(title)
+    title_run.bold = True
+    title_run.font.size = Pt(16)
+
+    # Add exercises with blanks first
+    for i, (displayed_text, _, _, _) in enumerate(entries, 1):
+        para = doc.add_paragraph()
+        para.add_run(f"{i}. ").bold = True
+        para.add_run(displayed_text)
+
+    # Add page break before answer key
+    doc.add_page_break()
+
+    # Add answer key title
+    answer_title = doc.add_paragraph()
+    answer_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    answer_title_run = answer_title.add_run("Answer Key")
+    answer_title_run.bold = True
+    answer_title_run.font.size = Pt(14)
+
+    # List all blanked words with analysis if available
+    for i, (displayed_text, original, word, analysis) in enumerate(entries, 1):
+        words = extract_blanked_words(original, displayed_text)
+
+        # Fallback to using the original word if no blanks found
+        if not words:
+            if not word:
+                continue
+            words = [word]
+
+        para = doc.add_paragraph()
+        para.add_run(f"{i}. ").bold = True
+        if include_analysis and analysis:
+            para.add_run(f"{words[0]}; [{analysis}]")
+        else:
+            para.add_run(", ".join(words))
+
+    return doc
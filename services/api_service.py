@@ -1,10 +1,29 @@
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import json
+import queue
+import random
+import socket
+import contextvars
 import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, messagebox
 from models.config import DEFAULT_CONFIG, get_assets_path
 from models.translations import get_translation
+from services.cache_service import ResponseCache
+from services.inference_worker import InferenceWorker
+from services.generation_job import GenerationJob, GenerationCancelled
+from services.endpoint_pool import EndpointPool
+from services.concurrency_limiter import AdaptiveConcurrencyLimiter
+from services.hedge_policy import HedgePolicy
+from services.metrics_service import MetricsRegistry, METRIC_SENTENCE
+from services.profiling_service import profile_session
+from services.trace_service import tracer
+from services.model_catalog import ModelCatalog, RemoteModelCatalog, describe_remote_model
 
 try:
     from llama_cpp import Llama
@@ -15,6 +34,72 @@ except ImportError as e:
     traceback.print_exc()
     LLAMA_CPP_AVAILABLE = False
 
+try:
+    from llama_cpp.llama_grammar import LlamaGrammar, JSON_GBNF
+except ImportError:
+    # Older llama_cpp builds have no grammar support; JSON is then requested by prompt only
+    LlamaGrammar = None
+
+try:
+    from llama_cpp import StoppingCriteriaList
+except ImportError:
+    # Without stopping criteria a cancelled local completion runs to its end before stopping
+    StoppingCriteriaList = None
+
+# Sampling options for local completions; also part of the response cache key
+LOCAL_COMPLETION_OPTIONS = {
+    "max_tokens": 256,
+    "stop": ["</s>", "\n\n"]
+}
+
+# llama_cpp load options that can be set in settings, with their types
+LOCAL_MODEL_LOAD_OPTIONS = {
+    "n_ctx": int,
+    "n_threads": int,
+    "n_batch": int,
+    "use_mmap": bool,
+    "use_mlock": bool
+}
+
+# Token budget per word when several words share one JSON completion
+BATCH_TOKENS_PER_WORD = 96
+
+# Set while generating in the background (prefetching), which stays out of the cache and metrics
+_background_request = contextvars.ContextVar("lexigen_background_request", default=False)
+
+def get_shared_prefix(prompt_template):
+    """Return the formatted prompt text that comes before the word, which every word shares."""
+    marker = "\x00"
+    try:
+        return prompt_template.format(word=marker).split(marker)[0]
+    except (KeyError, IndexError, ValueError):
+        return ""
+
+def split_prompt_template(prompt_template):
+    """
+    Split a prompt template into the text shared by every word and the per-word task.
+
+    The shared part is everything before the line that contains {word}, such as
+    an attached context; the task is that line and everything after it.
+    """
+    word_index = prompt_template.find("{word}")
+    if word_index < 0:
+        return "", prompt_template
+    line_start = prompt_template.rfind("\n", 0, word_index) + 1
+    return prompt_template[:line_start], prompt_template[line_start:]
+
+def get_ollama_usage(result):
+    """Extract token counts and timings from an Ollama response; durations are in nanoseconds."""
+    def seconds(key):
+        value = result.get(key)
+        return value / 1e9 if value is not None else None
+    return {
+        "prompt_tokens": result.get("prompt_eval_count"),
+        "completion_tokens": result.get("eval_count"),
+        "generation_seconds": seconds("eval_duration"),
+        "load_seconds": seconds("load_duration")
+    }
+
 class ModelLoadingWindow(tk.Toplevel):
     def __init__(self, parent, model_name, language="English"):
         super().__init__(parent)
@@ -56,10 +141,223 @@ class APIService:
         self.server_connected = False
         self.word_processor = word_processor
         self.available_models = []
-        self.local_model = None
         self.using_local_model = False
+        # Only the inference worker thread touches the llama_cpp model
+        self.inference_worker = InferenceWorker()
+        # Saved llama_cpp KV states for prompt prefixes shared by a batch, most recent last
+        self._prefix_states = OrderedDict()
+        self._prefix_states_bytes = 0
         self.root = None  # Will be set to the root window
         self.is_initial_startup = False  # Flag to track initial startup
+        self.model_catalog = ModelCatalog(os.path.join(get_assets_path(), "models"),
+                                          os.path.join(get_assets_path(), "cache", "gguf_catalog.json"))
+        self.remote_model_catalog = RemoteModelCatalog(os.path.join(get_assets_path(), "cache", "ollama_models.json"),
+                                                       self._get_float_setting("model_list_ttl"))
+        # Called with (tags_url, model_names) when a background refresh changed a server's model list
+        self.on_models_updated = None
+        self.endpoint_pool = EndpointPool()
+        self.http = self._create_http_session()
+        self.concurrency_limiter = self._create_concurrency_limiter()
+        self.hedge_policy = HedgePolicy(percentile=self._get_float_setting("hedge_percentile"))
+        # Latency, token counts and validation outcome of recent generations
+        self.metrics = MetricsRegistry(window=self._get_int_setting("metrics_window"))
+        # Seconds Ollama took to load each (endpoint, model) during warm-up
+        self.model_load_times = {}
+        # Called with (state, model_name, error) as local models load, unload and reload
+        self.on_model_load_progress = None
+        # Idle unloads of the local model: memory given back and the cost of reloading
+        self.idle_stats = {"unloads": 0, "reclaimed_bytes": 0, "reloads": 0, "last_reload_seconds": None}
+        self.inference_worker.on_idle_unload = self._on_idle_unload
+        self.inference_worker.on_idle_reload = self._on_idle_reload
+        self.response_cache = self._create_response_cache()
+
+    @property
+    def local_model(self):
+        """The loaded llama_cpp model, owned by the inference worker."""
+        return self.inference_worker.model
+
+    def get_model_load_options(self, model_name):
+        """
+        Return the llama_cpp load options for a GGUF model.
+
+        local_model_defaults applies to every model; local_model_options maps a
+        model file name to the options that differ for it.
+        """
+        options = dict(DEFAULT_CONFIG["local_model_defaults"])
+        if self.settings_service:
+            for source in (self.settings_service.get_settings("local_model_defaults"),
+                           (self.settings_service.get_settings("local_model_options") or {}).get(model_name)):
+                if isinstance(source, dict):
+                    options.update({key: value for key, value in source.items() if key in LOCAL_MODEL_LOAD_OPTIONS})
+
+        load_options = {}
+        for key, value in options.items():
+            if value is None:
+                # Let llama_cpp pick its own default, e.g. the number of CPU cores
+                continue
+            try:
+                load_options[key] = LOCAL_MODEL_LOAD_OPTIONS[key](value)
+            except (TypeError, ValueError):
+                continue
+        return load_options
+
+    def load_local_model_async(self, model_path):
+        """
+        Queue a GGUF model load on the inference worker and return a Future for it.
+
+        The load runs between jobs; completions submitted meanwhile wait for it.
+        Models still resident in the worker's pool are switched to without loading.
+        Progress is reported through on_model_load_progress(state, model_name,
+        error) with state "loading", "loaded" or "failed", from the worker thread.
+        Idle unloads and the transparent reloads after them report "unloaded"
+        and "reloaded", or "failed" if the reload fails. Reloads use the same
+        options, so with use_mmap the weights usually come straight back from
+        the page cache.
+        """
+        model_name = os.path.basename(model_path)
+        load_options = self.get_model_load_options(model_name)
+        metadata = self.model_catalog.get(model_name) or {}
+        # A context longer than the model was trained on only wastes memory
+        if metadata.get("context_length") and load_options.get("n_ctx", 0) > metadata["context_length"]:
+            load_options["n_ctx"] = metadata["context_length"]
+
+        def load():
+            self._report_model_load("loading", model_name)
+            with profile_session("model_load", self.settings_service):
+                return Llama(model_path=model_path, **load_options)
+
+        # Mapped weights take about as much memory as the file itself
+        size = metadata.get("file_size") or 0
+        self.inference_worker.max_models = max(1, self._get_int_setting("local_model_pool_size"))
+        self.inference_worker.max_bytes = self._get_float_setting("local_model_pool_mb") * 1024 * 1024
+        self.inference_worker.idle_timeout = self._get_float_setting("local_model_idle_minutes") * 60 or None
+        future = self.inference_worker.swap_model(model_path, load, on_swap=self._clear_prefix_states, size=size)
+
+        def done(future):
+            error = future.exception()
+            if error is None:
+                self._report_model_load("loaded", model_name)
+                return
+            # The previous model is already released, so local generation is unavailable
+            if self.using_local_model and self.model == model_name:
+                self.server_connected = False
+            self._report_model_load("failed", model_name, error)
+
+        future.add_done_callback(done)
+        return future
+
+    def _on_idle_unload(self, model_path, reclaimed_bytes):
+        self.idle_stats["unloads"] += 1
+        self.idle_stats["reclaimed_bytes"] = reclaimed_bytes
+        self._clear_prefix_states()
+        self._report_model_load("unloaded", os.path.basename(model_path) if model_path else None)
+
+    def _on_idle_reload(self, model_path, seconds, error=None):
+        if error is not None:
+            self._report_model_load("failed", os.path.basename(model_path), error)
+            return
+        self.idle_stats["reloads"] += 1
+        self.idle_stats["last_reload_seconds"] = seconds
+        self._report_model_load("reloaded", os.path.basename(model_path))
+
+    def _report_model_load(self, state, model_name, error=None):
+        if self.on_model_load_progress:
+            self.on_model_load_progress(state, model_name, error)
+
+    def _unload_local_model(self):
+        """Release the local model once queued jobs are done with it."""
+        self.inference_worker.swap_model(None, None, on_swap=self._clear_prefix_states)
+
+    def _get_int_setting(self, key):
+        """Read an integer setting, falling back to the default on bad values."""
+        if not self.settings_service:
+            return DEFAULT_CONFIG[key]
+        return self.settings_service.get_int_setting(key)
+
+    def _get_float_setting(self, key):
+        """Read a numeric setting, falling back to the default on bad values."""
+        if not self.settings_service:
+            return DEFAULT_CONFIG[key]
+        return self.settings_service.get_float_setting(key)
+
+    def _create_http_session(self):
+        """Create the pooled keep-alive HTTP client used for every backend call."""
+        # Keep a connection for every request that can be in flight so workers never wait on the pool:
+        # each concurrent word samples its candidates at once, and a hedge adds one duplicate
+        concurrent_words = self._get_int_setting("max_concurrent_requests")
+        if not self.settings_service or self.settings_service.get_settings("adaptive_concurrency"):
+            concurrent_words = max(concurrent_words, self._get_int_setting("adaptive_concurrency_max"))
+        in_flight = concurrent_words * max(1, self._get_int_setting("parallel_candidates")) + 1
+        pool_size = max(1, self._get_int_setting("http_pool_size"), in_flight)
+        connect_timeout = self._get_float_setting("http_connect_timeout")
+        read_timeout = self._get_float_setting("http_read_timeout")
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        # (connect, read) timeouts for generation and for quick status checks
+        self.request_timeout = (connect_timeout, read_timeout)
+        self.status_timeout = (connect_timeout, connect_timeout)
+        return session
+
+    def get_endpoint_urls(self):
+        """Return the remote generate URLs requests are spread over, api_url first."""
+        urls = [self.api_url] if self.api_url and self.api_url != "models" else []
+        extra = self.settings_service.get_settings("api_endpoints") if self.settings_service else None
+        if isinstance(extra, str):
+            extra = extra.split(",")
+        for url in extra or []:
+            url = str(url).strip()
+            if url and url not in urls:
+                urls.append(url)
+        return urls
+
+    def get_concurrency_limit(self):
+        """Return the current in-flight limit for remote requests, or None if it is fixed."""
+        if self.using_local_model or not self.concurrency_limiter:
+            return None
+        return self.concurrency_limiter.get_limit()
+
+    def get_endpoint_count(self):
+        """Return how many remote endpoints share the work."""
+        if self.using_local_model:
+            return 1
+        return max(1, len(self.get_endpoint_urls()))
+
+    def _sync_endpoints(self):
+        """Bring the endpoint pool in line with the current api_url and settings."""
+        dispatch = self.settings_service.get_settings("endpoint_dispatch") if self.settings_service else None
+        self.endpoint_pool.set_endpoints(self.get_endpoint_urls(), dispatch or DEFAULT_CONFIG["endpoint_dispatch"])
+
+    def _create_concurrency_limiter(self):
+        """Create the adaptive in-flight limit for remote requests, or None if it is disabled."""
+        if self.settings_service and not self.settings_service.get_settings("adaptive_concurrency"):
+            return None
+        initial_limit = max(1, self._get_int_setting("max_concurrent_requests")) * max(1, len(self.get_endpoint_urls()))
+        max_limit = max(initial_limit, self._get_int_setting("adaptive_concurrency_max"))
+        return AdaptiveConcurrencyLimiter(initial_limit, max_limit)
+
+    def _create_response_cache(self):
+        """Open the on-disk response cache, or return None if it is disabled."""
+        if self.settings_service and not self.settings_service.get_settings("response_cache_enabled"):
+            return None
+        max_bytes = int(self._get_float_setting("response_cache_max_mb") * 1024 * 1024)
+        cache = ResponseCache(os.path.join(get_assets_path(), "cache", "responses.sqlite3"), max_bytes)
+        return cache if cache.available else None
+
+    def _get_cache_key(self, prompt):
+        """Key a completion by backend, model, formatted prompt and sampling options."""
+        if self.using_local_model:
+            return ResponseCache.make_key("local", self.model, prompt, LOCAL_COMPLETION_OPTIONS)
+        return ResponseCache.make_key(self.api_url, self.model, prompt, {})
+
+    def close(self):
+        """Release pooled connections and the response cache."""
+        self.http.close()
+        if self.response_cache:
+            self.response_cache.close()
 
     def check_server_status(self, show_message=True, parent_window=None):
         # Check if using "models" as API URL to use local models
@@ -69,39 +367,32 @@ class APIService:
             # Reset local model flag when not using local mode
             self.using_local_model = False
             if self.local_model is not None:
-                del self.local_model
-                self.local_model = None
+                self._unload_local_model()
             return self._check_remote_server_status(show_message)
     
     def _check_local_model_status(self, show_message=True, parent_window=None):
         # Check for local models when api_url is set to "models"
-        models_dir = os.path.join(get_assets_path(), "models")
-        print(models_dir)
+        models_dir = self.model_catalog.models_dir
         
         # First check if the models directory exists
-        if not os.path.exists(models_dir):
+        if not self.model_catalog.exists():
+            tracer.event("local_model_status", models_dir=models_dir, status="missing_models_dir")
             self.server_connected = False
             self.using_local_model = False
             if show_message:
-                print("DEBUG: Model Directory Error")
-                print(models_dir)
                 messagebox.showerror(
                     get_translation(self.language, "server_status_title"),
                     get_translation(self.language, "local_models_dir_error_msg")
                 )
             return False
 
-        print("DEBUG: Model Exists")
-        
-        # Check for available GGUF models
-        available_models = [f for f in os.listdir(models_dir) if f.endswith(".gguf") and LLAMA_CPP_AVAILABLE]
-        print(os.listdir(models_dir))
-        print(LLAMA_CPP_AVAILABLE)
-        print(available_models)
+        # Check for available GGUF models; the catalog only rescans when the directory changed
+        available_models = self.model_catalog.list_models() if LLAMA_CPP_AVAILABLE else []
+        tracer.event("local_model_status", models_dir=models_dir, llama_cpp_available=LLAMA_CPP_AVAILABLE,
+                     models=available_models, status="ok" if available_models else "no_models")
         
         if not available_models:
             # No GGUF models available
-            print("DEBUG: No GGUF models available")
             self.server_connected = False
             self.using_local_model = False
             if show_message:
@@ -127,11 +418,9 @@ class APIService:
                     def load_model_thread():
                         try:
                             # Try to load the model
-                            if self.local_model is None or self.local_model.model_path != model_path:
-                                # Release previous model if exists
-                                if self.local_model is not None:
-                                    del self.local_model
-                                self.local_model = Llama(model_path=model_path, n_ctx=2048)
+                            # The worker releases the previous model before loading this one
+                            if not self.inference_worker.is_current(model_path):
+                                self.load_local_model_async(model_path).result()
                             
                             self.server_connected = True
                             self.using_local_model = True
@@ -198,25 +487,15 @@ class APIService:
 
                     return True
                 else:
-                    # Load without UI feedback (silent)
-                    try:
-                        if self.local_model is None or self.local_model.model_path != model_path:
-                            if self.local_model is not None:
-                                del self.local_model
-                            self.local_model = Llama(model_path=model_path, n_ctx=2048)
-                        
-                        self.server_connected = True
-                        self.using_local_model = True
-                        return True
-                    except Exception as e:
-                        self.server_connected = False
-                        self.using_local_model = False
-                        if show_message:
-                            messagebox.showerror(
-                                get_translation(self.language, "server_status_title"),
-                                get_translation(self.language, "local_model_error_msg").format(error=str(e))
-                            )
-                        return False
+                    # Load without UI feedback (silent). The load runs on the inference
+                    # worker, so the Tk thread never waits for it; completions queue
+                    # behind it and on_model_load_progress reports the outcome.
+                    if not self.inference_worker.is_current(model_path):
+                        self.load_local_model_async(model_path)
+                    
+                    self.server_connected = True
+                    self.using_local_model = True
+                    return True
             else:
                 # Model file doesn't exist or isn't valid
                 self.server_connected = False
@@ -238,46 +517,78 @@ class APIService:
                 )
             return False
     
-    def _check_remote_server_status(self, show_message=True):
-        # If not using local model, check remote server
-        try:
-            response = requests.get(self.api_url.replace("/generate", "/version"))
-            if response.status_code == 200:
-                self.server_connected = True
-                if show_message:
+    def select_remote_backend(self):
+        """Switch to the remote server in api_url without probing it; the heartbeat does that."""
+        self.using_local_model = False
+        if self.local_model is not None:
+            self._unload_local_model()
+
+    def probe_server(self):
+        """
+        Probe every remote endpoint without touching any UI.
+
+        Returns (version, error): the version reported by the first endpoint
+        that answered, or None with the first connection error (None if the
+        servers answered with an error status).
+        """
+        self._sync_endpoints()
+        version = None
+        first_error = None
+        for endpoint in self.endpoint_pool.get_endpoints():
+            try:
+                response = self.http.get(endpoint.url.replace("/generate", "/version"), timeout=self.status_timeout)
+                healthy = response.status_code == 200
+                if healthy and version is None:
                     version = response.json().get('version', 'Unknown')
-                    messagebox.showinfo(
-                        get_translation(self.language, "server_status_title"),
-                        get_translation(self.language, "server_connected_msg").format(version=version)
-                    )
-                return True
-            else:
-                self.server_connected = False
-                if show_message:
-                    messagebox.showerror(
-                        get_translation(self.language, "server_status_title"),
-                        get_translation(self.language, "server_error_msg")
-                    )
-                return False
-        except Exception as e:
+            except Exception as e:
+                healthy = False
+                first_error = first_error or e
+            self.endpoint_pool.mark(endpoint, healthy)
+        return version, first_error
+
+    def _check_remote_server_status(self, show_message=True):
+        # If not using local model, check every remote server; one answering is enough
+        version, first_error = self.probe_server()
+
+        if version is not None:
+            self.server_connected = True
+            if show_message:
+                messagebox.showinfo(
+                    get_translation(self.language, "server_status_title"),
+                    get_translation(self.language, "server_connected_msg").format(version=version)
+                )
+            return True
+        elif first_error is None:
+            self.server_connected = False
+            if show_message:
+                messagebox.showerror(
+                    get_translation(self.language, "server_status_title"),
+                    get_translation(self.language, "server_error_msg")
+                )
+            return False
+        else:
             self.server_connected = False
             if show_message:
                 messagebox.showerror(
                     get_translation(self.language, "server_status_title"),
-                    get_translation(self.language, "server_connection_error_msg").format(error=str(e))
+                    get_translation(self.language, "server_connection_error_msg").format(error=str(first_error))
                 )
             return False
 
+    def describe_model(self, model_name):
+        """Return a short description of a model for the UI, or an empty string."""
+        if self.api_url == "models":
+            return self.model_catalog.describe(model_name)
+        model = self.remote_model_catalog.get(self.get_tags_url(), model_name)
+        return describe_remote_model(model) if model else ""
+
+    def get_tags_url(self):
+        return self.api_url.replace("/generate", "/tags")
+
     def fetch_models(self):
         # If using local models, only show local models
         if self.api_url == "models":
-            models_dir = os.path.join(get_assets_path(), "models")
-            local_models = []
-            
-            if os.path.exists(models_dir):
-                for file in os.listdir(models_dir):
-                    if file.endswith(".gguf") and LLAMA_CPP_AVAILABLE:
-                        local_models.append(file)
+            local_models = self.model_catalog.list_models() if LLAMA_CPP_AVAILABLE else []
             
             if local_models:
                 self.available_models = local_models
@@ -286,21 +597,75 @@ class APIService:
                 self.available_models = []
                 return False
         else:
-            # Using remote server, fetch models from API
+            # Serve the cached list right away; only a server never seen before is fetched inline
+            tags_url = self.get_tags_url()
+            catalog = self.remote_model_catalog
+            catalog.ttl = self._get_float_setting("model_list_ttl")
+            models = catalog.get_models(tags_url)
+            if models is None:
+                try:
+                    models = catalog.refresh(self.http, tags_url, self.status_timeout)
+                except Exception:
+                    self.available_models = []
+                    return False
+            elif catalog.is_stale(tags_url):
+                catalog.refresh_async(self.http, tags_url, self.status_timeout, self._on_models_refreshed)
+            self.available_models = [model["name"] for model in models]
+            return True
+
+    def _on_models_refreshed(self, tags_url, models):
+        # Runs on the refresh thread; the UI applies the new list through on_models_updated
+        if models is None or self.on_models_updated is None:
+            return
+        names = [model["name"] for model in models]
+        if names != self.available_models:
+            self.on_models_updated(tags_url, names)
+
+    def get_keep_alive(self):
+        """Return how long Ollama should keep the model loaded after each request."""
+        keep_alive = self.settings_service.get_settings("ollama_keep_alive") if self.settings_service else None
+        return keep_alive if keep_alive not in (None, "") else DEFAULT_CONFIG["ollama_keep_alive"]
+
+    def warm_up_model(self, model=None):
+        """
+        Load the model on every remote endpoint and pin it with keep_alive.
+
+        Ollama loads a model when it receives a request without a prompt, so the
+        first real generation does not pay for the load. Blocks until every
+        endpoint answered; returns the longest load time in seconds, or None if
+        no endpoint could load the model. Load times are kept in
+        model_load_times.
+        """
+        model = model or self.model
+        if self.using_local_model or not model:
+            return None
+
+        self._sync_endpoints()
+        load_time = None
+        for endpoint in self.endpoint_pool.get_endpoints():
+            started = time.monotonic()
             try:
-                response = requests.get(self.api_url.replace("/generate", "/tags"))
-                if response.status_code == 200:
-                    models = response.json()
-                    self.available_models = [model["name"] for model in models["models"]]
-                    if not self.available_models:
-                        self.available_models = ["llama2"]
-                    return True
-            except Exception:
-                self.available_models = ["llama2"]
-                return False
-            return False
+                response = self.http.post(
+                    endpoint.url,
+                    json={"model": model, "keep_alive": self.get_keep_alive(), "stream": False},
+                    timeout=self.request_timeout
+                )
+                response.raise_for_status()
+            except Exception as e:
+                self.endpoint_pool.mark(endpoint, not self._is_endpoint_failure(e))
+                continue
 
-    def generate_sentence(self, word, prompt_template):
+            # Ollama reports its own load time in nanoseconds; fall back to the round trip
+            seconds = time.monotonic() - started
+            try:
+                seconds = response.json().get("load_duration", seconds * 1e9) / 1e9
+            except ValueError:
+                pass
+            self.model_load_times[(endpoint.url, model)] = seconds
+            load_time = seconds if load_time is None else max(load_time, seconds)
+        return load_time
+
+    def generate_sentence(self, word, prompt_template, on_partial=None, use_cache=True):
         if not self.server_connected:
             messagebox.showerror(
                 get_translation(self.language, "server_error_title"),
@@ -308,63 +673,659 @@ class APIService:
             )
             return None
 
-        prompt = prompt_template.format(word=word)
-        
+        try:
+            return self.request_sentence(word, prompt_template, on_partial=on_partial, use_cache=use_cache)
+        except Exception as e:
+            self.show_generation_error(e)
+            return None
+
+    def request_sentence(self, word, prompt_template, on_partial=None, use_cache=True, job=None, background=False,
+                         started=None):
+        """Generate a sentence for a word, raising backend errors instead of showing dialogs.
+
+        Safe to call from worker threads; used by the batch generation engine.
+        When streaming is enabled, on_partial(text) receives the text generated
+        so far; every retry starts again from an empty text. With use_cache
+        False the cache is not consulted, but the fresh sentence replaces the
+        cached one. Cancelling job aborts the request with GenerationCancelled.
+        Background requests, such as prefetched alternates, neither touch the
+        cache nor show up in the metrics. Words that fall back from a grouped
+        request pass the time it started as started, so their recorded latency
+        and attempts include the grouped attempt.
+        """
+        if not background:
+            return self._request_sentence(word, prompt_template, on_partial, use_cache, job, started)
+        token = _background_request.set(True)
+        try:
+            return self._request_sentence(word, prompt_template, on_partial, False, job, started)
+        finally:
+            _background_request.reset(token)
+
+    def _request_sentence(self, word, prompt_template, on_partial, use_cache, job, started):
+        with tracer.span("prompt_build"):
+            prompt = prompt_template.format(word=word)
+        earlier_attempts = 0 if started is None else 1
+        if started is None:
+            started = time.monotonic()
+
+        cache_key = None
+        if self.response_cache and not _background_request.get():
+            cache_key = self._get_cache_key(prompt)
+            if use_cache:
+                sentence = self.response_cache.get(cache_key)
+                if sentence:
+                    if on_partial is not None and self.is_streaming_enabled():
+                        on_partial(sentence)
+                    self._record_sentence(started, earlier_attempts, True, cached=True)
+                    return sentence
+
+        candidate_count = self.get_candidate_count()
+        if candidate_count > 1:
+            sentence = self._sample_candidates(word, prompt, candidate_count, on_partial, job)
+            valid = self.is_valid_sentence(word, sentence)
+            if cache_key and valid:
+                self.response_cache.put(cache_key, sentence)
+            self._record_sentence(started, earlier_attempts + 1, valid, candidates=candidate_count)
+            return sentence
+
+        # Text before the word is identical for every word in a batch
+        shared_prefix = get_shared_prefix(prompt_template)
+
         max_attempts = 3
+        sentence = None
         for attempt in range(max_attempts):
-            try:
-                if self.using_local_model and self.local_model is not None:
-                    # Use local model for generation
-                    output = self.local_model(
-                        prompt,
-                        max_tokens=256,
-                        stop=["</s>", "\n\n"],
-                        echo=False
-                    )
-                    sentence = output['choices'][0]['text'].strip()
-                else:
-                    # Use remote API
-                    response = requests.post(
-                        self.api_url,
-                        json={
-                            "model": self.model,
-                            "prompt": prompt,
-                            "stream": False
-                        }
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    sentence = result["response"].strip()
-
-                # Use stem to verify the sentence
-                sentence_split = sentence.split()
-                sentence_stems = []
-                for sentence_fragment in sentence_split:
-                    sentence_stems.append(self.word_processor.get_word_stem(sentence_fragment))
-                if self.word_processor.get_word_stem(word.lower()) in sentence_stems:
-                    return sentence
-                
-                if attempt == max_attempts - 1:
+            if self.is_hedging_enabled():
+                sentence = self._sample_candidates(word, prompt, 2, on_partial, job, hedge=True)
+            else:
+                sentence = self.generate_text(prompt, on_partial=on_partial, shared_prefix=shared_prefix, job=job)
+
+            # Use stem to verify the sentence once the whole completion is in
+            if self.is_valid_sentence(word, sentence):
+                # Only validated sentences are worth serving again
+                if cache_key:
+                    self.response_cache.put(cache_key, sentence)
+                self._record_sentence(started, earlier_attempts + attempt + 1, True)
+                return sentence
+
+        self._record_sentence(started, earlier_attempts + max_attempts, False)
+        return sentence
+
+    def _record_sentence(self, started, attempts, valid, cached=False, candidates=1, group_size=1):
+        """Record how long a word took, how often it was retried and whether it passed the stem check."""
+        if _background_request.get():
+            return
+        self.metrics.record(METRIC_SENTENCE, latency=time.monotonic() - started, attempts=attempts,
+                            retries=max(0, attempts - 1), valid=valid, cached=cached, candidates=candidates,
+                            group_size=group_size)
+
+    def get_candidate_count(self):
+        """Return how many candidates to sample at once for a word; 1 keeps sequential retries."""
+        # The local model runs one completion at a time, so parallel candidates gain nothing there
+        if self.using_local_model:
+            return 1
+        return max(1, self._get_int_setting("parallel_candidates"))
+
+    def is_hedging_enabled(self):
+        """Return True if slow remote generations should get a duplicate request."""
+        if self.using_local_model or not self.settings_service:
+            return False
+        return bool(self.settings_service.get_settings("hedge_requests"))
+
+    def _sample_candidates(self, word, prompt, count, on_partial=None, job=None, hedge=False):
+        """
+        Request count differently seeded completions and return the first valid one.
+
+        Candidates are all sent at once, or with hedge the first one is sent
+        alone and the others only once it has taken longer than the hedge
+        policy's latency percentile. The other requests usually land on other
+        endpoints, since the pool prefers the least loaded one.
+
+        Only the first candidate streams into on_partial, which runs on the
+        calling thread. Once a candidate passes the stem check the others are
+        cancelled and their connections closed. If none passes, the first
+        completed candidate is returned, like the last sequential retry.
+        """
+        if on_partial is not None and not self.is_streaming_enabled():
+            on_partial = None
+
+        # Partial texts and finished candidates both arrive here, in order
+        events = queue.Queue()
+        candidates_job = GenerationJob(parent=job)
+        executor = ThreadPoolExecutor(max_workers=count, thread_name_prefix="lexigen-candidate")
+
+        # Fresh seeds per call, so regenerating a word still gives new sentences
+        base_seed = random.randrange(2 ** 31)
+
+        def launch(index):
+            partial_callback = None
+            if index == 0 and on_partial is not None:
+                partial_callback = lambda text: events.put(("partial", text))
+            future = executor.submit(contextvars.copy_context().run, self._generate_remote, prompt, partial_callback,
+                                     {"seed": base_seed + index}, candidates_job)
+            future.add_done_callback(lambda done: events.put(("done", (index, done))))
+
+        started = time.monotonic()
+        hedge_at = None
+        if hedge:
+            launch(0)
+            launched = 1
+            delay = self.hedge_policy.get_delay()
+            if delay is not None:
+                hedge_at = started + delay
+        else:
+            for index in range(count):
+                launch(index)
+            launched = count
+
+        winner = None
+        fallback = None
+        first_error = None
+        try:
+            remaining = launched
+            while remaining:
+                try:
+                    timeout = max(0.0, hedge_at - time.monotonic()) if hedge_at is not None else None
+                    kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    # The first candidate is slower than most; race it against the rest
+                    for index in range(launched, count):
+                        launch(index)
+                    remaining += count - launched
+                    launched = count
+                    hedge_at = None
+                    continue
+
+                if kind == "partial":
+                    on_partial(value)
+                    continue
+
+                remaining -= 1
+                index, future = value
+                try:
+                    sentence = future.result()
+                except Exception as e:
+                    first_error = first_error or e
+                    continue
+                if self.is_valid_sentence(word, sentence):
+                    winner = index
                     return sentence
-                
-            except requests.exceptions.RequestException as e:
-                if self.using_local_model:
-                    # If using local model, this is unexpected
-                    messagebox.showerror(
-                        get_translation(self.language, "error_title"), 
-                        get_translation(self.language, "unexpected_error_msg").format(error=str(e))
-                    )
-                else:
-                    messagebox.showerror(
-                        get_translation(self.language, "error_title"), 
-                        get_translation(self.language, "generation_error_msg").format(error=str(e))
-                    )
-                return None
-            except Exception as e:
-                messagebox.showerror(
-                    get_translation(self.language, "error_title"), 
-                    get_translation(self.language, "unexpected_error_msg").format(error=str(e))
+                if fallback is None:
+                    fallback = sentence
+        finally:
+            candidates_job.cancel()
+            candidates_job.finish()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if hedge:
+                # Requests that produced nothing say little about how long generation takes
+                latency = time.monotonic() - started if winner is not None or fallback is not None else None
+                self.hedge_policy.record(latency, hedged=launched > 1,
+                                         hedge_won=winner is not None and winner > 0)
+
+        if fallback is None and first_error is not None:
+            raise first_error
+        return fallback
+
+    def request_sentence_group(self, words, prompt_template, use_cache=True, job=None):
+        """
+        Generate sentences for several words with a single JSON completion.
+
+        Returns a dict mapping each word's index to its sentence. Only sentences
+        that pass the stem check are included, so callers can fall back to
+        single-word requests for the missing words; those record their own
+        metrics when they pass the group's start time on to request_sentence.
+        """
+        with tracer.span("prompt_build", words=len(words)):
+            shared_prefix, task_template = split_prompt_template(prompt_template)
+            tasks = "\n".join(
+                f"{number}. {task_template.format(word=word).strip()}"
+                for number, word in enumerate(words, 1)
+            )
+            batch_prompt = self.settings_service.get_settings("batch_generation_prompt") if self.settings_service else None
+            if not batch_prompt or "{tasks}" not in batch_prompt:
+                batch_prompt = DEFAULT_CONFIG["batch_generation_prompt"]
+            prompt = shared_prefix + batch_prompt.format(tasks=tasks)
+
+        started = time.monotonic()
+        cache_key = None
+        response_text = None
+        if self.response_cache:
+            cache_key = self._get_cache_key(prompt)
+            if use_cache:
+                response_text = self.response_cache.get(cache_key)
+        cached = bool(response_text)
+
+        if not response_text:
+            response_text = self._generate_json(prompt, max_tokens=BATCH_TOKENS_PER_WORD * len(words) + 64,
+                                                shared_prefix=shared_prefix, job=job)
+            if cache_key and response_text:
+                self.response_cache.put(cache_key, response_text)
+
+        sentences = {}
+        for index, sentence in self._parse_sentence_group(words, response_text).items():
+            # Validate each sentence on its own, exactly like single-word generation
+            if self.is_valid_sentence(words[index], sentence):
+                sentences[index] = sentence
+                self._record_sentence(started, 0 if cached else 1, True, cached=cached, group_size=len(words))
+        return sentences
+
+    def _generate_json(self, prompt, max_tokens, shared_prefix=None, job=None):
+        """Run a completion that is constrained to produce a JSON object."""
+        if self.using_local_model:
+            options = {"max_tokens": max_tokens, "stop": ["</s>"], "echo": False}
+            if LlamaGrammar is not None:
+                options["grammar"] = LlamaGrammar.from_string(JSON_GBNF, verbose=False)
+            options.update(self._get_local_cancel_options(job))
+
+            def job_function(model):
+                if job is not None:
+                    job.check()
+                self._check_local_model(model)
+                self._load_prefix_state(model, shared_prefix)
+                return model(prompt, **options)
+
+            started = time.monotonic()
+            with tracer.span("backend_request", backend="local", format="json"):
+                output = self.inference_worker.run(job_function)
+            self._record_local_call(started, usage=output.get('usage'))
+            if job is not None:
+                job.check()
+            return output['choices'][0]['text'].strip()
+
+        return self._generate_remote(prompt, job=job, json_format=True)
+
+    def _parse_sentence_group(self, words, response_text):
+        """Map a {"sentences": [{"word", "sentence"}]} response back to word indexes."""
+        try:
+            data = json.loads(response_text)
+        except (TypeError, ValueError):
+            return {}
+        entries = data.get("sentences", []) if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            return {}
+
+        indexes_by_word = {}
+        for index, word in enumerate(words):
+            indexes_by_word.setdefault(word.lower(), []).append(index)
+
+        sentences = {}
+        unmatched = []
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not isinstance(entry.get("sentence"), str):
+                continue
+            sentence = entry["sentence"].strip()
+            if not sentence:
+                continue
+            candidates = indexes_by_word.get(str(entry.get("word", "")).strip().lower())
+            if candidates:
+                sentences[candidates.pop(0)] = sentence
+            else:
+                unmatched.append((position, sentence))
+
+        # Fall back to the task order when the model mangles the word, but only
+        # for slots that no correctly labelled entry claimed
+        for position, sentence in unmatched:
+            if position < len(words) and position not in sentences:
+                sentences[position] = sentence
+        return sentences
+
+    def request_analysis(self, prompt, on_partial=None, use_cache=True, job=None):
+        """Generate an analysis for an already formatted analysis prompt."""
+        cache_key = None
+        if self.response_cache:
+            cache_key = self._get_cache_key(prompt)
+            if use_cache:
+                analysis = self.response_cache.get(cache_key)
+                if analysis:
+                    return analysis
+
+        analysis = self.generate_text(prompt, on_partial=on_partial, job=job)
+        if cache_key and analysis:
+            self.response_cache.put(cache_key, analysis)
+        return analysis
+
+    def is_streaming_enabled(self):
+        """Return True if completions should be streamed token by token."""
+        if not self.settings_service:
+            return False
+        return bool(self.settings_service.get_settings("stream_generation"))
+
+    def generate_text(self, prompt, on_partial=None, shared_prefix=None, job=None):
+        """
+        Run a single completion for an already formatted prompt.
+
+        shared_prefix is the start of the prompt that other calls in the same
+        batch repeat; local models keep its evaluated state and reuse it.
+        Cancelling job aborts the completion with GenerationCancelled.
+        """
+        if on_partial is not None and not self.is_streaming_enabled():
+            on_partial = None
+
+        if self.using_local_model:
+            return self._generate_local(prompt, on_partial, shared_prefix, job)
+        return self._generate_remote(prompt, on_partial, job=job)
+
+    def _check_local_model(self, model):
+        """Raise if the local model failed to load or was unloaded before the job ran."""
+        if model is None:
+            raise RuntimeError(get_translation(self.language, "local_model_not_loaded_msg"))
+
+    def _get_local_cancel_options(self, job):
+        """Return llama_cpp options that stop generating as soon as job is cancelled."""
+        if job is None or StoppingCriteriaList is None:
+            return {}
+        return {"stopping_criteria": StoppingCriteriaList([lambda input_ids, logits: job.is_cancelled()])}
+
+    def _generate_local(self, prompt, on_partial=None, shared_prefix=None, job=None):
+        """Run a completion on the local llama_cpp model via the inference worker."""
+        options = dict(LOCAL_COMPLETION_OPTIONS, **self._get_local_cancel_options(job))
+
+        if on_partial is None:
+            def job_function(model):
+                # Jobs cancelled while waiting in the queue never start
+                if job is not None:
+                    job.check()
+                self._check_local_model(model)
+                self._load_prefix_state(model, shared_prefix)
+                return model(
+                    prompt,
+                    echo=False,
+                    **options
                 )
-                return None
-        
-        return None
+
+            started = time.monotonic()
+            with tracer.span("backend_request", backend="local"):
+                output = self.inference_worker.run(job_function)
+            self._record_local_call(started, usage=output.get('usage'))
+            if job is not None:
+                job.check()
+            return output['choices'][0]['text'].strip()
+
+        # Stream tokens as llama_cpp produces them. The worker only queues the
+        # partial texts; on_partial runs on the calling thread, which may be Tk's.
+        partial_texts = queue.Queue()
+        finished = object()
+        # Streamed chunks carry no usage; each chunk is one generated token
+        stream_stats = {"first_token": None, "tokens": 0}
+
+        def streaming_job_function(model):
+            try:
+                if job is not None:
+                    job.check()
+                self._check_local_model(model)
+                self._load_prefix_state(model, shared_prefix)
+                text = ""
+                for chunk in model(
+                    prompt,
+                    echo=False,
+                    stream=True,
+                    **options
+                ):
+                    if job is not None and job.is_cancelled():
+                        break
+                    piece = chunk['choices'][0]['text']
+                    if stream_stats["first_token"] is None:
+                        stream_stats["first_token"] = time.monotonic()
+                    stream_stats["tokens"] += 1
+                    if piece:
+                        text += piece
+                        partial_texts.put(text.strip())
+                return text.strip()
+            finally:
+                partial_texts.put(finished)
+
+        started = time.monotonic()
+        with tracer.span("backend_request", backend="local", stream=True):
+            future = self.inference_worker.submit(streaming_job_function)
+            while True:
+                partial_text = partial_texts.get()
+                if partial_text is finished:
+                    break
+                on_partial(partial_text)
+            text = future.result()
+        first_token = stream_stats["first_token"]
+        self._record_local_call(started, ttft=first_token - started if first_token is not None else None,
+                                completion_tokens=stream_stats["tokens"])
+        if job is not None:
+            job.check()
+        return text
+
+    def _record_local_call(self, started, usage=None, ttft=None, completion_tokens=None):
+        """Record a finished llama_cpp completion; latency includes time queued on the worker."""
+        usage = usage or {}
+        self._record_call("local", time.monotonic() - started, ttft=ttft,
+                          prompt_tokens=usage.get("prompt_tokens"),
+                          completion_tokens=usage.get("completion_tokens", completion_tokens),
+                          model=self.model)
+
+    def _record_call(self, backend, latency, **fields):
+        """Record a finished backend completion unless it was made in the background."""
+        if not _background_request.get():
+            self.metrics.record_call(backend, latency, **fields)
+
+    def _load_prefix_state(self, model, prefix):
+        """
+        Put the local model's KV cache into the state right after evaluating prefix.
+
+        The first call for a prefix evaluates it and saves the state; later calls
+        load it back, so llama_cpp's prefix matching only evaluates the per-word
+        suffix of the prompt. Runs on the inference worker thread.
+        """
+        if not prefix or not hasattr(model, "save_state"):
+            return
+
+        key = (model.model_path, prefix)
+        state = self._prefix_states.get(key)
+        if state is not None:
+            self._prefix_states.move_to_end(key)
+            model.load_state(state)
+            return
+
+        try:
+            tokens = model.tokenize(prefix.encode("utf-8"))
+            # Prefixes that do not leave room for the completion are not worth keeping
+            if len(tokens) + LOCAL_COMPLETION_OPTIONS["max_tokens"] >= model.n_ctx():
+                return
+            # Saving a state copies the whole KV cache; a short prefix such as the bare
+            # instructions is cheaper to re-evaluate, and llama_cpp's own prefix matching
+            # already keeps it between consecutive words. Long ones, such as an attached
+            # context passage, are what the saved states are for.
+            if len(tokens) < self._get_int_setting("local_prefix_cache_min_tokens"):
+                return
+            model.reset()
+            model.eval(tokens)
+            state = model.save_state()
+        except Exception:
+            # Reuse is an optimization only; fall back to evaluating the full prompt
+            model.reset()
+            return
+
+        self._prefix_states[key] = state
+        self._prefix_states_bytes += state.llama_state_size
+        max_bytes = self._get_float_setting("local_prefix_cache_mb") * 1024 * 1024
+        while self._prefix_states and (self._prefix_states_bytes > max_bytes
+                                       or len(self._prefix_states) > self._get_int_setting("local_prefix_cache_states")):
+            _, old_state = self._prefix_states.popitem(last=False)
+            self._prefix_states_bytes -= old_state.llama_state_size
+
+    def _clear_prefix_states(self):
+        """Forget saved prefix states, which only match the model that produced them."""
+        self._prefix_states.clear()
+        self._prefix_states_bytes = 0
+
+    def _generate_remote(self, prompt, on_partial=None, options=None, job=None, json_format=False):
+        """
+        Run a completion on a remote Ollama server from the endpoint pool.
+
+        options are passed through as Ollama sampling options (e.g. a seed).
+        Requests that belong to a job are streamed, so cancelling the job can
+        close the response mid-completion; they raise GenerationCancelled.
+        A request that fails because its server is down or overloaded is
+        retried on the next endpoint; streamed text then starts over.
+        """
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            # Keep the model resident between requests instead of Ollama's 5 minute default
+            "keep_alive": self.get_keep_alive()
+        }
+        if options:
+            payload["options"] = options
+        if json_format:
+            payload["format"] = "json"
+
+        self._sync_endpoints()
+        tried = []
+        call_started = time.monotonic()
+        while True:
+            if self.concurrency_limiter:
+                # Wait for a slot before picking an endpoint, so the pool's load only
+                # counts requests that are actually sent. The Tk thread never waits
+                # for a slot; its requests still count.
+                self.concurrency_limiter.acquire(job, wait=threading.current_thread() is not threading.main_thread())
+            endpoint = self.endpoint_pool.acquire(exclude=tried)
+            if endpoint is None:
+                if self.concurrency_limiter:
+                    self.concurrency_limiter.release()
+                # No endpoints configured; let requests raise its usual error for api_url
+                return self._request_completion(self.api_url, payload, on_partial, job)
+            started = time.monotonic()
+            usage = {}
+            try:
+                with tracer.span("backend_request", backend="remote", endpoint=endpoint.url,
+                                 attempt=len(tried) + 1) as span:
+                    result = self._request_completion(endpoint.url, payload, on_partial, job, usage)
+                    if span is not None:
+                        span.set(**usage)
+            except Exception as e:
+                failed = self._is_endpoint_failure(e)
+                # A cancelled request says nothing about the endpoint's health
+                self.endpoint_pool.release(endpoint, failed=None if isinstance(e, GenerationCancelled) else failed)
+                if self.concurrency_limiter:
+                    self.concurrency_limiter.release(failed=failed)
+                tried.append(endpoint)
+                if not failed or len(tried) >= len(self.endpoint_pool):
+                    if not isinstance(e, GenerationCancelled):
+                        self._record_call("remote", time.monotonic() - call_started, retries=len(tried) - 1,
+                                          error=e, endpoint=endpoint.url, model=self.model)
+                    raise
+                continue
+            self.endpoint_pool.release(endpoint)
+            if self.concurrency_limiter:
+                self.concurrency_limiter.release(latency=(time.monotonic() - started) / max(1, len(result)))
+            # Latency covers failed attempts on other endpoints; time to first token is this attempt's
+            self._record_call("remote", time.monotonic() - call_started, retries=len(tried),
+                              endpoint=endpoint.url, model=self.model, **usage)
+            return result
+
+    def _is_endpoint_failure(self, error):
+        """Return True if error means the server itself is unreachable or failing."""
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            return error.response.status_code >= 500
+        return False
+
+    def _request_completion(self, url, payload, on_partial=None, job=None, usage=None):
+        """
+        Send one completion request to url and return the generated text.
+
+        If usage is a dict, it receives the token counts and timings Ollama
+        reports for the request.
+        """
+        payload = dict(payload)
+        started = time.monotonic()
+        if on_partial is None and job is None:
+            payload["stream"] = False
+            response = self.http.post(
+                url,
+                json=payload,
+                timeout=self.request_timeout
+            )
+            response.raise_for_status()
+            result = response.json()
+            if usage is not None:
+                usage.update(get_ollama_usage(result))
+            return result["response"].strip()
+
+        timeout = self.request_timeout
+        if job is not None:
+            job.check()
+            timeout = job.get_timeout(timeout)
+
+        # Ollama streams one JSON object per line until "done" is true
+        payload["stream"] = True
+        text = ""
+        try:
+            with self.http.post(
+                url,
+                json=payload,
+                timeout=timeout,
+                stream=True
+            ) as response:
+                # Aborting the response from the cancelling thread unblocks the read below
+                detach = job.on_cancel(lambda: self._abort_response(response)) if job is not None else None
+                try:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if job is not None:
+                            job.check()
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise RuntimeError(chunk["error"])
+                        piece = chunk.get("response", "")
+                        if piece:
+                            if usage is not None and not text:
+                                usage["ttft"] = time.monotonic() - started
+                            text += piece
+                            if on_partial is not None:
+                                on_partial(text.strip())
+                        if chunk.get("done"):
+                            if usage is not None:
+                                usage.update(get_ollama_usage(chunk))
+                            break
+                finally:
+                    if detach is not None:
+                        detach()
+        except Exception as e:
+            # Errors caused by aborting the request are reported as the cancellation
+            if job is not None and job.is_cancelled() and not isinstance(e, GenerationCancelled):
+                raise GenerationCancelled() from e
+            raise
+        return text.strip()
+
+    def _abort_response(self, response):
+        """Close a streamed response from another thread, waking up a read blocked on it."""
+        connection = getattr(response.raw, "connection", None)
+        sock = getattr(connection, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        response.close()
+
+    def is_valid_sentence(self, word, sentence):
+        """Check that the sentence contains the stem of the target word."""
+        with tracer.span("stem_validation", word=word) as span:
+            sentence_stems = []
+            for sentence_fragment in sentence.split():
+                sentence_stems.append(self.word_processor.get_word_stem(sentence_fragment))
+            valid = self.word_processor.get_word_stem(word.lower()) in sentence_stems
+            if span is not None:
+                span.set(valid=valid)
+            return valid
+
+    def show_generation_error(self, error):
+        """Show the error dialog matching a failed generation request."""
+        if isinstance(error, requests.exceptions.RequestException) and not self.using_local_model:
+            messagebox.showerror(
+                get_translation(self.language, "error_title"), 
+                get_translation(self.language, "generation_error_msg").format(error=str(error))
+            )
+        else:
+            messagebox.showerror(
+                get_translation(self.language, "error_title"), 
+                get_translation(self.language, "unexpected_error_msg").format(error=str(error))
+            )
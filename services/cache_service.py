@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+class ResponseCache:
+    """Persistent, content-addressed cache of LLM responses with size-bounded LRU eviction."""
+
+    def __init__(self, db_path, max_bytes):
+        """Open (or create) the cache database at db_path."""
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        # last_used times of recent hits, written with the next put or on close
+        self._touched = {}
+        self._conn = None
+
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        except Exception:
+            # An unwritable assets folder just disables caching
+            self._conn = None
+
+    @property
+    def available(self):
+        return self._conn is not None
+
+    @staticmethod
+    def make_key(backend, model, prompt, options):
+        """Hash everything that determines a completion into a cache key."""
+        payload = json.dumps(
+            {"backend": backend, "model": model, "prompt": prompt, "options": options},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss."""
+        if not self.available:
+            return None
+        with self._lock:
+            # close() may have run on another thread since the check above
+            if self._conn is None:
+                return None
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            # A hit only needs a write before the next eviction decision, so it is not committed here
+            self._touched[key] = time.time()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        """Store a response and evict the least recently used entries over the size budget."""
+        if not self.available or not value:
+            return
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if self._conn is None:
+                return
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._total_bytes -= row[0]
+            self._flush_touched()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self._total_bytes += size
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        """Write the last_used times of recent hits. Caller holds the lock."""
+        if self._touched:
+            self._conn.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                   [(last_used, key) for key, last_used in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        """Drop the oldest entries until the cache fits its budget. Caller holds the lock."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used ASC LIMIT 32"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def clear(self):
+        """Remove every cached response."""
+        if not self.available:
+            return
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._touched.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
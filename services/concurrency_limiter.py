@@ -0,0 +1,91 @@
+import time
+import threading
+from services.generation_job import GenerationCancelled
+
+# A request counts as slow once its latency exceeds the baseline by this factor
+LATENCY_TOLERANCE = 1.5
+# Multiplicative decrease applied when requests get slow or fail
+DECREASE_FACTOR = 0.5
+# How quickly the baseline follows latencies above it
+BASELINE_DRIFT = 0.02
+# Smoothing of recent latency, so one slow request does not halve the limit
+RECENT_WEIGHT = 0.2
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on the number of in-flight remote requests.
+
+    While smoothed latency stays near the best recently observed latency the
+    limit grows by about one per round of requests; when latency rises or
+    requests fail it is halved. Latency is measured per generated character
+    so long analyses and short sentences can be compared.
+    """
+
+    def __init__(self, initial_limit, max_limit, min_limit=1):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.in_flight = 0
+        self._baseline = None
+        self._recent = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def get_limit(self):
+        return int(self.limit)
+
+    def acquire(self, job=None, wait=True):
+        """
+        Take a request slot, waiting while the limit is reached.
+
+        With wait False the slot is taken right away, so callers that must not
+        block (the Tk thread) still count towards the load.
+        """
+        with self._condition:
+            while wait and self.in_flight >= int(self.limit):
+                if job is not None and job.is_cancelled():
+                    raise GenerationCancelled()
+                self._condition.wait(0.1)
+            self.in_flight += 1
+
+    def release(self, latency=None, failed=False):
+        """
+        Return a slot and adapt the limit.
+
+        latency is seconds per generated character; pass None for requests
+        that say nothing about the server, such as cancelled ones.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if failed or latency is not None:
+                self._adjust(latency, failed)
+            self._condition.notify_all()
+
+    def _adjust(self, latency, failed):
+        """Apply one AIMD step. Caller holds the condition."""
+        if latency is not None and not failed:
+            if self._recent is None:
+                self._recent = latency
+            else:
+                self._recent += (latency - self._recent) * RECENT_WEIGHT
+            if self._baseline is None or self._recent < self._baseline:
+                self._baseline = self._recent
+            else:
+                self._baseline += (self._recent - self._baseline) * BASELINE_DRIFT
+
+        if failed or self._recent > self._baseline * LATENCY_TOLERANCE:
+            # Requests that were in flight together slow down together; back off once per wave
+            now = time.monotonic()
+            if now - self._last_decrease >= 1.0:
+                self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "max_limit": self.max_limit
+            }
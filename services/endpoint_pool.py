@@ -0,0 +1,118 @@
+import time
+import threading
+
+# Seconds a failed endpoint sits out before requests are sent to it again
+ENDPOINT_RETRY_DELAY = 30
+
+DISPATCH_LEAST_LOADED = "least_loaded"
+DISPATCH_ROUND_ROBIN = "round_robin"
+
+class Endpoint:
+    """One Ollama generate URL with its health and current load."""
+
+    def __init__(self, url):
+        self.url = url
+        self.in_flight = 0
+        self.healthy = True
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def is_available(self, now):
+        """Return True if the endpoint is healthy or its retry delay has passed."""
+        return self.healthy or self.retry_at <= now
+
+class EndpointPool:
+    """
+    Spreads remote requests over several Ollama servers.
+
+    Each request acquires an endpoint and releases it when done, reporting
+    whether the endpoint failed. Failed endpoints are skipped until their retry
+    delay passes, unless every endpoint is down.
+    """
+
+    def __init__(self, urls=None, dispatch=DISPATCH_LEAST_LOADED):
+        self.dispatch = dispatch
+        self._endpoints = []
+        self._next = 0
+        self._lock = threading.Lock()
+        if urls:
+            self.set_endpoints(urls)
+
+    def set_endpoints(self, urls, dispatch=None):
+        """Replace the endpoint list, keeping the state of URLs that stay."""
+        with self._lock:
+            if dispatch:
+                self.dispatch = dispatch
+            if [endpoint.url for endpoint in self._endpoints] == list(urls):
+                return
+            existing = {endpoint.url: endpoint for endpoint in self._endpoints}
+            self._endpoints = [existing.get(url) or Endpoint(url) for url in urls]
+            self._next = 0
+
+    def __len__(self):
+        return len(self._endpoints)
+
+    def acquire(self, exclude=()):
+        """Pick an endpoint for a request and count it as in flight, or return None."""
+        with self._lock:
+            candidates = [endpoint for endpoint in self._endpoints if endpoint not in exclude]
+            if not candidates:
+                return None
+
+            # Rotate the starting point so ties (and round-robin) spread over every endpoint
+            start = self._next % len(candidates)
+            self._next += 1
+            ordered = candidates[start:] + candidates[:start]
+
+            now = time.monotonic()
+            available = [endpoint for endpoint in ordered if endpoint.is_available(now)]
+            if not available:
+                # Everything is down; keep trying rather than failing without a request
+                available = ordered
+
+            if self.dispatch == DISPATCH_ROUND_ROBIN:
+                endpoint = available[0]
+            else:
+                endpoint = min(available, key=lambda e: e.in_flight)
+            endpoint.in_flight += 1
+            return endpoint
+
+    def release(self, endpoint, failed=False):
+        """
+        Finish a request on endpoint and record whether the endpoint failed.
+
+        Pass failed=None for requests that say nothing about the endpoint,
+        such as cancelled ones.
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+        if failed is not None:
+            self.mark(endpoint, not failed)
+
+    def mark(self, endpoint, healthy):
+        """Record the outcome of a request or health probe."""
+        with self._lock:
+            if healthy:
+                endpoint.healthy = True
+                endpoint.failures = 0
+            else:
+                endpoint.healthy = False
+                endpoint.failures += 1
+                endpoint.retry_at = time.monotonic() + ENDPOINT_RETRY_DELAY
+
+    def get_endpoints(self):
+        with self._lock:
+            return list(self._endpoints)
+
+    def stats(self):
+        """Return the health and load of every endpoint."""
+        with self._lock:
+            return [
+                {
+                    "url": endpoint.url,
+                    "healthy": endpoint.healthy,
+                    "in_flight": endpoint.in_flight,
+                    "failures": endpoint.failures
+                }
+                for endpoint in self._endpoints
+            ]
@@ -0,0 +1,93 @@
+import time
+import threading
+
+class GenerationCancelled(Exception):
+    """Raised when a generation job was cancelled or ran past its deadline."""
+
+class GenerationJob:
+    """
+    Cancellation handle shared by every request that belongs to one piece of work.
+
+    A job can be cancelled by the user or by its deadline. Requests register
+    abort callbacks (e.g. closing a streamed HTTP response) so in-flight work
+    stops right away instead of at the next checkpoint. Child jobs are cancelled
+    together with their parent.
+    """
+
+    def __init__(self, timeout=None, parent=None):
+        self.expired = False
+        self._cancel_event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._timer = None
+        self.deadline = None
+        if timeout:
+            self.deadline = time.monotonic() + timeout
+            self._timer = threading.Timer(timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        self._detach = None
+        if parent is not None:
+            if parent.deadline is not None and (self.deadline is None or parent.deadline < self.deadline):
+                self.deadline = parent.deadline
+            self._detach = parent.on_cancel(self.cancel)
+
+    def _expire(self):
+        self.expired = True
+        self.cancel()
+
+    def cancel(self):
+        """Cancel the job and abort everything registered with it."""
+        with self._lock:
+            if self._cancel_event.is_set():
+                return
+            self._cancel_event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # Aborting is best effort; the request notices the cancellation anyway
+                pass
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check(self):
+        """Raise GenerationCancelled if the job should stop."""
+        if self.is_cancelled():
+            raise GenerationCancelled()
+
+    def on_cancel(self, callback):
+        """
+        Call callback() when the job is cancelled and return a function that unregisters it.
+
+        If the job is already cancelled, callback runs immediately.
+        """
+        with self._lock:
+            if not self._cancel_event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def get_timeout(self, timeout):
+        """Shorten a (connect, read) timeout so a request cannot outlive the deadline."""
+        if self.deadline is None:
+            return timeout
+        # A little slack lets the deadline timer cancel the job before the socket times out
+        remaining = max(0.1, self.deadline - time.monotonic()) + 1
+        connect_timeout, read_timeout = timeout
+        return (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+    def finish(self):
+        """Stop the deadline timer and detach from the parent once the work is over."""
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._detach is not None:
+            self._detach()
@@ -0,0 +1,118 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from models.config import DEFAULT_CONFIG
+from services.generation_job import GenerationCancelled
+from services.trace_service import tracer
+
+class GenerationService:
+    """Generate sentences for many words at once on a bounded pool of worker threads."""
+
+    def __init__(self, api_service, settings_service=None):
+        self.api_service = api_service
+        self.settings_service = settings_service
+
+    def get_max_workers(self):
+        """Return how many requests may be in flight at the same time."""
+        # Local completions are serialized on the inference worker, so more threads would only queue
+        if self.api_service.using_local_model:
+            return 1
+
+        max_workers = DEFAULT_CONFIG["max_concurrent_requests"]
+        if self.settings_service:
+            max_workers = self.settings_service.get_int_setting("max_concurrent_requests")
+        # The limit applies per server, so more endpoints take more words at once
+        max_workers = max(1, max_workers) * self.api_service.get_endpoint_count()
+        # With an adaptive limit, enough workers wait for slots to use the highest limit
+        limiter = self.api_service.concurrency_limiter
+        if limiter:
+            max_workers = max(max_workers, limiter.max_limit)
+        return max_workers
+
+    def get_group_size(self):
+        """Return how many words share one batched JSON request (0 or 1 disables batching)."""
+        if not self.settings_service:
+            return DEFAULT_CONFIG["batch_prompt_size"]
+        return self.settings_service.get_int_setting("batch_prompt_size")
+
+    def get_batch_timeout(self):
+        """Return the overall deadline for a batch in seconds (0 means no deadline)."""
+        if not self.settings_service:
+            return DEFAULT_CONFIG["batch_timeout"]
+        return max(0.0, self.settings_service.get_float_setting("batch_timeout"))
+
+    def generate_batch(self, words, prompt_template, on_progress=None, on_partial=None, job=None):
+        """
+        Generate one sentence per word and return the results in input order.
+
+        Each result is a (word, sentence, error) tuple where exactly one of
+        sentence and error is set. on_progress(index, word, sentence, error) is
+        called from a worker thread as soon as each word completes. When
+        streaming is enabled, on_partial(index, text) receives the text
+        generated so far for each word. With batch_prompt_size above 1, words
+        are sent in groups that share one JSON completion. Once job is
+        cancelled, words that are not done yet fail with GenerationCancelled;
+        finished words keep their sentences.
+        """
+        results = [None] * len(words)
+        if not words:
+            return results
+
+        def report(index, sentence, error):
+            word = words[index]
+            if error is None and not sentence:
+                error = ValueError(f"Empty response for '{word}'")
+                sentence = None
+            results[index] = (word, sentence, error)
+            if on_progress:
+                on_progress(index, word, sentence, error)
+
+        def run_single(index, started=None):
+            if job is not None and job.is_cancelled():
+                report(index, None, GenerationCancelled())
+                return
+            partial_callback = None
+            if on_partial:
+                partial_callback = lambda text: on_partial(index, text)
+            try:
+                with tracer.span("word", word=words[index], index=index):
+                    sentence = self.api_service.request_sentence(words[index], prompt_template,
+                                                                 on_partial=partial_callback, job=job,
+                                                                 started=started)
+            except Exception as e:
+                report(index, None, e)
+                return
+            report(index, sentence, None)
+
+        def run_group(indexes):
+            # One JSON request for the whole group; words that fail validation fall back to single calls
+            started = time.monotonic()
+            try:
+                sentences = self.api_service.request_sentence_group([words[i] for i in indexes], prompt_template,
+                                                                    job=job)
+            except Exception:
+                sentences = {}
+            for position, index in enumerate(indexes):
+                if position in sentences:
+                    report(index, sentences[position], None)
+            for position, index in enumerate(indexes):
+                if position not in sentences:
+                    run_single(index, started)
+
+        group_size = self.get_group_size()
+        if group_size > 1 and len(words) > 1:
+            units = [list(range(start, min(start + group_size, len(words))))
+                     for start in range(0, len(words), group_size)]
+            task = run_group
+        else:
+            units = list(range(len(words)))
+            task = run_single
+
+        max_workers = min(self.get_max_workers(), len(units))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lexigen-gen") as executor:
+            # Each task runs in a copy of this context, so its spans are children of the caller's
+            futures = [executor.submit(contextvars.copy_context().run, task, unit) for unit in units]
+            for future in futures:
+                future.result()
+
+        return results
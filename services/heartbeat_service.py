@@ -0,0 +1,103 @@
+import time
+import threading
+from models.config import DEFAULT_CONFIG
+
+# A probe result stays fresh for this many probe intervals, so one late probe does not blank it
+HEALTH_TTL_INTERVALS = 3
+
+class ServerHeartbeat:
+    """
+    Probes the remote server in the background and caches its health.
+
+    A single daemon thread checks the backend every heartbeat_interval seconds.
+    While the server is unreachable the interval doubles up to
+    heartbeat_max_interval, and drops back as soon as a probe succeeds. UI code
+    reads get_cached_status() instead of probing on the Tk thread, and
+    on_change(url, connected) is called from the heartbeat thread whenever the
+    state of a URL changes.
+    """
+
+    def __init__(self, api_service, settings_service=None, on_change=None):
+        self.api_service = api_service
+        self.settings_service = settings_service
+        self.on_change = on_change
+        self._status = {}
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="lexigen-heartbeat")
+        self._thread.daemon = True
+
+    def _get_setting(self, key):
+        if not self.settings_service:
+            return DEFAULT_CONFIG[key]
+        return max(1.0, self.settings_service.get_float_setting(key))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def check_now(self):
+        """Probe on the heartbeat thread right away instead of at the next interval."""
+        self._failures = 0
+        self._wakeup.set()
+
+    def get_cached_status(self, url=None):
+        """
+        Return whether the server at url (default: the current one) answered its last probe.
+
+        Returns None if it was never probed or the result has gone stale.
+        """
+        url = url or self.api_service.api_url
+        with self._lock:
+            status = self._status.get(url)
+        if status is None or self._is_stale(status, time.monotonic()):
+            return None
+        return status[0]
+
+    def _is_stale(self, status, now):
+        # Each result lives for a few of the intervals in force when it was taken,
+        # so it never expires just because back-off made probes rarer
+        _, probed_at, interval = status
+        return now - probed_at > interval * HEALTH_TTL_INTERVALS
+
+    def _get_interval(self):
+        interval = self._get_setting("heartbeat_interval")
+        if self._failures:
+            # Back off exponentially while the server stays down
+            interval = min(self._get_setting("heartbeat_max_interval"), interval * 2 ** self._failures)
+        return interval
+
+    def _run(self):
+        while not self._stopped:
+            if not self.api_service.using_local_model and self.api_service.api_url != "models":
+                self._probe(self.api_service.api_url)
+            self._wakeup.wait(self._get_interval())
+            self._wakeup.clear()
+
+    def _probe(self, url):
+        try:
+            version, _ = self.api_service.probe_server()
+        except Exception:
+            version = None
+        connected = version is not None
+        self._failures = 0 if connected else min(self._failures + 1, 16)
+
+        now = time.monotonic()
+        with self._lock:
+            previous = self._status.get(url)
+            self._status[url] = (connected, now, self._get_interval())
+        # A stale result counts as unknown, so the UI hears about the fresh one
+        if previous is not None and self._is_stale(previous, now):
+            previous = None
+
+        # The URL may have changed while the probe was running
+        if url != self.api_service.api_url or self.api_service.using_local_model:
+            return
+        self.api_service.server_connected = connected
+        if (previous is None or previous[0] != connected) and self.on_change:
+            self.on_change(url, connected)
@@ -0,0 +1,50 @@
+import threading
+from collections import deque
+
+class HedgePolicy:
+    """
+    Decides when a slow generation gets a duplicate request, and counts the cost.
+
+    The hedge delay is a percentile of recent generation latencies, so only
+    the slowest few percent of requests are duplicated.
+    """
+
+    def __init__(self, percentile=95, window=200, min_samples=20):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def get_delay(self):
+        """Return seconds to wait before hedging, or None until enough latencies are known."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return latencies[index]
+
+    def record(self, latency, hedged=False, hedge_won=False):
+        """Record one finished generation and whether a hedge was sent and won."""
+        with self._lock:
+            self.requests += 1
+            if latency is not None:
+                self._latencies.append(latency)
+            if hedged:
+                self.hedges += 1
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def stats(self):
+        """Return the hedge rate (hedges per request) and win rate (wins per hedge)."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+                "win_rate": self.hedge_wins / self.hedges if self.hedges else 0.0
+            }
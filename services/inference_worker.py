@@ -0,0 +1,222 @@
+import os
+import time
+import queue
+import threading
+import itertools
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Lower numbers run first
+PRIORITY_MODEL_SWAP = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BATCH = 2
+PRIORITY_BACKGROUND = 3
+
+class InferenceWorker:
+    """
+    Single thread that owns the local llama_cpp model and runs jobs against it.
+
+    llama_cpp models are not safe to call from several threads, so every use of
+    the model is submitted here as a job and served from a priority queue.
+    Model swaps are queued like jobs, so they only ever happen between jobs.
+
+    Loaded models stay resident in a least-recently-used pool bounded by a
+    model count and a memory budget, so switching back to one is instant.
+    After idle_timeout seconds without jobs the pool is released; the model
+    that was current is reloaded transparently before the next job.
+    """
+
+    def __init__(self, max_models=1, max_bytes=None):
+        self.model = None
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()
+        self._model_sizes = {}
+        self._model_factories = {}
+        self.idle_timeout = None
+        # on_idle_unload(model_path, reclaimed_bytes) and on_idle_reload(model_path, seconds, error)
+        self.on_idle_unload = None
+        self.on_idle_reload = None
+        self._idle_model_path = None
+        self._last_job = time.monotonic()
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._thread_state = threading.local()
+        self._thread = threading.Thread(target=self._run, name="lexigen-inference")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def set_thread_priority(self, priority):
+        """Set the priority used for jobs submitted from the calling thread."""
+        self._thread_state.priority = priority
+
+    def get_thread_priority(self):
+        """Return the calling thread's job priority; the Tk thread is interactive by default."""
+        priority = getattr(self._thread_state, "priority", None)
+        if priority is not None:
+            return priority
+        if threading.current_thread() is threading.main_thread():
+            return PRIORITY_INTERACTIVE
+        return PRIORITY_BATCH
+
+    def submit(self, job, priority=None):
+        """Queue job(model) and return a Future for its result."""
+        if priority is None:
+            priority = self.get_thread_priority()
+        return self._enqueue(priority, job, True)
+
+    def _enqueue(self, priority, job, pass_model):
+        future = Future()
+        self._queue.put((priority, next(self._counter), job, pass_model, future))
+        return future
+
+    def run(self, job, priority=None):
+        """Run job(model) on the worker and wait for its result."""
+        # Jobs that call back into the worker run inline instead of deadlocking
+        if threading.current_thread() is self._thread:
+            return job(self.model)
+        return self.submit(job, priority).result()
+
+    def swap_model(self, model_path, factory, on_swap=None, size=0):
+        """
+        Make the model for model_path current between jobs and return a Future for it.
+
+        A model still in the pool becomes current without loading; otherwise
+        factory() builds it, after least recently used models are evicted to
+        make room for size bytes. A model_path of None unloads every model.
+        on_swap() runs on the worker after the current model changed.
+        """
+        def swap():
+            # Compare by path: holding on to the previous model would keep it in
+            # memory while its replacement loads
+            previous_path = self._get_current_path()
+            # An explicit swap replaces whatever an idle unload meant to restore
+            self._idle_model_path = None
+            if model_path is None:
+                self.model = None
+                self._models.clear()
+                self._model_sizes.clear()
+                self._model_factories.clear()
+            elif model_path in self._models:
+                self._models.move_to_end(model_path)
+                self.model = self._models[model_path]
+            else:
+                # Evict before loading to keep peak memory within the budget
+                self.model = None
+                self._evict(size)
+                model = factory()
+                self._models[model_path] = model
+                self._model_sizes[model_path] = size
+                self._model_factories[model_path] = factory
+                self.model = model
+
+            if on_swap and self._get_current_path() != previous_path:
+                on_swap()
+            return self.model
+
+        return self._enqueue(PRIORITY_MODEL_SWAP, swap, False)
+
+    def _evict(self, incoming_size):
+        """Drop least recently used models until one more of incoming_size fits."""
+        while self._models:
+            total = sum(self._model_sizes.values()) + incoming_size
+            if len(self._models) < self.max_models and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            model_path, _ = self._models.popitem(last=False)
+            del self._model_sizes[model_path]
+            del self._model_factories[model_path]
+
+    def _get_current_path(self):
+        """Return the pool path of the current model, or None if none is loaded."""
+        return next((path for path, model in self._models.items() if model is self.model), None)
+
+    def is_current(self, model_path):
+        """Return True if model_path is the current model, even while it is unloaded for idling."""
+        if self._idle_model_path == model_path:
+            return True
+        # Read once: the worker thread can swap or unload the model between two reads
+        model = self.model
+        return model is not None and model.model_path == model_path
+
+    def get_resident_models(self):
+        """Return the paths of the models in the pool, least recently used first."""
+        return list(self._models)
+
+    def _get_idle_wait(self):
+        """Return seconds until the loaded models count as idle, or None to wait forever."""
+        if not self.idle_timeout or not self._models:
+            return None
+        return max(0.0, self._last_job + self.idle_timeout - time.monotonic())
+
+    def _unload_idle(self):
+        """Release every loaded model, remembering the current one for the next job."""
+        current_path = self._get_current_path()
+        reclaimed = sum(self._model_sizes.values())
+        rss_before = get_rss_bytes()
+
+        # Keep only what is needed to rebuild the current model
+        self._idle_model_path = current_path
+        self._model_factories = {path: factory for path, factory in self._model_factories.items() if path == current_path}
+        self._model_sizes = {path: size for path, size in self._model_sizes.items() if path == current_path}
+        self.model = None
+        self._models.clear()
+
+        rss_after = get_rss_bytes()
+        if rss_before is not None and rss_after is not None and rss_before > rss_after:
+            reclaimed = rss_before - rss_after
+        if self.on_idle_unload:
+            self.on_idle_unload(current_path, reclaimed)
+
+    def _reload_idle(self):
+        """Rebuild the model that was current before an idle unload; return the error if that failed."""
+        model_path = self._idle_model_path
+        started = time.monotonic()
+        try:
+            model = self._model_factories[model_path]()
+        except Exception as e:
+            # Stay unloaded but remember the model, so the next job tries again
+            if self.on_idle_reload:
+                self.on_idle_reload(model_path, None, e)
+            return e
+        self._idle_model_path = None
+        self._models[model_path] = model
+        self.model = model
+        if self.on_idle_reload:
+            self.on_idle_reload(model_path, time.monotonic() - started, None)
+        return None
+
+    def _run(self):
+        while True:
+            try:
+                priority, _, job, pass_model, future = self._queue.get(timeout=self._get_idle_wait())
+            except queue.Empty:
+                self._unload_idle()
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                reload_error = None
+                if pass_model and self.model is None and self._idle_model_path is not None:
+                    reload_error = self._reload_idle()
+                if reload_error is not None:
+                    # The job still runs, without a model, so its own error path
+                    # (e.g. ending a stream) runs; the caller sees the reload error
+                    try:
+                        job(None)
+                    except Exception:
+                        pass
+                    raise reload_error
+                future.set_result(job(self.model) if pass_model else job())
+            except BaseException as e:
+                future.set_exception(e)
+            self._last_job = time.monotonic()
+            # Drop the job's references (it may close over a model) before waiting again
+            del job, future
+
+def get_rss_bytes():
+    """Return the resident memory of this process in bytes, or None where it is unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
@@ -0,0 +1,92 @@
+import time
+import threading
+from collections import deque
+
+# Kinds of records kept by the registry
+METRIC_CALL = "call"          # one backend completion request
+METRIC_SENTENCE = "sentence"  # one word, from prompt to validated sentence
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of values, or None if there are none."""
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(len(values) * percent / 100.0)) - 1))
+    return values[index]
+
+class MetricsRegistry:
+    """
+    In-process record of recent generation calls, with rolling percentiles.
+
+    Backend calls record latency, time to first token, token counts,
+    throughput and failover retries; sentence records add the number of
+    attempts and whether the result passed validation. Only the last window
+    records of each kind are kept, so percentiles describe recent behaviour.
+    """
+
+    def __init__(self, window=500):
+        self.window = window
+        self._records = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, **fields):
+        """Store one record; fields with a None value are simply unknown."""
+        fields["time"] = time.time()
+        with self._lock:
+            records = self._records.get(kind)
+            if records is None:
+                records = self._records[kind] = deque(maxlen=self.window)
+            records.append(fields)
+            self._totals[kind] = self._totals.get(kind, 0) + 1
+
+    def record_call(self, backend, latency, ttft=None, prompt_tokens=None, completion_tokens=None,
+                    generation_seconds=None, retries=0, error=None, **fields):
+        """
+        Record one backend completion.
+
+        Throughput is completion tokens over generation_seconds when the backend
+        reports how long decoding took, else over the whole latency.
+        """
+        tokens_per_second = None
+        seconds = generation_seconds or latency
+        if completion_tokens and seconds:
+            tokens_per_second = completion_tokens / seconds
+        self.record(METRIC_CALL, backend=backend, latency=latency, ttft=ttft,
+                    prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                    tokens_per_second=tokens_per_second, retries=retries,
+                    error=type(error).__name__ if error is not None else None, **fields)
+
+    def get_records(self, kind):
+        with self._lock:
+            return [dict(record) for record in self._records.get(kind, ())]
+
+    def summary(self, kind=METRIC_CALL):
+        """Return the count and p50/p95/p99 of every numeric field of recent records."""
+        records = self.get_records(kind)
+        with self._lock:
+            total = self._totals.get(kind, 0)
+        summary = {"count": len(records), "total": total}
+        if not records:
+            return summary
+
+        fields = sorted({key for record in records for key, value in record.items()
+                         if isinstance(value, (int, float)) and not isinstance(value, bool) and key != "time"})
+        for field in fields:
+            values = [record.get(field) for record in records]
+            summary[field] = {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99)
+            }
+        if kind == METRIC_CALL:
+            summary["errors"] = sum(1 for record in records if record.get("error"))
+        if kind == METRIC_SENTENCE:
+            judged = [record["valid"] for record in records if record.get("valid") is not None]
+            summary["valid_rate"] = sum(judged) / len(judged) if judged else None
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._totals.clear()
@@ -0,0 +1,342 @@
+import os
+import json
+import struct
+import threading
+import time
+
+GGUF_MAGIC = b"GGUF"
+
+# GGUF metadata value types mapped to their struct formats; 8 is a string and 9 an array
+GGUF_SCALAR_FORMATS = {
+    0: "<B", 1: "<b", 2: "<H", 3: "<h", 4: "<I", 5: "<i",
+    6: "<f", 7: "<?", 10: "<Q", 11: "<q", 12: "<d"
+}
+GGUF_TYPE_STRING = 8
+GGUF_TYPE_ARRAY = 9
+
+# general.file_type values written by llama.cpp
+GGUF_FILE_TYPES = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 7: "Q8_0", 8: "Q5_0", 9: "Q5_1",
+    10: "Q2_K", 11: "Q3_K_S", 12: "Q3_K_M", 13: "Q3_K_L", 14: "Q4_K_S", 15: "Q4_K_M",
+    16: "Q5_K_S", 17: "Q5_K_M", 18: "Q6_K", 19: "IQ2_XXS", 20: "IQ2_XS", 21: "Q2_K_S",
+    22: "IQ3_XS", 23: "IQ3_XXS", 24: "IQ1_S", 25: "IQ4_NL", 26: "IQ3_S", 27: "IQ3_M",
+    28: "IQ2_S", 29: "IQ2_M", 30: "IQ4_XS", 31: "IQ1_M", 32: "BF16"
+}
+
+def read_gguf_metadata(path):
+    """
+    Read the header of a GGUF file without loading its weights.
+
+    Returns a dict with architecture, name, parameter_count, quantization,
+    context_length and file_size. Raises ValueError for files that are not GGUF.
+    """
+    with open(path, "rb") as f:
+        if f.read(4) != GGUF_MAGIC:
+            raise ValueError(f"Not a GGUF file: {path}")
+        version = _read(f, "<I")
+        # Version 1 used 32-bit counts and lengths
+        count_format = "<I" if version == 1 else "<Q"
+        tensor_count = _read(f, count_format)
+        kv_count = _read(f, count_format)
+
+        metadata = {}
+        for _ in range(kv_count):
+            key = _read_string(f, count_format)
+            value_type = _read(f, "<I")
+            value = _read_value(f, value_type, count_format)
+            if value_type != GGUF_TYPE_ARRAY:
+                metadata[key] = value
+
+        # The parameter count is the sum of every tensor's element count
+        parameter_count = 0
+        for _ in range(tensor_count):
+            _read_string(f, count_format)
+            n_dims = _read(f, "<I")
+            elements = 1
+            for _ in range(n_dims):
+                elements *= _read(f, count_format)
+            f.seek(4 + 8, os.SEEK_CUR)  # tensor type and data offset
+            parameter_count += elements
+
+    architecture = metadata.get("general.architecture")
+    file_type = metadata.get("general.file_type")
+    return {
+        "architecture": architecture,
+        "name": metadata.get("general.name"),
+        "parameter_count": parameter_count,
+        "quantization": GGUF_FILE_TYPES.get(file_type, str(file_type) if file_type is not None else None),
+        "context_length": metadata.get(f"{architecture}.context_length"),
+        "file_size": os.path.getsize(path)
+    }
+
+def _read(f, fmt):
+    size = struct.calcsize(fmt)
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated GGUF header")
+    return struct.unpack(fmt, data)[0]
+
+def _read_string(f, count_format):
+    length = _read(f, count_format)
+    data = f.read(length)
+    if len(data) != length:
+        raise ValueError("Truncated GGUF header")
+    return data.decode("utf-8", errors="replace")
+
+def _read_value(f, value_type, count_format):
+    if value_type in GGUF_SCALAR_FORMATS:
+        return _read(f, GGUF_SCALAR_FORMATS[value_type])
+    if value_type == GGUF_TYPE_STRING:
+        return _read_string(f, count_format)
+    if value_type == GGUF_TYPE_ARRAY:
+        item_type = _read(f, "<I")
+        count = _read(f, count_format)
+        if item_type in GGUF_SCALAR_FORMATS:
+            # Arrays such as token scores are skipped, not parsed
+            f.seek(count * struct.calcsize(GGUF_SCALAR_FORMATS[item_type]), os.SEEK_CUR)
+        else:
+            for _ in range(count):
+                _read_value(f, item_type, count_format)
+        return None
+    raise ValueError(f"Unknown GGUF value type {value_type}")
+
+def format_parameter_count(parameter_count):
+    """Format a parameter count the way model names do, e.g. 494000000 -> '0.5B'."""
+    if not parameter_count:
+        return None
+    if parameter_count >= 1e9:
+        return f"{parameter_count / 1e9:.1f}B"
+    return f"{parameter_count / 1e6:.0f}M"
+
+class ModelCatalog:
+    """
+    Catalog of the GGUF models in the models directory.
+
+    Each file's header is read once; results are cached on disk keyed by path,
+    size and modification time. The directory is only listed again when its
+    own modification time changes.
+    """
+
+    def __init__(self, models_dir, cache_path):
+        self.models_dir = models_dir
+        self.cache_path = cache_path
+        self._entries = {}
+        self._dir_mtime = None
+        self._lock = threading.Lock()
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f).get("models", {})
+        except (OSError, ValueError, AttributeError):
+            self._entries = {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"models": self._entries}, f, ensure_ascii=False, indent=1)
+        except OSError:
+            # The catalog still works without its cache, just slower on the next start
+            pass
+
+    def exists(self):
+        return os.path.isdir(self.models_dir)
+
+    def refresh(self, force=False):
+        """Rescan the directory if it changed since the last scan."""
+        with self._lock:
+            try:
+                dir_mtime = os.stat(self.models_dir).st_mtime
+            except OSError:
+                self._dir_mtime = None
+                return
+            if not force and dir_mtime == self._dir_mtime:
+                return
+
+            entries = {}
+            changed = False
+            for file_name in sorted(os.listdir(self.models_dir)):
+                if not file_name.endswith(".gguf"):
+                    continue
+                path = os.path.join(self.models_dir, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = self._entries.get(file_name)
+                if not entry or entry.get("file_size") != stat.st_size or entry.get("mtime") != stat.st_mtime:
+                    try:
+                        entry = read_gguf_metadata(path)
+                    except (OSError, ValueError):
+                        entry = {"file_size": stat.st_size, "invalid": True}
+                    entry["mtime"] = stat.st_mtime
+                    changed = True
+                entries[file_name] = entry
+
+            changed = changed or set(entries) != set(self._entries)
+            self._entries = entries
+            self._dir_mtime = dir_mtime
+            if changed:
+                self._save_cache()
+
+    def list_models(self):
+        """Return the file names of valid GGUF models, sorted."""
+        self.refresh()
+        with self._lock:
+            return [name for name, entry in self._entries.items() if not entry.get("invalid")]
+
+    def get(self, model_name):
+        """Return the header metadata of a model, or None if it is not in the catalog."""
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(model_name)
+            return dict(entry) if entry else None
+
+    def get_path(self, model_name):
+        return os.path.join(self.models_dir, model_name)
+
+    def describe(self, model_name):
+        """Return a short summary such as 'qwen2 · 0.5B · Q4_K_M · 379 MB'."""
+        entry = self.get(model_name)
+        if not entry:
+            return ""
+        parts = [
+            entry.get("architecture"),
+            format_parameter_count(entry.get("parameter_count")),
+            entry.get("quantization"),
+            f"{entry['file_size'] / (1024 * 1024):.0f} MB" if entry.get("file_size") else None
+        ]
+        return " · ".join(part for part in parts if part)
+
+class RemoteModelCatalog:
+    """
+    Cache of the model lists reported by Ollama servers through /api/tags.
+
+    Lists are kept per tags URL together with each model's size, family,
+    parameter size and quantization, and persisted so the model dropdown fills
+    instantly on the next start. Stale lists are still served while a
+    background refresh fetches the new one.
+    """
+
+    def __init__(self, cache_path, ttl=300):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        # Serializes cache file writes so a background refresh never interleaves with another
+        self._write_lock = threading.Lock()
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f).get("servers", {})
+        except (OSError, ValueError, AttributeError):
+            self._entries = {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with self._write_lock:
+                # Take the snapshot inside the write lock so the last write always has the newest entries
+                with self._lock:
+                    data = json.dumps({"servers": self._entries}, ensure_ascii=False, indent=1)
+                # Write aside and swap in, so a crash or a reader never sees a half-written file
+                temp_path = self.cache_path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(temp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def get_models(self, tags_url):
+        """Return the cached models of a server (possibly stale), or None if it was never fetched."""
+        with self._lock:
+            entry = self._entries.get(tags_url)
+            return [dict(model) for model in entry["models"]] if entry else None
+
+    def is_stale(self, tags_url):
+        with self._lock:
+            entry = self._entries.get(tags_url)
+            return entry is None or time.time() - entry.get("fetched_at", 0) > self.ttl
+
+    def get(self, tags_url, model_name):
+        """Return the metadata of one model, or None if the server's list does not have it."""
+        for model in self.get_models(tags_url) or ():
+            if model["name"] == model_name:
+                return model
+        return None
+
+    def refresh(self, http, tags_url, timeout):
+        """
+        Fetch the model list of a server and cache it.
+
+        A server that sent an ETag is asked for the list conditionally, so an
+        unchanged list costs a 304. Returns the models; request errors propagate.
+        """
+        with self._lock:
+            entry = self._entries.get(tags_url)
+            etag = entry.get("etag") if entry else None
+        headers = {"If-None-Match": etag} if etag else None
+        response = http.get(tags_url, headers=headers, timeout=timeout)
+
+        if response.status_code == 304 and entry:
+            models = entry["models"]
+        else:
+            response.raise_for_status()
+            models = [_parse_tags_model(model) for model in response.json().get("models", [])]
+        with self._lock:
+            self._entries[tags_url] = {
+                "models": models,
+                "fetched_at": time.time(),
+                "etag": response.headers.get("ETag") or etag
+            }
+        self._save_cache()
+        return [dict(model) for model in models]
+
+    def refresh_async(self, http, tags_url, timeout, on_done=None):
+        """Refresh on a background thread unless a refresh of the same server is running."""
+        with self._lock:
+            if tags_url in self._refreshing:
+                return
+            self._refreshing.add(tags_url)
+
+        def refresh_thread():
+            try:
+                models = self.refresh(http, tags_url, timeout)
+            except Exception:
+                models = None
+            finally:
+                with self._lock:
+                    self._refreshing.discard(tags_url)
+            if on_done is not None:
+                on_done(tags_url, models)
+
+        thread = threading.Thread(target=refresh_thread)
+        thread.daemon = True
+        thread.start()
+
+def _parse_tags_model(model):
+    """Keep the parts of an /api/tags entry that help pick a model."""
+    details = model.get("details") or {}
+    return {
+        "name": model.get("name") or model.get("model"),
+        "size": model.get("size"),
+        "family": details.get("family"),
+        "parameter_size": details.get("parameter_size"),
+        "quantization": details.get("quantization_level")
+    }
+
+def describe_remote_model(model):
+    """Return a short summary of an /api/tags entry, e.g. 'llama · 3.2B · Q4_K_M · 2.0 GB'."""
+    size = model.get("size")
+    parts = [
+        model.get("family"),
+        model.get("parameter_size"),
+        model.get("quantization"),
+        (f"{size / 1024 ** 3:.1f} GB" if size >= 1024 ** 3 else f"{size / 1024 ** 2:.0f} MB") if size else None
+    ]
+    return " · ".join(part for part in parts if part)
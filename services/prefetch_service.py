@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque, OrderedDict
+from models.config import DEFAULT_CONFIG
+from services.inference_worker import PRIORITY_BACKGROUND
+
+class CandidatePool:
+    """
+    Per-word pool of pre-generated, pre-validated alternate sentences.
+
+    A single low-priority background thread tops the pools up while the app is
+    idle, so the regenerate button can swap in a sentence without waiting on
+    the backend. Filling pauses while a foreground batch is running.
+    """
+
+    def __init__(self, api_service, settings_service=None):
+        self.api_service = api_service
+        self.settings_service = settings_service
+        self._pools = {}
+        self._total_bytes = 0
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._fill_loop, name="lexigen-prefetch")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _get_setting(self, key):
+        if not self.settings_service:
+            return DEFAULT_CONFIG[key]
+        return self.settings_service.get_int_setting(key)
+
+    def is_enabled(self):
+        """Return True if candidates should be prefetched for the current backend."""
+        if self.settings_service and not self.settings_service.get_settings("prefetch_enabled"):
+            return False
+        return self.api_service.server_connected
+
+    def _key(self, word, prompt_template):
+        # Candidates are only valid for the backend, model and prompt they were made with
+        return (self.api_service.api_url, self.api_service.model, word, prompt_template)
+
+    def take(self, word, prompt_template, exclude=None):
+        """Pop a pooled candidate for the word, or return None if the pool is empty."""
+        key = self._key(word, prompt_template)
+        with self._lock:
+            pool = self._pools.get(key)
+            while pool:
+                sentence = pool.popleft()
+                self._total_bytes -= len(sentence.encode("utf-8"))
+                if sentence != exclude:
+                    return sentence
+        return None
+
+    def fill(self, word, prompt_template):
+        """Queue a background top-up of the word's pool."""
+        self.fill_batch([word], prompt_template)
+
+    def fill_batch(self, words, prompt_template):
+        """Queue background top-ups for several words, in order."""
+        if not self.is_enabled():
+            return
+        with self._lock:
+            for word in words:
+                self._pending[self._key(word, prompt_template)] = (word, prompt_template)
+        self._wakeup.set()
+
+    def discard(self, word=None):
+        """Forget pooled candidates for one word, or for every word."""
+        with self._lock:
+            for key in list(self._pools):
+                if word is None or key[2] == word:
+                    for sentence in self._pools.pop(key):
+                        self._total_bytes -= len(sentence.encode("utf-8"))
+            for key in list(self._pending):
+                if word is None or key[2] == word:
+                    del self._pending[key]
+
+    def pause(self):
+        """Stop filling while foreground generation needs the backend."""
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def stop(self):
+        self._stopped = True
+        self._resumed.set()
+        self._wakeup.set()
+
+    def _next_job(self):
+        """Return the next (key, word, prompt_template) whose pool is below depth."""
+        depth = self._get_setting("prefetch_depth")
+        with self._lock:
+            while self._pending:
+                key, (word, prompt_template) = self._pending.popitem(last=False)
+                if len(self._pools.get(key, ())) < depth:
+                    return key, word, prompt_template
+        return None
+
+    def _fill_loop(self):
+        # Local completions for prefetching queue behind everything the user asked for
+        self.api_service.inference_worker.set_thread_priority(PRIORITY_BACKGROUND)
+        while not self._stopped:
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            while not self._stopped:
+                self._resumed.wait()
+                if self._stopped or not self.is_enabled():
+                    break
+                job = self._next_job()
+                if job is None:
+                    break
+                key, word, prompt_template = job
+                self._fill_one(key, word, prompt_template)
+
+    def _fill_one(self, key, word, prompt_template):
+        """Generate one candidate and pool it if it is valid and fits the memory cap."""
+        try:
+            # Alternates must not replace the cached sentence or skew the user-facing latencies
+            sentence = self.api_service.request_sentence(word, prompt_template, background=True)
+        except Exception:
+            # Prefetching is best effort; back off briefly and move on
+            time.sleep(1)
+            return
+
+        if not sentence or not self.api_service.is_valid_sentence(word, sentence):
+            return
+
+        depth = self._get_setting("prefetch_depth")
+        max_bytes = self._get_setting("prefetch_max_kb") * 1024
+        size = len(sentence.encode("utf-8"))
+        with self._lock:
+            pool = self._pools.setdefault(key, deque())
+            if sentence in pool or self._total_bytes + size > max_bytes:
+                return
+            pool.append(sentence)
+            self._total_bytes += size
+            # Keep going until the pool reaches its depth
+            if len(pool) < depth:
+                self._pending[key] = (word, prompt_template)
@@ -0,0 +1,214 @@
+import io
+import os
+import sys
+import time
+import logging
+import pstats
+import cProfile
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from models.config import DEFAULT_CONFIG, get_assets_path
+
+# Set to 1 to profile without touching settings.yaml, or to 0 to force profiling off
+PROFILE_ENV_VAR = "LEXIGEN_PROFILE"
+
+logger = logging.getLogger(__name__)
+
+_active = threading.local()
+_tracing_lock = threading.Lock()
+_tracing_sessions = 0
+# threading.setprofile is process-wide, so only one session follows new threads at a time
+_thread_hook_lock = threading.Lock()
+_thread_hook_session = None
+
+def is_profiling_enabled(settings_service=None):
+    """Return True if the LEXIGEN_PROFILE environment variable or the profiling_enabled setting asks for it."""
+    return bool(settings_service and settings_service.is_switch_enabled("profiling_enabled", PROFILE_ENV_VAR))
+
+def get_profiles_path():
+    return os.path.join(get_assets_path(), "profiles")
+
+class ProfileSession:
+    """
+    cProfile and tracemalloc recording of one slow operation, written to the assets folder.
+
+    cProfile follows the thread that starts the session; work handed to other
+    threads shows up as waiting, unless all_threads is set: then every thread
+    started while the session runs gets its own profiler, merged into the
+    session's at stop(). tracemalloc sees allocations from every thread.
+    stop() writes <timestamp>_<name>.prof, loadable with pstats or snakeviz,
+    and a .txt summary with the top functions and allocation sites.
+    """
+
+    def __init__(self, name, top_n=None, all_threads=False):
+        self.name = name
+        self.top_n = top_n or DEFAULT_CONFIG["profile_top_n"]
+        self.all_threads = all_threads
+        self.profiler = None
+        self._started = None
+        self._snapshot = None
+        self._thread_profilers = []
+        self._thread_profilers_lock = threading.Lock()
+
+    def start(self):
+        # A second profiler on the same thread would silently replace the first one
+        if getattr(_active, "session", None) is not None:
+            return self
+        _active.session = self
+
+        tracing = False
+        try:
+            _acquire_tracing()
+            tracing = True
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+
+            self._started = time.perf_counter()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            if self.all_threads:
+                _install_thread_hook(self)
+        except Exception as e:
+            # Profiling must never break the operation it measures. On Python 3.12+
+            # cProfile refuses to start while another thread's profiler is active.
+            logger.warning("Could not start profiling %s: %s", self.name, e)
+            self.profiler = None
+            _active.session = None
+            _remove_thread_hook(self)
+            if tracing:
+                _release_tracing()
+        return self
+
+    def _profile_thread(self, frame, event, arg):
+        """Profile hook of threads started during the session; hands the thread to a profiler of its own."""
+        sys.setprofile(None)
+        if self.profiler is None:
+            return
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        except Exception:
+            # Python 3.12+ runs one profiler at a time, and the session's already sees every thread
+            return
+        with self._thread_profilers_lock:
+            self._thread_profilers.append(profiler)
+
+    def stop(self):
+        """Stop recording and write the profile; returns the summary path, or None."""
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        elapsed = time.perf_counter() - self._started
+        _active.session = None
+        _remove_thread_hook(self)
+        with self._thread_profilers_lock:
+            thread_profilers, self._thread_profilers = self._thread_profilers, []
+
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        _release_tracing()
+
+        try:
+            return self._write(elapsed, peak, snapshot, thread_profilers)
+        except OSError as e:
+            # Profiling must never break the operation it measures
+            logger.warning("Could not write profile for %s: %s", self.name, e)
+            return None
+        finally:
+            self.profiler = None
+
+    def _write(self, elapsed, peak, snapshot, thread_profilers):
+        output_dir = get_profiles_path()
+        os.makedirs(output_dir, exist_ok=True)
+        base_path = os.path.join(output_dir, f"{datetime.now():%Y%m%d_%H%M%S}_{self.name}")
+
+        stats_text = io.StringIO()
+        stats = pstats.Stats(self.profiler, *thread_profilers, stream=stats_text)
+        stats.dump_stats(base_path + ".prof")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+
+        # Leave out what profiling itself allocated
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        allocations = snapshot.filter_traces(ignore).compare_to(self._snapshot.filter_traces(ignore),
+                                                                "lineno")[:self.top_n]
+        lines = [
+            f"Operation: {self.name}",
+            f"Wall time: {elapsed:.3f} s",
+            f"Threads profiled: {1 + len(thread_profilers)}",
+            f"Peak traced memory: {peak / 1024:.0f} KB",
+            "",
+            f"Top {self.top_n} allocation sites (net change):"
+        ]
+        lines.extend(f"  {statistic}" for statistic in allocations)
+        lines.extend(["", f"Top {self.top_n} functions by cumulative time:", stats_text.getvalue()])
+
+        summary_path = base_path + ".txt"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        logger.info("Profile of %s written to %s", self.name, summary_path)
+        return summary_path
+
+def _install_thread_hook(session):
+    """Have threads started from now on profiled into session, unless another session already is."""
+    global _thread_hook_session
+    with _thread_hook_lock:
+        if _thread_hook_session is None:
+            _thread_hook_session = session
+            threading.setprofile(session._profile_thread)
+
+def _remove_thread_hook(session):
+    global _thread_hook_session
+    with _thread_hook_lock:
+        if _thread_hook_session is session:
+            _thread_hook_session = None
+            threading.setprofile(None)
+
+def _acquire_tracing():
+    """Start tracemalloc for the first active session."""
+    global _tracing_sessions
+    with _tracing_lock:
+        if _tracing_sessions == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_sessions += 1
+
+def _release_tracing():
+    """Stop tracemalloc once the last active session is over."""
+    global _tracing_sessions
+    with _tracing_lock:
+        _tracing_sessions -= 1
+        if _tracing_sessions == 0:
+            tracemalloc.stop()
+
+def start_profile(name, settings_service=None, all_threads=False):
+    """Start a session if profiling is enabled and return it, else return None."""
+    if not is_profiling_enabled(settings_service):
+        return None
+    return ProfileSession(name, max(1, settings_service.get_int_setting("profile_top_n")), all_threads).start()
+
+@contextmanager
+def profile_session(name, settings_service=None):
+    """Profile the enclosed block if profiling is enabled."""
+    session = start_profile(name, settings_service)
+    try:
+        yield session
+    finally:
+        if session is not None:
+            session.stop()
+
+def profiled(name, get_settings_service=None):
+    """
+    Decorate a method so every call runs in a profile session when profiling is enabled.
+
+    get_settings_service(self) returns the settings service to read the flag from.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            settings_service = get_settings_service(args[0]) if get_settings_service and args else None
+            with profile_session(name, settings_service):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
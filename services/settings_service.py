@@ -92,4 +92,30 @@ class SettingsService:
     
     def get_settings(self, key):
         """Get a setting value by key (no default, for strict access)."""
-        return self.settings.get(key) 
\ No newline at end of file
+        return self.settings.get(key) 
+
+    def get_int_setting(self, key):
+        """Get an integer setting, falling back to the default if it is missing or invalid."""
+        try:
+            return int(self.get_settings(key))
+        except (TypeError, ValueError):
+            return DEFAULT_CONFIG[key]
+
+    def get_float_setting(self, key):
+        """Get a numeric setting, falling back to the default if it is missing or invalid."""
+        try:
+            return float(self.get_settings(key))
+        except (TypeError, ValueError):
+            return DEFAULT_CONFIG[key]
+
+    def is_switch_enabled(self, key, env_var):
+        """
+        Return True if the env_var environment variable or, when it is unset, the key setting is on.
+
+        The variable turns a diagnostic on without touching settings.yaml, or
+        forces it off with 0, false, no or off.
+        """
+        value = os.environ.get(env_var, "").strip().lower()
+        if value:
+            return value not in ("0", "false", "no", "off")
+        return bool(self.get_settings(key))
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from models.config import get_assets_path
+
+# Overrides the tracing_enabled setting when set
+TRACE_ENV_VAR = "LEXIGEN_TRACE"
+
+_current_span = contextvars.ContextVar("lexigen_current_span", default=None)
+
+class Span:
+    """One timed pipeline stage. Ending it writes one JSON line to the trace log."""
+
+    def __init__(self, tracer, name, parent=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = tracer.new_id()
+        self.parent_id = parent.span_id if parent is not None else None
+        # Spans without a parent start a new trace, e.g. one worksheet run
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self._ended = False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, **attributes):
+        if self._ended:
+            return
+        self._ended = True
+        self.attributes.update(attributes)
+        self.tracer.write({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": (time.perf_counter() - self._started) * 1000,
+            "thread": threading.current_thread().name,
+            "attributes": self.attributes
+        })
+
+class Tracer:
+    """
+    Writes pipeline stage timings as JSON lines, one span per line.
+
+    Spans carry trace, span and parent IDs and their duration, so one worksheet
+    run can be rebuilt as a timeline. The current span follows the code through
+    with-blocks on one thread; work handed to another thread passes its parent
+    explicitly or runs in a copied context. While disabled, spans cost one
+    attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._file = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def configure(self, settings_service=None):
+        """Enable tracing from LEXIGEN_TRACE or the tracing_enabled setting."""
+        enabled = bool(settings_service and settings_service.is_switch_enabled("tracing_enabled", TRACE_ENV_VAR))
+        if enabled and not self.enabled:
+            trace_dir = os.path.join(get_assets_path(), "traces")
+            self.path = os.path.join(trace_dir, f"trace_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}.jsonl")
+        elif not enabled:
+            self.close()
+        self.enabled = enabled
+
+    def new_id(self):
+        return f"{os.getpid():x}-{next(self._ids):x}"
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+                self._file.write(line + "\n")
+            except OSError:
+                # Tracing must never break the pipeline it observes
+                self.enabled = False
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def start_span(self, name, parent=None, **attributes):
+        """Start a span that is ended explicitly, e.g. across Tk callbacks; returns None while disabled."""
+        if not self.enabled:
+            return None
+        return Span(self, name, parent if parent is not None else _current_span.get(), attributes)
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        """Time the enclosed block as a child of parent, or of the current span."""
+        if not self.enabled:
+            yield None
+            return
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def event(self, name, **attributes):
+        """Record a point in time, such as a status check outcome, as a zero-length span."""
+        if self.enabled:
+            self.start_span(name, **attributes).end()
+
+tracer = Tracer()
+
+def current_span():
+    return _current_span.get()
@@ -13,6 +13,10 @@ import tkinter as tk
 from models.config import VERSION, get_assets_path
 from models.translations import get_translation
 
+# (connect, read) timeouts so an unreachable GitHub never hangs the app
+UPDATE_CHECK_TIMEOUT = (5, 10)
+UPDATE_DOWNLOAD_TIMEOUT = (5, 60)
+
 class UpdateService:
     def __init__(self, language="English"):
         self.language = language
@@ -38,7 +42,8 @@ class UpdateService:
             string: Status of the update check ("new_version", "up_to_date", or "error")
         """
         try:
-            response = requests.get("https://api.github.com/repos/gitmichaelqiu/LexiGen/releases/latest")
+            response = requests.get("https://api.github.com/repos/gitmichaelqiu/LexiGen/releases/latest",
+                                    timeout=UPDATE_CHECK_TIMEOUT)
             if response.status_code == 200:
                 release_data = response.json()
                 self.latest_version = release_data["tag_name"].lstrip('v')
@@ -184,7 +189,7 @@ class UpdateService:
             self.downloaded_file = temp_file.name
             
             # Download with progress updates
-            response = requests.get(self.download_url, stream=True)
+            response = requests.get(self.download_url, stream=True, timeout=UPDATE_DOWNLOAD_TIMEOUT)
             total_size = int(response.headers.get('content-length', 0))
             block_size = 1024  # 1 Kibibyte
             downloaded = 0
@@ -0,0 +1,297 @@
+import json
+from collections import OrderedDict
+import threading
+import time
+import random
+import pytest
+from services.api_service import APIService
+from services.hedge_policy import HedgePolicy
+from services.inference_worker import InferenceWorker
+from services.metrics_service import MetricsRegistry
+from services.settings_service import SettingsService
+
+class FakeModel:
+    def __init__(self, model_path):
+        self.model_path = model_path
+
+class FakeKVModel(FakeModel):
+    """A local model whose prompt tokens are its words."""
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        self.saved = 0
+        self.loaded = 0
+
+    def tokenize(self, text):
+        return text.split()
+
+    def n_ctx(self):
+        return 4096
+
+    def reset(self):
+        pass
+
+    def eval(self, tokens):
+        pass
+
+    def save_state(self):
+        self.saved += 1
+        return FakeState()
+
+    def load_state(self, state):
+        self.loaded += 1
+
+class FakeState:
+    llama_state_size = 1024
+
+class FakeWordProcessor:
+    def get_word_stem(self, word):
+        return word.lower().strip(".,!?")
+
+class FakeResponse:
+    """A completion from Ollama; streamed, it sends one NDJSON line every delay seconds."""
+
+    def __init__(self, text, delay=0, lines=None):
+        self.text = text
+        self.delay = delay
+        self.lines = lines if lines is not None else stream_lines(*text.split(" "))
+        self.status_code = 200
+        self.raw = None
+        self.closed = threading.Event()
+        self.sent = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"response": self.text, "done": True}
+
+    def iter_lines(self):
+        for line in self.lines:
+            if self.closed.wait(self.delay):
+                raise OSError("response closed")
+            self.sent += 1
+            yield line.encode("utf-8")
+
+    def close(self):
+        self.closed.set()
+
+class FakeSession:
+    """Answers every completion request with the response respond(payload) returns."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.payloads = []
+        self.responses = []
+        self._lock = threading.Lock()
+
+    def post(self, url, **kwargs):
+        response = self.respond(kwargs["json"])
+        with self._lock:
+            self.payloads.append(kwargs["json"])
+            self.responses.append(response)
+        return response
+
+    def close(self):
+        pass
+
+def stream_lines(*words):
+    pieces = [word + " " for word in words[:-1]] + list(words[-1:])
+    return [json.dumps({"response": piece, "done": False}) for piece in pieces] + [json.dumps({"done": True})]
+
+def make_remote_service(tmp_path, respond, **settings):
+    settings_service = SettingsService(str(tmp_path / "settings.yaml"))
+    settings_service.settings.update(response_cache_enabled=False, **settings)
+    service = APIService("English", "http://ollama/api/generate", settings_service, FakeWordProcessor())
+    service.http = FakeSession(respond)
+    return service
+
+def make_service():
+    # Only what the methods under test use; the full constructor opens caches in the assets folder
+    service = APIService.__new__(APIService)
+    service.language = "English"
+    service.settings_service = None
+    service.model = "a.gguf"
+    service.metrics = MetricsRegistry()
+    return service
+
+def make_local_service():
+    service = make_service()
+    service._prefix_states = OrderedDict()
+    service._prefix_states_bytes = 0
+    return service
+
+def parse(words, entries):
+    return make_service()._parse_sentence_group(words, json.dumps({"sentences": entries}))
+
+def test_group_entries_map_to_their_words():
+    sentences = parse(["run", "walk"], [
+        {"word": "walk", "sentence": "We walk home."},
+        {"word": "Run", "sentence": "They run fast."},
+    ])
+    assert sentences == {0: "They run fast.", 1: "We walk home."}
+
+def test_mangled_word_falls_back_to_task_order():
+    sentences = parse(["run", "walk"], [
+        {"word": "running", "sentence": "They run fast."},
+        {"word": "walk", "sentence": "We walk home."},
+    ])
+    assert sentences == {0: "They run fast.", 1: "We walk home."}
+
+def test_labelled_entry_wins_over_positional_fallback():
+    sentences = parse(["run", "walk"], [
+        {"word": "xx", "sentence": "Something else."},
+        {"word": "run", "sentence": "B run."},
+    ])
+    assert sentences == {0: "B run."}
+
+def test_repeated_words_fill_their_slots_in_order():
+    sentences = parse(["run", "run"], [
+        {"word": "run", "sentence": "First run."},
+        {"word": "run", "sentence": "Second run."},
+    ])
+    assert sentences == {0: "First run.", 1: "Second run."}
+
+@pytest.mark.parametrize("response_text", ["not json", None, json.dumps({"sentences": "x"}), json.dumps([1, "a"])])
+def test_malformed_responses_give_no_sentences(response_text):
+    assert make_service()._parse_sentence_group(["run"], response_text) == {}
+
+def test_bare_list_and_blank_sentences():
+    sentences = make_service()._parse_sentence_group(["run", "walk"], json.dumps([
+        {"word": "run", "sentence": "  "},
+        {"word": "walk", "sentence": "We walk."},
+    ]))
+    assert sentences == {1: "We walk."}
+
+def test_short_prefix_is_left_to_llama_cpp_prefix_matching():
+    service = make_local_service()
+    model = FakeKVModel("a.gguf")
+    for _ in range(3):
+        service._load_prefix_state(model, "Write one sentence for the word.")
+
+    assert model.saved == 0
+    assert not service._prefix_states
+
+def test_long_prefix_state_is_saved_once_and_reused():
+    service = make_local_service()
+    model = FakeKVModel("a.gguf")
+    prefix = " ".join(["context"] * 300)
+    for _ in range(3):
+        service._load_prefix_state(model, prefix)
+
+    assert (model.saved, model.loaded) == (1, 2)
+
+def test_streaming_generation_fails_instead_of_hanging_when_idle_reload_fails():
+    service = make_service()
+    service.inference_worker = InferenceWorker()
+    model_file_exists = [True]
+
+    def load():
+        if not model_file_exists[0]:
+            raise FileNotFoundError("a.gguf")
+        return FakeModel("a.gguf")
+
+    service.inference_worker.idle_timeout = 0.05
+    service.inference_worker.swap_model("a.gguf", load).result(timeout=2)
+    deadline = time.monotonic() + 2
+    while service.inference_worker.model is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    model_file_exists[0] = False
+
+    outcome = []
+
+    def generate():
+        try:
+            service._generate_local("prompt", on_partial=lambda text: None)
+        except Exception as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=generate, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert isinstance(outcome[0], FileNotFoundError)
+
+def test_http_pool_holds_every_request_adaptive_concurrency_allows(tmp_path):
+    service = make_remote_service(tmp_path, None, adaptive_concurrency=True, adaptive_concurrency_max=16,
+                                  parallel_candidates=3)
+    assert service._create_http_session().get_adapter("http://ollama")._pool_maxsize == 16 * 3 + 1
+
+def test_streamed_completion_reports_the_text_so_far(tmp_path):
+    service = make_remote_service(tmp_path, lambda payload: FakeResponse("We run home."))
+    partials = []
+    assert service.generate_text("prompt", on_partial=partials.append) == "We run home."
+    assert partials == ["We", "We run", "We run home."]
+    assert service.http.payloads[0]["stream"] is True
+
+def test_stream_stops_reading_at_the_done_chunk(tmp_path):
+    lines = stream_lines("Done.") + ["not json"]
+    service = make_remote_service(tmp_path, lambda payload: FakeResponse("Done.", lines=lines))
+    assert service.generate_text("prompt", on_partial=lambda text: None) == "Done."
+
+def test_stream_error_chunk_raises(tmp_path):
+    lines = [json.dumps({"error": "model not found"})]
+    service = make_remote_service(tmp_path, lambda payload: FakeResponse("", lines=lines))
+    with pytest.raises(RuntimeError, match="model not found"):
+        service.generate_text("prompt", on_partial=lambda text: None)
+
+def test_disabled_streaming_sends_one_plain_request(tmp_path):
+    service = make_remote_service(tmp_path, lambda payload: FakeResponse("We run home."), stream_generation=False)
+    partials = []
+    assert service.generate_text("prompt", on_partial=partials.append) == "We run home."
+    assert partials == []
+    assert service.http.payloads[0]["stream"] is False
+
+def test_first_valid_candidate_wins_and_the_rest_are_cancelled(tmp_path, monkeypatch):
+    monkeypatch.setattr(random, "randrange", lambda stop: 100)
+    answers = {
+        100: FakeResponse("Nothing to see."),
+        101: FakeResponse("We run home.", delay=0.05),
+        102: FakeResponse("They run late.", delay=0.5),
+    }
+    service = make_remote_service(tmp_path, lambda payload: answers[payload["options"]["seed"]],
+                                  parallel_candidates=3)
+
+    started = time.monotonic()
+    assert service.request_sentence("run", "Use {word}.") == "We run home."
+    assert time.monotonic() - started < 2
+    assert sorted(payload["options"]["seed"] for payload in service.http.payloads) == [100, 101, 102]
+    assert answers[102].closed.wait(2)
+    assert answers[102].sent < len(answers[102].lines)
+
+def test_first_completed_candidate_is_kept_when_none_is_valid(tmp_path, monkeypatch):
+    monkeypatch.setattr(random, "randrange", lambda stop: 100)
+    answers = {100: FakeResponse("Nothing to see.", delay=0.1), 101: FakeResponse("Still nothing.")}
+    service = make_remote_service(tmp_path, lambda payload: answers[payload["options"]["seed"]],
+                                  parallel_candidates=2)
+    assert service.request_sentence("run", "Use {word}.") == "Still nothing."
+
+def test_slow_generation_is_hedged_and_the_loser_cancelled(tmp_path, monkeypatch):
+    monkeypatch.setattr(random, "randrange", lambda stop: 100)
+    answers = {100: FakeResponse("They run late.", delay=5), 101: FakeResponse("We run home.")}
+    service = make_remote_service(tmp_path, lambda payload: answers[payload["options"]["seed"]],
+                                  hedge_requests=True)
+    service.hedge_policy = HedgePolicy(min_samples=1)
+    service.hedge_policy.record(0.05)
+
+    assert service.request_sentence("run", "Use {word}.") == "We run home."
+    assert answers[100].closed.wait(2)
+    assert answers[100].sent == 0
+    stats = service.hedge_policy.stats()
+    assert (stats["hedges"], stats["hedge_wins"]) == (1, 1)
+
+def test_fast_generation_is_not_hedged(tmp_path, monkeypatch):
+    monkeypatch.setattr(random, "randrange", lambda stop: 100)
+    service = make_remote_service(tmp_path, lambda payload: FakeResponse("We run home."), hedge_requests=True)
+    service.hedge_policy = HedgePolicy(min_samples=1)
+    service.hedge_policy.record(5)
+
+    assert service.request_sentence("run", "Use {word}.") == "We run home."
+    assert len(service.http.payloads) == 1
+    assert service.hedge_policy.stats()["hedges"] == 0
@@ -0,0 +1,99 @@
+import threading
+import time
+from services.cache_service import ResponseCache
+
+def make_cache(tmp_path, max_bytes=1024):
+    return ResponseCache(str(tmp_path / "cache" / "responses.sqlite3"), max_bytes)
+
+def test_put_then_get_counts_hits_and_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    key = ResponseCache.make_key("local", "model.gguf", "prompt", {"temperature": 0.7})
+    assert cache.get(key) is None
+    cache.put(key, "A sentence.")
+    assert cache.get(key) == "A sentence."
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    cache.close()
+
+def test_key_covers_every_input():
+    key = ResponseCache.make_key("local", "m", "p", {"seed": 1})
+    assert key == ResponseCache.make_key("local", "m", "p", {"seed": 1})
+    assert key != ResponseCache.make_key("local", "m", "p", {"seed": 2})
+    assert key != ResponseCache.make_key("remote", "m", "p", {"seed": 1})
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=20)
+    cache.put("a", "x" * 8)
+    cache.put("b", "y" * 8)
+    assert cache.get("a") == "x" * 8  # a is now more recent than b
+    cache.put("c", "z" * 8)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 8
+    assert cache.stats()["bytes"] <= 20
+    cache.close()
+
+def test_oversized_and_empty_values_are_not_stored(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=4)
+    cache.put("big", "too long")
+    cache.put("empty", "")
+    assert cache.get("big") is None
+    assert cache.get("empty") is None
+    cache.close()
+
+def test_entries_survive_reopening(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("key", "value")
+    cache.close()
+    reopened = make_cache(tmp_path)
+    assert reopened.get("key") == "value"
+    assert reopened.stats()["bytes"] == len("value")
+    reopened.close()
+
+def test_hits_are_written_with_the_next_put(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", "value")
+    changes = cache._conn.total_changes
+    for _ in range(10):
+        assert cache.get("a") == "value"
+    assert cache._conn.total_changes == changes
+    cache.put("b", "value")
+    assert cache._conn.total_changes == changes + 2
+    cache.close()
+
+def test_recency_of_hits_survives_reopening(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=20)
+    cache.put("a", "x" * 8)
+    cache.put("b", "y" * 8)
+    assert cache.get("a") == "x" * 8
+    cache.close()
+    reopened = make_cache(tmp_path, max_bytes=20)
+    reopened.put("c", "z" * 8)
+    assert reopened.get("b") is None
+    assert reopened.get("a") == "x" * 8
+    reopened.close()
+
+def test_calls_that_race_close_return_quietly(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("key", "value")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("key"))),
+               threading.Thread(target=lambda: results.append(cache.put("other", "value")))]
+    with cache._lock:
+        for thread in threads:
+            thread.start()
+        # Both calls are past the availability check and waiting for the lock when close() runs
+        time.sleep(0.1)
+        cache._conn.close()
+        cache._conn = None
+    for thread in threads:
+        thread.join(2)
+    assert results == [None, None]
+    cache.close()
+
+def test_unwritable_location_disables_the_cache(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = ResponseCache(str(blocker / "responses.sqlite3"), 1024)
+    assert not cache.available
+    cache.put("key", "value")
+    assert cache.get("key") is None
@@ -0,0 +1,67 @@
+import threading
+import time
+import pytest
+from services.concurrency_limiter import AdaptiveConcurrencyLimiter
+from services.generation_job import GenerationJob, GenerationCancelled
+
+def test_steady_latency_grows_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(2, 10)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(latency=0.01)
+    assert limiter.get_limit() > 2
+    assert limiter.get_limit() <= 10
+
+def test_failure_halves_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(8, 10)
+    limiter.acquire()
+    limiter.release(failed=True)
+    assert limiter.get_limit() == 4
+
+def test_rising_latency_shrinks_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(8, 10)
+    limiter.acquire()
+    limiter.release(latency=0.01)
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(latency=1.0)
+    assert limiter.get_limit() < 8
+
+def test_release_without_latency_leaves_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(3, 10)
+    limiter.acquire()
+    limiter.release()
+    assert limiter.get_limit() == 3
+    assert limiter.stats()["in_flight"] == 0
+
+def test_acquire_waits_for_a_free_slot():
+    limiter = AdaptiveConcurrencyLimiter(1, 1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def waiter():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=waiter, daemon=True)
+    thread.start()
+    assert not acquired.wait(0.2)
+    limiter.release()
+    assert acquired.wait(2)
+
+def test_acquire_without_waiting_goes_over_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(1, 1)
+    limiter.acquire()
+    limiter.acquire(wait=False)
+    assert limiter.stats()["in_flight"] == 2
+
+def test_cancelled_job_stops_waiting():
+    limiter = AdaptiveConcurrencyLimiter(1, 1)
+    limiter.acquire()
+    job = GenerationJob()
+    threading.Timer(0.05, job.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(GenerationCancelled):
+        limiter.acquire(job)
+    assert time.monotonic() - started < 2
+    assert limiter.stats()["in_flight"] == 1
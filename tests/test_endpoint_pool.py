@@ -0,0 +1,60 @@
+from services import endpoint_pool
+from services.endpoint_pool import EndpointPool, DISPATCH_ROUND_ROBIN
+
+URLS = ["http://a/api/generate", "http://b/api/generate"]
+
+def test_least_loaded_spreads_requests():
+    pool = EndpointPool(URLS)
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.url, second.url} == set(URLS)
+
+def test_failover_skips_tried_and_failed_endpoints():
+    pool = EndpointPool(URLS)
+    endpoint = pool.acquire()
+    pool.release(endpoint, failed=True)
+    other = pool.acquire(exclude=[endpoint])
+    assert other is not endpoint
+    pool.release(other)
+
+    # The failed endpoint sits out its retry delay
+    for _ in range(4):
+        picked = pool.acquire()
+        assert picked is other
+        pool.release(picked)
+
+def test_exhausted_pool_returns_none():
+    pool = EndpointPool(URLS)
+    assert pool.acquire(exclude=pool.get_endpoints()) is None
+    assert EndpointPool().acquire() is None
+
+def test_every_endpoint_down_still_dispatches():
+    pool = EndpointPool(URLS)
+    for endpoint in pool.get_endpoints():
+        pool.mark(endpoint, False)
+    assert pool.acquire() is not None
+
+def test_failed_endpoint_comes_back_after_retry_delay(monkeypatch):
+    pool = EndpointPool(URLS, dispatch=DISPATCH_ROUND_ROBIN)
+    failed = pool.get_endpoints()[0]
+    pool.mark(failed, False)
+    monkeypatch.setattr(endpoint_pool.time, "monotonic", lambda: failed.retry_at + 1)
+    picked = {pool.acquire().url for _ in range(4)}
+    assert failed.url in picked
+
+def test_release_without_outcome_keeps_health():
+    pool = EndpointPool(URLS)
+    endpoint = pool.acquire()
+    pool.mark(endpoint, False)
+    pool.release(endpoint, failed=None)
+    stats = {entry["url"]: entry for entry in pool.stats()}
+    assert stats[endpoint.url]["healthy"] is False
+    assert stats[endpoint.url]["in_flight"] == 0
+
+def test_set_endpoints_keeps_state_of_remaining_urls():
+    pool = EndpointPool(URLS)
+    kept = pool.get_endpoints()[1]
+    pool.mark(kept, False)
+    pool.set_endpoints([URLS[1], "http://c/api/generate"])
+    assert pool.get_endpoints()[0] is kept
+    assert len(pool) == 2
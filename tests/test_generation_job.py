@@ -0,0 +1,77 @@
+import time
+import pytest
+from services.generation_job import GenerationJob, GenerationCancelled
+
+def test_cancel_runs_callbacks_once_and_check_raises():
+    job = GenerationJob()
+    calls = []
+    job.on_cancel(lambda: calls.append("abort"))
+    job.check()
+
+    job.cancel()
+    job.cancel()
+    assert job.is_cancelled()
+    assert calls == ["abort"]
+    with pytest.raises(GenerationCancelled):
+        job.check()
+
+def test_on_cancel_after_cancel_runs_immediately():
+    job = GenerationJob()
+    job.cancel()
+    calls = []
+    job.on_cancel(lambda: calls.append("abort"))
+    assert calls == ["abort"]
+
+def test_detached_callback_is_not_called():
+    job = GenerationJob()
+    calls = []
+    detach = job.on_cancel(lambda: calls.append("abort"))
+    detach()
+    job.cancel()
+    assert calls == []
+
+def test_failing_callback_does_not_stop_the_others():
+    job = GenerationJob()
+    calls = []
+    job.on_cancel(lambda: 1 / 0)
+    job.on_cancel(lambda: calls.append("abort"))
+    job.cancel()
+    assert calls == ["abort"]
+
+def test_deadline_cancels_and_marks_expired():
+    job = GenerationJob(timeout=0.05)
+    deadline = time.monotonic() + 2
+    while not job.is_cancelled() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.is_cancelled()
+    assert job.expired
+
+def test_finish_stops_the_deadline_timer():
+    job = GenerationJob(timeout=0.05)
+    job.finish()
+    time.sleep(0.15)
+    assert not job.is_cancelled()
+
+def test_child_follows_parent_cancel_and_deadline():
+    parent = GenerationJob(timeout=60)
+    child = GenerationJob(parent=parent)
+    assert child.deadline == parent.deadline
+
+    parent.cancel()
+    assert child.is_cancelled()
+    parent.finish()
+
+def test_finished_child_is_detached_from_parent():
+    parent = GenerationJob()
+    child = GenerationJob(parent=parent)
+    child.finish()
+    parent.cancel()
+    assert not child.is_cancelled()
+
+def test_get_timeout_is_capped_by_the_deadline():
+    job = GenerationJob(timeout=5)
+    connect_timeout, read_timeout = job.get_timeout((10, 300))
+    assert connect_timeout <= 6.1
+    assert read_timeout <= 6.1
+    assert GenerationJob().get_timeout((10, 300)) == (10, 300)
+    job.finish()
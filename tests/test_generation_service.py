@@ -0,0 +1,84 @@
+import threading
+import time
+from services.generation_job import GenerationJob, GenerationCancelled
+from services.generation_service import GenerationService
+
+class FakeAPIService:
+    using_local_model = False
+    concurrency_limiter = None
+
+    def __init__(self, delays=None, sentences=None):
+        self.delays = delays or {}
+        self.sentences = sentences or {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_endpoint_count(self):
+        return 1
+
+    def request_sentence(self, word, prompt_template, **options):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delays.get(word, 0))
+            sentence = self.sentences.get(word, f"A {word} sentence.")
+            if isinstance(sentence, Exception):
+                raise sentence
+            return sentence
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+def test_results_keep_input_order_when_words_finish_out_of_order():
+    api_service = FakeAPIService(delays={"slow": 0.2, "middle": 0.1})
+    finished = []
+    results = GenerationService(api_service).generate_batch(
+        ["slow", "middle", "fast"], "{word}",
+        on_progress=lambda index, word, sentence, error: finished.append(word))
+
+    assert [result[0] for result in results] == ["slow", "middle", "fast"]
+    assert [result[1] for result in results] == ["A slow sentence.", "A middle sentence.", "A fast sentence."]
+    assert finished == ["fast", "middle", "slow"]
+    assert api_service.peak_in_flight == 3
+
+def test_failures_and_empty_responses_are_reported_per_word():
+    error = RuntimeError("server down")
+    api_service = FakeAPIService(sentences={"bad": error, "empty": ""})
+    results = GenerationService(api_service).generate_batch(["good", "bad", "empty"], "{word}")
+
+    assert results[0] == ("good", "A good sentence.", None)
+    assert results[1] == ("bad", None, error)
+    assert isinstance(results[2][2], ValueError)
+
+def test_local_model_generates_one_word_at_a_time():
+    api_service = FakeAPIService(delays={"a": 0.05, "b": 0.05, "c": 0.05})
+    api_service.using_local_model = True
+    service = GenerationService(api_service)
+
+    assert service.get_max_workers() == 1
+    service.generate_batch(["a", "b", "c"], "{word}")
+    assert api_service.peak_in_flight == 1
+
+def test_empty_batch_returns_no_results():
+    assert GenerationService(FakeAPIService()).generate_batch([], "{word}") == []
+
+def test_cancelled_job_fails_the_words_that_are_not_done():
+    job = GenerationJob()
+    api_service = FakeAPIService(sentences={"second": "A second sentence."})
+    api_service.using_local_model = True
+    original_request = api_service.request_sentence
+
+    def request_sentence(word, prompt_template, **options):
+        sentence = original_request(word, prompt_template, **options)
+        if word == "second":
+            job.cancel()
+        return sentence
+
+    api_service.request_sentence = request_sentence
+    results = GenerationService(api_service).generate_batch(["first", "second", "third", "fourth"], "{word}",
+                                                            job=job)
+
+    assert [result[1] for result in results[:2]] == ["A first sentence.", "A second sentence."]
+    assert all(isinstance(result[2], GenerationCancelled) for result in results[2:])
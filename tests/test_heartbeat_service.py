@@ -0,0 +1,101 @@
+from services import heartbeat_service
+from services.heartbeat_service import ServerHeartbeat
+from services.settings_service import SettingsService
+
+class FakeAPIService:
+    api_url = "http://ollama/api/generate"
+    using_local_model = False
+    server_connected = None
+
+    def __init__(self):
+        self.up = True
+
+    def probe_server(self):
+        if not self.up:
+            raise ConnectionError("refused")
+        return "0.5.0", 0.01
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_heartbeat(tmp_path, on_change=None):
+    settings_service = SettingsService(str(tmp_path / "settings.yaml"))
+    settings_service.settings.update(heartbeat_interval=10, heartbeat_max_interval=60)
+    return ServerHeartbeat(FakeAPIService(), settings_service, on_change)
+
+def test_interval_backs_off_while_the_server_is_down(tmp_path):
+    heartbeat = make_heartbeat(tmp_path)
+    url = heartbeat.api_service.api_url
+    heartbeat.api_service.up = False
+    intervals = []
+    for _ in range(4):
+        heartbeat._probe(url)
+        intervals.append(heartbeat._get_interval())
+    assert intervals == [20, 40, 60, 60]
+
+    heartbeat.api_service.up = True
+    heartbeat._probe(url)
+    assert heartbeat._get_interval() == 10
+
+def test_check_now_probes_at_the_base_interval_again(tmp_path):
+    heartbeat = make_heartbeat(tmp_path)
+    heartbeat.api_service.up = False
+    heartbeat._probe(heartbeat.api_service.api_url)
+    heartbeat.check_now()
+    assert heartbeat._get_interval() == 10
+
+def test_changes_are_reported_once(tmp_path):
+    changes = []
+    heartbeat = make_heartbeat(tmp_path, lambda url, connected: changes.append(connected))
+    url = heartbeat.api_service.api_url
+    for up in (True, True, False, False, True):
+        heartbeat.api_service.up = up
+        heartbeat._probe(url)
+    assert changes == [True, False, True]
+    assert heartbeat.api_service.server_connected is True
+    assert heartbeat.get_cached_status() is True
+    assert heartbeat.get_cached_status("http://other/api/generate") is None
+
+def test_result_of_a_changed_url_is_cached_but_not_reported(tmp_path):
+    changes = []
+    heartbeat = make_heartbeat(tmp_path, lambda url, connected: changes.append(connected))
+    heartbeat._probe("http://old/api/generate")
+    assert changes == []
+    assert heartbeat.api_service.server_connected is None
+    assert heartbeat.get_cached_status("http://old/api/generate") is True
+
+def test_cached_status_expires_after_a_few_intervals(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(heartbeat_service.time, "monotonic", clock)
+    heartbeat = make_heartbeat(tmp_path)
+    heartbeat._probe(heartbeat.api_service.api_url)
+
+    clock.now += 10 * heartbeat_service.HEALTH_TTL_INTERVALS - 1
+    assert heartbeat.get_cached_status() is True
+    clock.now += 2
+    assert heartbeat.get_cached_status() is None
+
+def test_backed_off_result_lives_as_long_as_its_interval(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(heartbeat_service.time, "monotonic", clock)
+    heartbeat = make_heartbeat(tmp_path)
+    heartbeat.api_service.up = False
+    for _ in range(3):
+        heartbeat._probe(heartbeat.api_service.api_url)
+
+    clock.now += 60 * heartbeat_service.HEALTH_TTL_INTERVALS - 1
+    assert heartbeat.get_cached_status() is False
+
+def test_stale_result_is_reported_again(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(heartbeat_service.time, "monotonic", clock)
+    changes = []
+    heartbeat = make_heartbeat(tmp_path, lambda url, connected: changes.append(connected))
+    heartbeat._probe(heartbeat.api_service.api_url)
+    clock.now += 1000
+    heartbeat._probe(heartbeat.api_service.api_url)
+    assert changes == [True, True]
@@ -0,0 +1,28 @@
+from services.hedge_policy import HedgePolicy
+
+def test_no_delay_until_enough_latencies_are_known():
+    policy = HedgePolicy(min_samples=3)
+    policy.record(1.0)
+    policy.record(2.0)
+    assert policy.get_delay() is None
+    policy.record(3.0)
+    assert policy.get_delay() == 3.0
+
+def test_delay_is_the_configured_percentile():
+    policy = HedgePolicy(percentile=90, min_samples=1)
+    for latency in range(1, 11):
+        policy.record(latency / 10)
+    assert policy.get_delay() == 1.0
+    policy.percentile = 50
+    assert policy.get_delay() == 0.6
+
+def test_requests_without_latency_still_count_towards_the_rates():
+    policy = HedgePolicy(min_samples=1)
+    policy.record(None, hedged=True)
+    policy.record(0.5, hedged=True, hedge_won=True)
+    policy.record(0.5)
+    assert policy.get_delay() == 0.5
+    stats = policy.stats()
+    assert (stats["requests"], stats["hedges"], stats["hedge_wins"]) == (3, 2, 1)
+    assert stats["hedge_rate"] == 2 / 3
+    assert stats["win_rate"] == 0.5
@@ -0,0 +1,146 @@
+import gc
+import queue
+import time
+import weakref
+import pytest
+from services.inference_worker import InferenceWorker
+
+class FakeModel:
+    def __init__(self, model_path):
+        self.model_path = model_path
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_jobs_run_against_the_current_model():
+    worker = InferenceWorker()
+    worker.swap_model("a.gguf", lambda: FakeModel("a.gguf")).result(timeout=2)
+    assert worker.run(lambda model: model.model_path) == "a.gguf"
+
+def test_is_current_follows_swaps_and_unloads():
+    worker = InferenceWorker(max_models=2)
+    assert not worker.is_current("a.gguf")
+    worker.swap_model("a.gguf", lambda: FakeModel("a.gguf")).result(timeout=2)
+    assert worker.is_current("a.gguf")
+    worker.swap_model("b.gguf", lambda: FakeModel("b.gguf")).result(timeout=2)
+    assert worker.is_current("b.gguf")
+    assert not worker.is_current("a.gguf")
+    worker.swap_model(None, None).result(timeout=2)
+    assert not worker.is_current("b.gguf")
+
+def test_resident_model_is_swapped_back_without_loading():
+    worker = InferenceWorker(max_models=2)
+    loads = []
+
+    def factory(path):
+        loads.append(path)
+        return FakeModel(path)
+
+    for path in ("a.gguf", "b.gguf", "a.gguf"):
+        worker.swap_model(path, lambda path=path: factory(path)).result(timeout=2)
+    assert loads == ["a.gguf", "b.gguf"]
+    assert worker.get_resident_models() == ["b.gguf", "a.gguf"]
+
+def test_least_recently_used_model_is_evicted():
+    worker = InferenceWorker(max_models=2)
+    for path in ("a.gguf", "b.gguf", "c.gguf"):
+        worker.swap_model(path, lambda path=path: FakeModel(path)).result(timeout=2)
+    assert worker.get_resident_models() == ["b.gguf", "c.gguf"]
+
+def test_memory_budget_evicts_before_loading():
+    worker = InferenceWorker(max_models=3, max_bytes=100)
+    worker.swap_model("a.gguf", lambda: FakeModel("a.gguf"), size=60).result(timeout=2)
+    worker.swap_model("b.gguf", lambda: FakeModel("b.gguf"), size=60).result(timeout=2)
+    assert worker.get_resident_models() == ["b.gguf"]
+
+def test_evicted_model_is_released_before_its_replacement_loads():
+    worker = InferenceWorker(max_models=1)
+    worker.swap_model("a.gguf", lambda: FakeModel("a.gguf")).result(timeout=2)
+    evicted = weakref.ref(worker.model)
+    alive_during_load = []
+
+    def load_b():
+        gc.collect()
+        alive_during_load.append(evicted() is not None)
+        return FakeModel("b.gguf")
+
+    worker.swap_model("b.gguf", load_b).result(timeout=2)
+    assert alive_during_load == [False]
+
+def test_on_swap_runs_only_when_the_model_changes():
+    worker = InferenceWorker(max_models=2)
+    swaps = []
+    for path in ("a.gguf", "a.gguf", "b.gguf"):
+        worker.swap_model(path, lambda path=path: FakeModel(path), on_swap=lambda: swaps.append(1)).result(timeout=2)
+    assert len(swaps) == 2
+
+def test_unload_releases_every_model():
+    worker = InferenceWorker(max_models=2)
+    worker.swap_model("a.gguf", lambda: FakeModel("a.gguf")).result(timeout=2)
+    worker.swap_model(None, None).result(timeout=2)
+    assert worker.model is None
+    assert worker.get_resident_models() == []
+
+def test_idle_model_is_unloaded_and_reloaded_for_the_next_job():
+    worker = InferenceWorker()
+    unloads, reloads = [], []
+    worker.on_idle_unload = lambda path, reclaimed: unloads.append(path)
+    worker.on_idle_reload = lambda path, seconds, error: reloads.append((path, error))
+    worker.idle_timeout = 0.05
+    worker.swap_model("a.gguf", lambda: FakeModel("a.gguf")).result(timeout=2)
+
+    assert wait_until(lambda: unloads == ["a.gguf"])
+    assert worker.model is None
+    assert worker.is_current("a.gguf")
+    assert worker.run(lambda model: model.model_path) == "a.gguf"
+    assert reloads == [("a.gguf", None)]
+
+def test_failed_idle_reload_still_runs_the_job_and_retries_later():
+    worker = InferenceWorker()
+    reloads = []
+    worker.on_idle_reload = lambda path, seconds, error: reloads.append(error)
+    model_file_exists = [True]
+
+    def load():
+        if not model_file_exists[0]:
+            raise FileNotFoundError("a.gguf")
+        return FakeModel("a.gguf")
+
+    worker.idle_timeout = 0.05
+    worker.swap_model("a.gguf", load).result(timeout=2)
+    assert wait_until(lambda: worker.model is None)
+    model_file_exists[0] = False
+
+    # A streaming job posts its end marker from finally; it must run even without a model
+    partial_texts = queue.Queue()
+    finished = object()
+
+    def streaming_job(model):
+        try:
+            if model is None:
+                raise RuntimeError("not loaded")
+            return "text"
+        finally:
+            partial_texts.put(finished)
+
+    future = worker.submit(streaming_job)
+    assert partial_texts.get(timeout=2) is finished
+    with pytest.raises(FileNotFoundError):
+        future.result(timeout=2)
+    assert isinstance(reloads[0], FileNotFoundError)
+
+    model_file_exists[0] = True
+    assert worker.run(lambda model: model.model_path) == "a.gguf"
+
+def test_jobs_run_by_priority():
+    worker = InferenceWorker()
+    order = []
+    gate = worker.submit(lambda model: time.sleep(0.1), priority=0)
+    futures = [worker.submit(lambda model, p=p: order.append(p), priority=p) for p in (3, 2, 1)]
+    gate.result(timeout=2)
+    for future in futures:
+        future.result(timeout=2)
+    assert order == [1, 2, 3]
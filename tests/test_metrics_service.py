@@ -0,0 +1,36 @@
+from services.metrics_service import MetricsRegistry, METRIC_CALL, METRIC_SENTENCE, percentile
+
+def test_percentile_uses_the_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3, None, 1, 2], 50) == 2
+    assert percentile([None], 50) is None
+
+def test_summary_gives_percentiles_of_numeric_fields():
+    metrics = MetricsRegistry()
+    for latency in range(1, 101):
+        metrics.record_call("remote", latency / 100, completion_tokens=10, generation_seconds=0.5,
+                            error=RuntimeError() if latency > 98 else None)
+    summary = metrics.summary(METRIC_CALL)
+    assert summary["count"] == summary["total"] == 100
+    assert summary["latency"] == {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+    assert summary["tokens_per_second"]["p50"] == 20
+    assert summary["errors"] == 2
+    assert "ttft" not in summary
+
+def test_only_the_latest_window_of_records_is_kept():
+    metrics = MetricsRegistry(window=10)
+    for latency in range(100):
+        metrics.record(METRIC_SENTENCE, latency=latency, valid=latency % 2 == 0)
+    summary = metrics.summary(METRIC_SENTENCE)
+    assert (summary["count"], summary["total"]) == (10, 100)
+    assert summary["latency"]["p50"] == 94
+    assert summary["valid_rate"] == 0.5
+
+def test_clear_forgets_every_record():
+    metrics = MetricsRegistry()
+    metrics.record_call("local", 1.0)
+    metrics.clear()
+    assert metrics.summary() == {"count": 0, "total": 0}
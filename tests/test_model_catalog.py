@@ -0,0 +1,192 @@
+import json
+import struct
+import threading
+import pytest
+from services.model_catalog import ModelCatalog, RemoteModelCatalog, read_gguf_metadata, describe_remote_model
+
+def gguf_string(text):
+    data = text.encode("utf-8")
+    return struct.pack("<Q", len(data)) + data
+
+def write_gguf(path, metadata, tensors):
+    """Write a GGUF v3 header with the given scalar/string metadata and tensor shapes."""
+    body = b"GGUF" + struct.pack("<IQQ", 3, len(tensors), len(metadata))
+    for key, (value_type, value) in metadata.items():
+        body += gguf_string(key) + struct.pack("<I", value_type)
+        if value_type == 8:
+            body += gguf_string(value)
+        elif value_type == 9:
+            item_type, items = value
+            body += struct.pack("<IQ", item_type, len(items)) + b"".join(struct.pack("<f", item) for item in items)
+        else:
+            body += struct.pack("<I", value)
+    for name, shape in tensors:
+        body += gguf_string(name) + struct.pack("<I", len(shape))
+        body += b"".join(struct.pack("<Q", dim) for dim in shape)
+        body += struct.pack("<IQ", 0, 0)
+    path.write_bytes(body)
+
+def test_reads_header_fields(tmp_path):
+    path = tmp_path / "tiny.gguf"
+    write_gguf(path, {
+        "general.architecture": (8, "qwen2"),
+        "general.name": (8, "Tiny"),
+        "general.file_type": (4, 15),
+        "tokenizer.ggml.scores": (9, (6, [0.5, 0.25])),
+        "qwen2.context_length": (4, 32768),
+    }, [("token_embd.weight", (4, 8)), ("output.weight", (8,))])
+
+    metadata = read_gguf_metadata(str(path))
+    assert metadata["architecture"] == "qwen2"
+    assert metadata["name"] == "Tiny"
+    assert metadata["quantization"] == "Q4_K_M"
+    assert metadata["context_length"] == 32768
+    assert metadata["parameter_count"] == 40
+    assert metadata["file_size"] == path.stat().st_size
+
+def test_rejects_files_that_are_not_gguf(tmp_path):
+    path = tmp_path / "fake.gguf"
+    path.write_bytes(b"not a model")
+    with pytest.raises(ValueError):
+        read_gguf_metadata(str(path))
+
+def test_rejects_truncated_headers(tmp_path):
+    path = tmp_path / "tiny.gguf"
+    write_gguf(path, {"general.architecture": (8, "llama")}, [])
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(ValueError):
+        read_gguf_metadata(str(path))
+
+def test_catalog_lists_valid_models_and_caches_headers(tmp_path):
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    write_gguf(models_dir / "good.gguf", {"general.architecture": (8, "llama")}, [("w", (2, 2))])
+    (models_dir / "broken.gguf").write_bytes(b"junk")
+    cache_path = tmp_path / "cache" / "gguf_catalog.json"
+
+    catalog = ModelCatalog(str(models_dir), str(cache_path))
+    assert catalog.list_models() == ["good.gguf"]
+    assert catalog.get("good.gguf")["parameter_count"] == 4
+    assert cache_path.exists()
+    assert ModelCatalog(str(models_dir), str(cache_path)).get("good.gguf")["architecture"] == "llama"
+
+TAGS_URL = "http://ollama/api/tags"
+
+TAGS = {"models": [{
+    "name": "llama3.2:3b",
+    "size": 2 * 1024 ** 3,
+    "details": {"family": "llama", "parameter_size": "3.2B", "quantization_level": "Q4_K_M"}
+}]}
+
+class FakeTagsResponse:
+    def __init__(self, status_code, body=None, etag=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {"ETag": etag} if etag else {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.body
+
+class FakeTagsServer:
+    """Serves TAGS with an ETag and answers a matching If-None-Match with 304."""
+
+    def __init__(self, etag="v1"):
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers)
+        if self.etag and (headers or {}).get("If-None-Match") == self.etag:
+            return FakeTagsResponse(304)
+        return FakeTagsResponse(200, TAGS, self.etag)
+
+def test_refresh_keeps_model_details_and_persists_them(tmp_path):
+    cache_path = tmp_path / "cache" / "ollama_models.json"
+    catalog = RemoteModelCatalog(str(cache_path))
+    assert catalog.get_models(TAGS_URL) is None
+    assert catalog.is_stale(TAGS_URL)
+
+    models = catalog.refresh(FakeTagsServer(), TAGS_URL, timeout=5)
+    assert models == [{"name": "llama3.2:3b", "size": 2 * 1024 ** 3, "family": "llama",
+                       "parameter_size": "3.2B", "quantization": "Q4_K_M"}]
+    assert describe_remote_model(models[0]) == "llama · 3.2B · Q4_K_M · 2.0 GB"
+    assert RemoteModelCatalog(str(cache_path)).get(TAGS_URL, "llama3.2:3b") == models[0]
+
+def test_unchanged_list_is_revalidated_with_its_etag(tmp_path):
+    server = FakeTagsServer()
+    catalog = RemoteModelCatalog(str(tmp_path / "ollama_models.json"))
+    first = catalog.refresh(server, TAGS_URL, timeout=5)
+    assert catalog.refresh(server, TAGS_URL, timeout=5) == first
+    assert server.requests == [None, {"If-None-Match": "v1"}]
+
+def test_concurrent_refreshes_leave_a_complete_cache_file(tmp_path):
+    cache_path = tmp_path / "ollama_models.json"
+    catalog = RemoteModelCatalog(str(cache_path))
+    urls = [f"http://server{index}:11434/api/tags" for index in range(8)]
+    threads = [threading.Thread(target=catalog.refresh, args=(FakeTagsServer(), url), kwargs={"timeout": 5})
+               for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(json.loads(cache_path.read_text(encoding="utf-8"))["servers"]) == sorted(urls)
+    assert list(tmp_path.iterdir()) == [cache_path]
+
+def test_list_goes_stale_after_the_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.model_catalog.time.time", lambda: now[0])
+    catalog = RemoteModelCatalog(str(tmp_path / "ollama_models.json"), ttl=300)
+    catalog.refresh(FakeTagsServer(), TAGS_URL, timeout=5)
+
+    now[0] += 299
+    assert not catalog.is_stale(TAGS_URL)
+    now[0] += 2
+    assert catalog.is_stale(TAGS_URL)
+    assert catalog.get_models(TAGS_URL)[0]["name"] == "llama3.2:3b"
+
+def test_refresh_async_reports_once_and_skips_duplicate_refreshes(tmp_path):
+    release = threading.Event()
+    done = []
+
+    class SlowServer(FakeTagsServer):
+        def get(self, url, headers=None, timeout=None):
+            release.wait(2)
+            return super().get(url, headers, timeout)
+
+    server = SlowServer()
+    catalog = RemoteModelCatalog(str(tmp_path / "ollama_models.json"))
+    finished = threading.Event()
+
+    def on_done(tags_url, models):
+        done.append(models)
+        finished.set()
+
+    catalog.refresh_async(server, TAGS_URL, 5, on_done)
+    catalog.refresh_async(server, TAGS_URL, 5, on_done)
+    release.set()
+    assert finished.wait(2)
+    assert len(server.requests) == 1
+    assert done[0][0]["name"] == "llama3.2:3b"
+
+def test_failed_async_refresh_reports_no_models(tmp_path):
+    done = []
+    finished = threading.Event()
+
+    class DownServer:
+        def get(self, url, headers=None, timeout=None):
+            raise ConnectionError("refused")
+
+    def on_done(tags_url, models):
+        done.append(models)
+        finished.set()
+
+    catalog = RemoteModelCatalog(str(tmp_path / "ollama_models.json"))
+    catalog.refresh_async(DownServer(), TAGS_URL, 5, on_done)
+    assert finished.wait(2)
+    assert done == [None]
+    assert catalog.get_models(TAGS_URL) is None
@@ -0,0 +1,32 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services import profiling_service
+from services.profiling_service import ProfileSession
+
+def busy_in_worker_thread():
+    return sum(range(1000))
+
+def busy_in_pool():
+    return sum(range(1000))
+
+def run_profiled(tmp_path, monkeypatch, all_threads):
+    monkeypatch.setattr(profiling_service, "get_profiles_path", lambda: str(tmp_path))
+    session = ProfileSession("batch", all_threads=all_threads).start()
+    thread = threading.Thread(target=busy_in_worker_thread)
+    thread.start()
+    thread.join()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        executor.submit(busy_in_pool).result()
+    with open(session.stop(), encoding="utf-8") as f:
+        return f.read()
+
+def test_threads_started_during_the_session_are_profiled(tmp_path, monkeypatch):
+    summary = run_profiled(tmp_path, monkeypatch, all_threads=True)
+    assert "busy_in_worker_thread" in summary
+    assert "busy_in_pool" in summary
+    assert threading.getprofile() is None
+
+def test_only_the_starting_thread_is_profiled_by_default(tmp_path, monkeypatch):
+    summary = run_profiled(tmp_path, monkeypatch, all_threads=False)
+    assert "busy_in_worker_thread" not in summary
+    assert "Threads profiled: 1" in summary
@@ -0,0 +1,66 @@
+import json
+import threading
+import contextvars
+import pytest
+from services.trace_service import Tracer
+
+@pytest.fixture
+def tracer(tmp_path):
+    tracer = Tracer()
+    tracer.enabled = True
+    tracer.path = str(tmp_path / "trace.jsonl")
+    yield tracer
+    tracer.close()
+
+def read_spans(tracer):
+    tracer.close()
+    with open(tracer.path, encoding="utf-8") as f:
+        return {record["name"]: record for record in map(json.loads, f)}
+
+def test_nested_spans_record_their_parent(tracer):
+    with tracer.span("batch", words=2):
+        with tracer.span("word", word="run"):
+            with tracer.span("backend_request") as request:
+                request.set(completion_tokens=12)
+    with tracer.span("export"):
+        pass
+
+    spans = read_spans(tracer)
+    assert spans["batch"]["parent_id"] is None
+    assert spans["word"]["parent_id"] == spans["batch"]["span_id"]
+    assert spans["backend_request"]["parent_id"] == spans["word"]["span_id"]
+    assert {spans[name]["trace_id"] for name in ("batch", "word", "backend_request")} == {spans["batch"]["span_id"]}
+    assert spans["export"]["trace_id"] == spans["export"]["span_id"] != spans["batch"]["trace_id"]
+    assert spans["backend_request"]["attributes"] == {"completion_tokens": 12}
+    assert spans["batch"]["duration_ms"] >= spans["word"]["duration_ms"]
+
+def test_spans_in_a_copied_context_keep_their_parent_on_other_threads(tracer):
+    def generate():
+        with tracer.span("word"):
+            pass
+
+    with tracer.span("batch") as batch:
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(generate,))
+        worker.start()
+        worker.join()
+        explicit = tracer.start_span("insert", parent=batch)
+    explicit.end()
+
+    spans = read_spans(tracer)
+    assert spans["word"]["parent_id"] == spans["batch"]["span_id"]
+    assert spans["word"]["thread"] != spans["batch"]["thread"]
+    assert spans["insert"]["parent_id"] == spans["batch"]["span_id"]
+
+def test_failing_block_marks_its_span(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("mask"):
+            raise ValueError()
+    assert read_spans(tracer)["mask"]["attributes"] == {"error": "ValueError"}
+
+def test_disabled_tracer_writes_nothing(tmp_path):
+    tracer = Tracer()
+    tracer.path = str(tmp_path / "trace.jsonl")
+    with tracer.span("batch") as span:
+        assert span is None
+    assert tracer.start_span("batch") is None
+    assert not (tmp_path / "trace.jsonl").exists()
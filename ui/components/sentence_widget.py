@@ -2,13 +2,11 @@ import tkinter as tk
 from tkinter import ttk
 from models.translations import get_translation, TRANSLATIONS
 from tkinter import filedialog, simpledialog, messagebox
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 import platform
-from nltk import word_tokenize
 from models.config import DEFAULT_CONFIG
-import requests
+from models.worksheet import create_masked_sentence, build_worksheet
+from services.profiling_service import profiled
+from services.trace_service import tracer
 from tkinter import scrolledtext
 import yaml
 from datetime import datetime
@@ -262,8 +260,10 @@ class SentenceWidgetManager(ttk.LabelFrame):
         )
         menu_btn.pack(side=tk.LEFT)
         
-        # Store reference to menu button
+        # Store references for in-place updates
         frame.menu_btn = menu_btn
+        frame.text_widget = text_widget
+        frame.buttons_frame = buttons_frame
         
         # Add the new frame to the list of sentence widgets
         self.sentence_widgets.append(frame)
@@ -273,32 +273,48 @@ class SentenceWidgetManager(ttk.LabelFrame):
         
         return frame
     
+    def add_pending_sentence(self, word):
+        """Add a placeholder row that shows streamed text until the sentence is complete."""
+        frame = self.add_sentence(word, "")
+        frame.pending = True
+        for button in frame.buttons_frame.winfo_children():
+            button.configure(state="disabled")
+        return frame
+    
+    def update_pending_sentence(self, frame, partial_text):
+        """Show the text generated so far in a placeholder row."""
+        if not frame.winfo_exists() or not getattr(frame, 'pending', False):
+            return
+        text_widget = frame.text_widget
+        text_widget.configure(state="normal")
+        text_widget.delete("1.0", tk.END)
+        text_widget.insert("1.0", partial_text)
+        text_widget.configure(state="disabled")
+        self._adjust_text_height(text_widget)
+    
+    def complete_pending_sentence(self, frame, sentence):
+        """Replace the streamed text with the final, masked sentence."""
+        if not frame.winfo_exists():
+            return
+        frame.pending = False
+        frame.original_sentence = sentence
+        text_widget = frame.text_widget
+        text_widget.configure(state="normal")
+        text_widget.delete("1.0", tk.END)
+        text_widget.insert("1.0", self._create_masked_sentence(frame.original_word, sentence))
+        text_widget.configure(state="disabled")
+        self._adjust_text_height(text_widget)
+        for button in frame.buttons_frame.winfo_children():
+            button.configure(state="normal")
+    
+    def remove_pending_sentence(self, frame):
+        """Remove a placeholder row whose generation failed."""
+        if frame in self.sentence_widgets:
+            self._delete_sentence(frame)
+    
     def _create_masked_sentence(self, word, sentence):
         """Create a masked sentence by identifying and masking the target word."""
-        # Get the base form of the input word
-        target_word = word.lower()
-        
-        # Tokenize the sentence
-        words = word_tokenize(sentence)
-        masked_words = {}
-        
-        # Process each word in the sentence
-        for original_word in words:
-            # Skip non-alphabetic words
-            if not original_word.isalpha():
-                continue
-            
-            # Check if the word matches the target word or its variations
-            if self.word_processor.is_word_match(original_word, target_word):
-                masked_word = original_word[0] + '_' * (len(original_word) - 1)
-                masked_words[original_word] = masked_word
-        
-        # Create the masked sentence
-        masked_sentence = sentence
-        for original, masked in sorted(masked_words.items(), key=lambda x: len(x[0]), reverse=True):
-            masked_sentence = masked_sentence.replace(original, masked)
-        
-        return masked_sentence
+        return create_masked_sentence(self.word_processor, word, sentence)
     
     def _toggle_word(self, text_widget, button):
         # Find the parent frame
@@ -328,6 +344,7 @@ class SentenceWidgetManager(ttk.LabelFrame):
                 
             text_widget.configure(state="disabled")
     
+    @profiled("export_docx", lambda self: self.api_service.settings_service)
     def export_docx(self):
         """Export sentences to a Word document."""
         if not self.sentence_widgets:
@@ -423,7 +440,12 @@ class SentenceWidgetManager(ttk.LabelFrame):
                         
                         # Generate analysis
                         formatted_prompt = prompt.format(word=word, sentence=sentence)
-                        analysis = self.api_service.generate_sentence(word, formatted_prompt)
+                        try:
+                            analysis = self.api_service.request_analysis(formatted_prompt)
+                        except Exception as e:
+                            # Report the failure once and export without the remaining analyses
+                            self.api_service.show_generation_error(e)
+                            break
                         
                         # Store analysis
                         if analysis:
@@ -448,86 +470,29 @@ class SentenceWidgetManager(ttk.LabelFrame):
         if not file_path:
             return
         
-        # Create document
-        doc = Document()
-        
-        # Add title
-        title_paragraph = doc.add_paragraph()
-        title_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        title_run = title_paragraph.add_run(title)
-        title_run.bold = True
-        title_run.font.size = Pt(16)
-        
-        # Add exercises with blanks first
-        for i, frame in enumerate(self.sentence_widgets, 1):
-            if frame.winfo_exists():
-                # Get the text widget to display the current content
-                text_widget = None
-                for child in frame.winfo_children():
-                    if isinstance(child, tk.Text):
-                        text_widget = child
-                        break
-                
-                if text_widget:
-                    # Add exercise with blanks (use what's currently displayed)
-                    para = doc.add_paragraph()
-                    para.add_run(f"{i}. ").bold = True
-                    
-                    # Get what's currently in the text widget
-                    current_text = text_widget.get("1.0", "end-1c")
-                    para.add_run(current_text)
-        
-        # Add page break before answer key
-        doc.add_page_break()
-        
-        # Add answer key title
-        answer_title = doc.add_paragraph()
-        answer_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        answer_title_run = answer_title.add_run("Answer Key")
-        answer_title_run.bold = True
-        answer_title_run.font.size = Pt(14)
-        
-        # Extract and list all blanked words with analysis if available
-        for i, frame in enumerate(self.sentence_widgets, 1):
-            if frame.winfo_exists():
-                # Get the text widget
-                text_widget = None
-                for child in frame.winfo_children():
-                    if isinstance(child, tk.Text):
-                        text_widget = child
-                        break
-                
-                if text_widget:
-                    # Get the masked text from the text widget
-                    masked = text_widget.get("1.0", "end-1c")
-                    # Get the original sentence from the frame
-                    original = frame.original_sentence
-                    
-                    # Find all blanks and their answers using improved algorithm
-                    words = self._extract_blanked_words_improved(original, masked)
-                    
-                    if words:
-                        para = doc.add_paragraph()
-                        para.add_run(f"{i}. ").bold = True
-                        
-                        # Add word and analysis if available
-                        if include_analysis and hasattr(frame, 'analysis') and frame.analysis:
-                            para.add_run(f"{words[0]}; [{frame.analysis}]")
-                        else:
-                            para.add_run(", ".join(words))
-                    else:
-                        # Fallback to using the original word if no blanks found
-                        if hasattr(frame, 'original_word'):
-                            para = doc.add_paragraph()
-                            para.add_run(f"{i}. ").bold = True
-                            if include_analysis and hasattr(frame, 'analysis') and frame.analysis:
-                                para.add_run(f"{frame.original_word}; [{frame.analysis}]")
-                            else:
-                                para.add_run(frame.original_word)
+        # Collect what each row currently shows, blanked or not
+        entries = []
+        for frame in self.sentence_widgets:
+            if not frame.winfo_exists():
+                continue
+            text_widget = None
+            for child in frame.winfo_children():
+                if isinstance(child, tk.Text):
+                    text_widget = child
+                    break
+            if text_widget:
+                entries.append((
+                    text_widget.get("1.0", "end-1c"),
+                    frame.original_sentence,
+                    getattr(frame, 'original_word', None),
+                    getattr(frame, 'analysis', None)
+                ))
+        doc = build_worksheet(title, entries, include_analysis)
         
         # Save the document
         try:
-            doc.save(file_path)
+            with tracer.span("file_write", format="docx"):
+                doc.save(file_path)
             messagebox.showinfo(
                 get_translation(self.language, "export_success_title"),
                 get_translation(self.language, "export_success_msg")
@@ -538,67 +503,6 @@ class SentenceWidgetManager(ttk.LabelFrame):
                 str(e)
             )
 
-    def _extract_blanked_words_improved(self, original, masked):
-        """
-        Extract words that have been blanked out in the masked sentence.
-        More accurate than the previous method.
-        """
-        blank_answers = []
-        
-        # If there's no underscore in the masked sentence, there are no blanks
-        if '_' not in masked:
-            return []
-        
-        # First, identify indices where blanks appear
-        orig_words = original.split()
-        mask_words = masked.split()
-        
-        # Make sure the sentences have the same word count
-        if len(orig_words) != len(mask_words):
-            # Different word count indicates mismatch, fall back to advanced parsing
-            return self._extract_blanks_by_pattern(original, masked)
-        
-        # Compare words at the same positions
-        for i, (orig_word, mask_word) in enumerate(zip(orig_words, mask_words)):
-            clean_orig = orig_word.strip('.,!?;:"\'()')
-            clean_mask = mask_word.strip('.,!?;:"\'()')
-            
-            # Check if this is a blanked word (has underscores)
-            if '_' in clean_mask:
-                # Extract the original word without punctuation
-                if clean_orig not in blank_answers:
-                    blank_answers.append(clean_orig)
-        
-        # If we didn't find any blanks with the direct approach, try advanced pattern matching
-        if not blank_answers:
-            return self._extract_blanks_by_pattern(original, masked)
-        
-        return blank_answers
-
-    def _extract_blanks_by_pattern(self, original, masked):
-        """Extract blanks using pattern matching for more complex cases."""
-        blank_answers = []
-        
-        # Find all masks (patterns of first letter followed by underscores)
-        mask_patterns = []
-        for word in masked.split():
-            clean_word = word.strip('.,!?;:"\'()')
-            if len(clean_word) > 1 and '_' in clean_word:
-                # Get the pattern of the masked word
-                mask_patterns.append((clean_word, len(clean_word), clean_word[0].lower()))
-        
-        # For each mask pattern, find the corresponding word in the original
-        for mask, length, first_letter in mask_patterns:
-            for word in original.split():
-                clean_word = word.strip('.,!?;:"\'()')
-                if (len(clean_word) == length and
-                    clean_word[0].lower() == first_letter and
-                    clean_word.lower() not in [w.lower() for w in blank_answers]):
-                    blank_answers.append(clean_word)
-                    break
-        
-        return blank_answers
-
     def show_all_words(self):
         """Show or hide all words in all sentences."""
         try:
@@ -656,6 +560,10 @@ class SentenceWidgetManager(ttk.LabelFrame):
 
     def clear_sentences(self):
         """Delete all sentences."""
+        # Pooled alternates are only useful for sentences on screen
+        if getattr(self.main_window, 'candidate_pool', None):
+            self.main_window.candidate_pool.discard()
+        
         # First destroy all sentence widgets
         for widget in self.sentence_widgets:
             widget.destroy()
@@ -799,63 +707,40 @@ class SentenceWidgetManager(ttk.LabelFrame):
             context_attachment_prompt = self.main_window.settings_service.get_settings("context_attachment_prompt")
             prompt = context_attachment_prompt.format(context=self.main_window.context) + "\n" + prompt
 
+        # Swap in a pre-generated candidate if one is ready and top the pool up in the background
+        candidate_pool = getattr(self.main_window, 'candidate_pool', None)
+        if candidate_pool:
+            sentence = candidate_pool.take(word, prompt, exclude=frame.original_sentence)
+            candidate_pool.fill(word, prompt)
+            if sentence:
+                self._apply_regenerated_sentence(frame, word, sentence)
+                if regen_btn:
+                    regen_btn.config(text=original_text, state="normal")
+                return True
+
+        # Stream partial text into the row while the sentence is generated
+        show_partial = lambda partial_text: self._show_partial_text(frame.text_widget, partial_text)
+        
         # Generate a new sentence with retry logic
         max_attempts = 3
         for attempt in range(max_attempts):
-            # Get the new sentence
-            sentence = self.api_service.generate_sentence(word, prompt)
+            # Get the new sentence; "↻" always asks the backend for a fresh one
+            sentence = self.api_service.generate_sentence(word, prompt, on_partial=show_partial, use_cache=False)
             
             if sentence:
-                # Store the new original sentence in the frame
-                frame.original_sentence = sentence
+                self._apply_regenerated_sentence(frame, word, sentence)
                 
-                # Create masked sentence
-                masked_sentence = self._create_masked_sentence(word, sentence)
-                
-                # Find the text widget in this frame
-                text_widget = None
-                for child in frame.winfo_children():
-                    if isinstance(child, tk.Text):
-                        text_widget = child
-                        break
-                
-                # Get the show button
-                show_btn = None
-                for child in frame.winfo_children():
-                    if isinstance(child, ttk.Frame):  # This is the buttons frame
-                        for button in child.winfo_children():
-                            if "show_button" in str(button):
-                                show_btn = button
-                                break
+                # Reset the button
+                if regen_btn:
+                    regen_btn.config(text=original_text, state="normal")
                 
-                if text_widget:
-                    # Update the text widget
-                    text_widget.config(state="normal")
-                    text_widget.delete("1.0", "end")
-                    text_widget.insert("1.0", masked_sentence)
-                    text_widget.config(state="disabled")
-                    
-                    # Reset the button
-                    if regen_btn:
-                        regen_btn.config(text=original_text, state="normal")
-                    
-                    # Reset the show button text
-                    if show_btn:
-                        show_btn.config(text=get_translation(self.language, "show"))
-                    
-                    # Clear any existing analysis since it's no longer valid
-                    if hasattr(frame, 'analysis'):
-                        delattr(frame, 'analysis')
-                    
-                    # Adjust height
-                    text_widget.after(10, lambda tw=text_widget: self._adjust_text_height(tw))
-                    
-                    return True
+                return True
             
             # If we've reached the maximum attempts, reset the button
             if attempt == max_attempts - 1:
                 if regen_btn:
                     regen_btn.config(text=original_text, state="normal")
+                self._restore_sentence_text(frame)
                 messagebox.showerror(
                     get_translation(self.language, "error_title"),
                     get_translation(self.language, "sentence_generation_failed")
@@ -867,6 +752,61 @@ class SentenceWidgetManager(ttk.LabelFrame):
             regen_btn.config(text=original_text, state="normal")
         return False
     
+    def _apply_regenerated_sentence(self, frame, word, sentence):
+        """Show a newly generated sentence in its row, masked."""
+        # Store the new original sentence in the frame
+        frame.original_sentence = sentence
+        
+        # Create masked sentence
+        masked_sentence = self._create_masked_sentence(word, sentence)
+        
+        # Get the show button
+        show_btn = None
+        for child in frame.winfo_children():
+            if isinstance(child, ttk.Frame):  # This is the buttons frame
+                for button in child.winfo_children():
+                    if "show_button" in str(button):
+                        show_btn = button
+                        break
+        
+        # Update the text widget
+        text_widget = frame.text_widget
+        text_widget.config(state="normal")
+        text_widget.delete("1.0", "end")
+        text_widget.insert("1.0", masked_sentence)
+        text_widget.config(state="disabled")
+        
+        # Reset the show button text
+        if show_btn:
+            show_btn.config(text=get_translation(self.language, "show"))
+        frame.word_visible = False
+        
+        # Clear any existing analysis since it's no longer valid
+        if hasattr(frame, 'analysis'):
+            delattr(frame, 'analysis')
+        
+        # Adjust height
+        text_widget.after(10, lambda tw=text_widget: self._adjust_text_height(tw))
+    
+    def _show_partial_text(self, text_widget, partial_text):
+        """Show streamed text in a sentence row and repaint it immediately."""
+        text_widget.configure(state="normal")
+        text_widget.delete("1.0", tk.END)
+        text_widget.insert("1.0", partial_text)
+        text_widget.configure(state="disabled")
+        text_widget.update_idletasks()
+    
+    def _restore_sentence_text(self, frame):
+        """Put the current sentence back after a streamed generation failed."""
+        if getattr(frame, 'word_visible', False):
+            sentence = frame.original_sentence
+        else:
+            sentence = self._create_masked_sentence(frame.original_word, frame.original_sentence)
+        frame.text_widget.configure(state="normal")
+        frame.text_widget.delete("1.0", tk.END)
+        frame.text_widget.insert("1.0", sentence)
+        frame.text_widget.configure(state="disabled")
+    
     def _adjust_text_height(self, text_widget):
         """Adjust the height of a text widget based on its content."""
         text_widget.configure(state="normal")
@@ -981,6 +921,7 @@ class SentenceWidgetManager(ttk.LabelFrame):
         
         self.bind("<Button-1>", close_menu)
     
+    @profiled("save_history", lambda self: self.api_service.settings_service)
     def save_history(self):
         """Save the history of sentences to a YAML file."""
         if not self.sentence_widgets:
@@ -1049,8 +990,9 @@ class SentenceWidgetManager(ttk.LabelFrame):
         
         try:
             # Save to YAML
-            with open(file_path, 'w', encoding='utf-8') as f:
-                yaml.safe_dump(history_data, f, allow_unicode=True, default_flow_style=False)
+            with tracer.span("file_write", format="yaml"):
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    yaml.safe_dump(history_data, f, allow_unicode=True, default_flow_style=False)
             
             messagebox.showinfo(
                 get_translation(self.language, "export_success_title"),
@@ -1062,6 +1004,7 @@ class SentenceWidgetManager(ttk.LabelFrame):
                 str(e)
             )
     
+    @profiled("load_history", lambda self: self.api_service.settings_service)
     def load_history(self):
         """Load sentence history from a YAML file."""
         # Ask user for file to load
@@ -1390,8 +1333,9 @@ class SentenceWidgetManager(ttk.LabelFrame):
             )
             return
         
-        # Generate new sentence with the specified tense
-        new_sentence = self.api_service.generate_sentence(word, prompt)
+        # Generate new sentence with the specified tense, streaming it into the row
+        show_partial = lambda partial_text: self._show_partial_text(frame.text_widget, partial_text)
+        new_sentence = self.api_service.generate_sentence(word, prompt, on_partial=show_partial)
         
         if new_sentence:
             # Update original sentence in frame
@@ -1420,6 +1364,8 @@ class SentenceWidgetManager(ttk.LabelFrame):
                 
                 # Adjust height
                 self._adjust_text_height(text_widget)
+        else:
+            self._restore_sentence_text(frame)
 
 class AnalysisWindow(tk.Toplevel):
     def __init__(self, parent, word, sentence, api_service, language, text_widget):
@@ -1530,7 +1476,7 @@ class AnalysisWindow(tk.Toplevel):
             self.analysis_text.insert("1.0", self.analysis_result)
             self.analysis_text.configure(state="disabled")
 
-    def _generate_analysis(self):
+    def _generate_analysis(self, use_cache=True):
         """Generate analysis for the given word and sentence."""
         # Check if we already have an analysis stored in the frame
         if self.sentence_frame is not None and hasattr(self.sentence_frame, 'analysis') and self.sentence_frame.analysis:
@@ -1558,7 +1504,7 @@ class AnalysisWindow(tk.Toplevel):
         prompt = analysis_prompt.format(word=self.word, sentence=self.sentence)
         
         # Use the generation method but with analysis prompt
-        self.analysis_result = self._get_analysis(prompt)
+        self.analysis_result = self._get_analysis(prompt, use_cache=use_cache)
         
         # Store the analysis in the sentence frame
         if self.sentence_frame is not None and self.analysis_result:
@@ -1573,8 +1519,8 @@ class AnalysisWindow(tk.Toplevel):
         if self.sentence_frame is not None and hasattr(self.sentence_frame, 'analysis'):
             delattr(self.sentence_frame, 'analysis')
         
-        # Generate new analysis
-        self._generate_analysis()
+        # Generate new analysis, bypassing the response cache
+        self._generate_analysis(use_cache=False)
 
     def _on_close(self):
         """Handle window close event."""
@@ -1588,31 +1534,17 @@ class AnalysisWindow(tk.Toplevel):
         
         self.destroy()
 
-    def _get_analysis(self, prompt):
+    def _get_analysis(self, prompt, use_cache=True):
         """Get analysis from either local model or API."""
+        def show_partial(partial_text):
+            self.analysis_text.configure(state="normal")
+            self.analysis_text.delete("1.0", tk.END)
+            self.analysis_text.insert("1.0", partial_text)
+            self.analysis_text.configure(state="disabled")
+            self.analysis_text.update_idletasks()
+        
         try:
-            if self.api_service.using_local_model and self.api_service.local_model is not None:
-                # Use local model for analysis
-                output = self.api_service.local_model(
-                    prompt,
-                    max_tokens=256,
-                    stop=["</s>", "\n\n"],
-                    echo=False
-                )
-                return output['choices'][0]['text'].strip()
-            else:
-                # Use remote API
-                response = requests.post(
-                    self.api_service.api_url,
-                    json={
-                        "model": self.api_service.model,
-                        "prompt": prompt,
-                        "stream": False
-                    }
-                )
-                response.raise_for_status()
-                result = response.json()
-                return result["response"].strip()
+            return self.api_service.request_analysis(prompt, on_partial=show_partial, use_cache=use_cache)
         except Exception as e:
             return f"{get_translation(self.language, 'analysis_error')}: {str(e)}"
 
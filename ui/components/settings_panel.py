@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk
 from models.translations import get_translation
 from models.config import VERSION, DEFAULT_CONFIG
+from services.metrics_service import METRIC_SENTENCE
 
 class SettingsPanel(ttk.LabelFrame):
     def __init__(self, parent, language, available_languages, api_service, language_change_callback, main_window):
@@ -69,6 +70,14 @@ class SettingsPanel(ttk.LabelFrame):
         self.prompt_status_label = ttk.Label(self.status_labels_frame, text=get_translation(language, "using_default_prompt"), foreground="gray")
         self.prompt_status_label.pack(side=tk.LEFT, padx=5)
         
+        # Architecture, size and quantization of the selected model
+        self.model_info_label = ttk.Label(self.status_labels_frame, text="", foreground="gray")
+        self.model_info_label.pack(side=tk.LEFT, padx=5)
+        
+        # Adaptive concurrency limit, shown only for remote servers
+        self.concurrency_separator = ttk.Separator(self.status_labels_frame, orient='vertical')
+        self.concurrency_label = ttk.Label(self.status_labels_frame, text="", foreground="gray")
+        
         # Buttons
         self.buttons_row = ttk.Frame(self.status_frame)
         self.buttons_row.pack(fill=tk.X)
@@ -96,6 +105,9 @@ class SettingsPanel(ttk.LabelFrame):
         # Initialize prompt state
         self.using_custom_prompt = False
         self.update_prompt_status()
+        
+        self.update_concurrency_status()
+        self.update_model_info()
     
     def _on_language_change(self, event=None):
         new_language = self.language_var.get()
@@ -118,22 +130,37 @@ class SettingsPanel(ttk.LabelFrame):
         )
         self.update()
         
-        # Fetch models first, before checking server status
-        self.api_service.fetch_models()
-        self.update_model_list(self.api_service.available_models)
-        
-        # For GGUF Models, we need to select a model first before checking server
-        if internal_url == "models" and self.api_service.available_models:
-            # Only set the model if it's not already set or not in the available models
-            if (not self.model_var.get() or 
-                self.model_var.get() not in self.api_service.available_models):
-                self.model_var.set(self.api_service.available_models[0])
-        
-        # Now check server status (after model selection for GGUF Models)
-        server_status = self.api_service.check_server_status(show_message=False, parent_window=self.main_window.root)
+        if internal_url == "models":
+            # Fetch models first, before checking server status
+            self.api_service.fetch_models()
+            self.update_model_list(self.api_service.available_models)
+            
+            # For GGUF Models, we need to select a model first before checking server
+            if self.api_service.available_models:
+                # Only set the model if it's not already set or not in the available models
+                if (not self.model_var.get() or 
+                    self.model_var.get() not in self.api_service.available_models):
+                    self.model_var.set(self.api_service.available_models[0])
+            
+            # Now check server status (after model selection for GGUF Models)
+            server_status = self.api_service.check_server_status(show_message=False, parent_window=self.main_window.root)
+        else:
+            # Remote servers are probed by the heartbeat; use its last result if still fresh
+            self.api_service.select_remote_backend()
+            heartbeat = self.main_window.heartbeat
+            server_status = heartbeat.get_cached_status(internal_url)
+            self.api_service.server_connected = bool(server_status)
+            # A cached model list fills the dropdown even before the server answers
+            if server_status or self.api_service.remote_model_catalog.get_models(self.api_service.get_tags_url()) is not None:
+                self.api_service.fetch_models()
+                self.update_model_list(self.api_service.available_models)
+            heartbeat.check_now()
         
         # Update status display
-        if server_status:
+        if server_status is None:
+            # Keep showing "checking" until the heartbeat reports back
+            pass
+        elif server_status:
             self.status_label.config(
                 text=get_translation(self.language, "server_status_connected"),
                 foreground="green"
@@ -154,6 +181,7 @@ class SettingsPanel(ttk.LabelFrame):
             return  # Don't process empty model selections
             
         self.api_service.model = self.model_var.get()
+        self.update_model_info()
         
         # If using local models (GGUF), check server status to load the model
         if self.api_service.api_url == "models":
@@ -235,6 +263,31 @@ class SettingsPanel(ttk.LabelFrame):
                 foreground="gray"
             )
     
+    def update_concurrency_status(self):
+        """Show the adaptive concurrency limit and recent generation latency; refreshed every second."""
+        parts = []
+        limit = self.api_service.get_concurrency_limit()
+        if limit is not None:
+            parts.append(get_translation(self.language, "concurrency_status").format(limit=limit))
+            if self.api_service.is_hedging_enabled():
+                # Make the cost of hedging visible next to the limit
+                hedge_stats = self.api_service.hedge_policy.stats()
+                parts.append(get_translation(self.language, "hedge_status").format(
+                    hedge_rate=hedge_stats["hedge_rate"], win_rate=hedge_stats["win_rate"]))
+        latency = self.api_service.metrics.summary(METRIC_SENTENCE).get("latency")
+        if latency:
+            parts.append(get_translation(self.language, "metrics_status").format(**latency))
+        
+        if not parts:
+            self.concurrency_separator.pack_forget()
+            self.concurrency_label.pack_forget()
+        else:
+            self.concurrency_label.config(text="  ".join(parts))
+            if not self.concurrency_label.winfo_manager():
+                self.concurrency_separator.pack(side=tk.LEFT, padx=5, fill='y')
+                self.concurrency_label.pack(side=tk.LEFT, padx=5)
+        self.after(1000, self.update_concurrency_status)
+    
     def check_server_status(self):
         if self.api_service.check_server_status(parent_window=self.main_window.root):
             self.status_label.config(
@@ -251,6 +304,11 @@ class SettingsPanel(ttk.LabelFrame):
         self.model_select["values"] = models
         if self.model_var.get() not in models and models:
             self.model_var.set(models[0])
+        self.update_model_info()
+    
+    def update_model_info(self):
+        """Show what the catalog knows about the selected model."""
+        self.model_info_label.config(text=self.api_service.describe_model(self.model_var.get()))
     
     def open_help(self):
         import webbrowser
@@ -1,10 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-from models.config import VERSION, DEFAULT_CONFIG, get_assets_path
+from models.config import VERSION, DEFAULT_CONFIG
 from models.translations import load_translations, get_translation
 from models.word_processor import WordProcessor
 from services.api_service import APIService, ModelLoadingWindow
 from services.document_service import DocumentService
+from services.generation_service import GenerationService
+from services.generation_job import GenerationJob, GenerationCancelled
+from services.heartbeat_service import ServerHeartbeat
+from services.profiling_service import start_profile
+from services.trace_service import tracer
+from services.prefetch_service import CandidatePool
 from services.update_service import UpdateService
 from services.settings_service import SettingsService
 from ui.components.sentence_widget import SentenceWidgetManager
@@ -13,7 +19,11 @@ from services.icon_service import create_icon
 import os
 import sys
 import ctypes
+import logging
 import threading
+import queue
+
+logger = logging.getLogger(__name__)
 
 class MainWindow:
     def __init__(self, root):
@@ -48,6 +58,7 @@ class MainWindow:
 
         # Initialize settings service
         self.settings_service = SettingsService()
+        tracer.configure(self.settings_service)
         
         # Initialize services with settings from service
         self.language = self.settings_service.get_setting("language", self.settings_service.get_settings("language"))
@@ -60,6 +71,16 @@ class MainWindow:
         model = self.settings_service.get_setting("model", self.settings_service.get_settings("model"))
         self.api_service.model = model
         
+        # Local models load on the inference worker; show their progress in the status label
+        self._loading_model = None
+        self._idle_state = None
+        self.api_service.on_model_load_progress = lambda state, model_name, error: self.ui_queue.put(
+            ("model_load", (state, model_name, error)))
+        self.api_service.on_models_updated = lambda tags_url, models: self.ui_queue.put(
+            ("models_updated", (tags_url, models)))
+        
+        self.generation_service = GenerationService(self.api_service, self.settings_service)
+        self.candidate_pool = CandidatePool(self.api_service, self.settings_service)
         self.document_service = DocumentService(self.language)
         self.update_service = UpdateService(self.language)
         # Set root window for the update service
@@ -67,6 +88,20 @@ class MainWindow:
         
         self.context = None
 
+        # Events posted by background threads, applied on the Tk thread
+        self.ui_queue = queue.Queue()
+        self._batch_running = False
+        self._batch_frames = None
+        self._batch_error = None
+        self._batch_job = None
+        self._batch_profile = None
+        self._batch_span = None
+        self._warming_model = None
+
+        # The remote server is probed in the background; its state changes arrive as events
+        self.heartbeat = ServerHeartbeat(self.api_service, self.settings_service,
+                                         lambda url, connected: self.ui_queue.put(("server_status", (url, connected))))
+
         # Load translations
         self.available_languages = load_translations()
         
@@ -78,14 +113,8 @@ class MainWindow:
         
         # Create a loading window first if using local models
         if api_url == "models":
-            # Check models directory to see if we have models to load
-            models_dir = os.path.join(get_assets_path(), "models")
-            available_models = []
-            
-            if os.path.exists(models_dir):
-                for file in os.listdir(models_dir):
-                    if file.endswith(".gguf"):
-                        available_models.append(file)
+            # Check the model catalog to see if we have models to load
+            available_models = self.api_service.model_catalog.list_models()
             
             # Only show loading window if we have models to load
             if available_models:
@@ -106,8 +135,9 @@ class MainWindow:
                 self.root.after(100, self.initial_setup)
                 self.root.after(200, lambda: self.check_for_updates(show_message=False))
         else:
-            # For remote API, check server status without loading window
-            self.api_service.check_server_status(show_message=False, parent_window=None)
+            # For remote API, the heartbeat probes the server and runs initial_setup once it answers
+            self.api_service.select_remote_backend()
+            self.heartbeat.check_now()
             self.root.after(100, self.initial_setup)
             self.root.after(200, lambda: self.check_for_updates(show_message=False))
         
@@ -117,6 +147,9 @@ class MainWindow:
         # Setup close handler to save settings
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
+        self.heartbeat.start()
+        self.root.after(50, self._process_ui_queue)
+        
     def _setup_keyboard_shortcuts(self):
         """Setup keyboard shortcuts for various actions"""
         # Get platform-specific modifier key
@@ -207,6 +240,9 @@ class MainWindow:
         self.progress_label.pack(side=tk.LEFT, padx=(0, 5))
         self.progress_bar = ttk.Progressbar(self.progress_frame, mode='determinate')
         self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.cancel_btn = ttk.Button(self.progress_frame, text=get_translation(self.language, "cancel"),
+                                   command=self.cancel_generation)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(5, 0))
         self.progress_frame.grid_remove()
         
         # Sentences Frame
@@ -247,17 +283,12 @@ class MainWindow:
             # Make sure append button is disabled when server is not connected
             self.append_btn.configure(state="disabled")
         
-        # Always update the status display, regardless of connection state
+        # Load the model before the user's first request needs it
         if server_connected:
-            self.settings_panel.status_label.config(
-                text=get_translation(self.language, "server_status_connected"),
-                foreground="green"
-            )
-        else:
-            self.settings_panel.status_label.config(
-                text=get_translation(self.language, "server_status_not_connected"),
-                foreground="red"
-            )
+            self.warm_up_model()
+        
+        # Always update the status display, regardless of connection state
+        self.update_server_status_display()
     
     def on_language_change(self, new_language):
         self.language = new_language
@@ -270,8 +301,7 @@ class MainWindow:
         # Save language setting
         self.settings_service.set_setting("language", new_language)
         
-        # Check server status after language change
-        self.api_service.check_server_status(show_message=False, parent_window=self.root)
+        # The status text is rebuilt from the cached server state
         self.update_server_status_display()
         
         # Rebind keyboard shortcuts after language change
@@ -284,11 +314,16 @@ class MainWindow:
         self.append_btn.configure(text=get_translation(self.language, "append"))
         self.context_btn.configure(text=get_translation(self.language, "context_button"))
         self.progress_label.configure(text=get_translation(self.language, "generating"))
+        self.cancel_btn.configure(text=get_translation(self.language, "cancel"))
         
         self.settings_panel.update_texts(self.language)
         self.sentence_manager.update_texts(self.language)
     
     def generate_sentences(self, append=False):
+        # Only one batch may run at a time (shortcuts bypass the disabled buttons)
+        if self._batch_running:
+            return
+        
         # Get prompt from settings, fallback to default if None
         prompt = self.settings_service.get_settings("generation_prompt")
 
@@ -315,48 +350,209 @@ class MainWindow:
         self.progress_bar['maximum'] = len(words)
         self.progress_label.configure(text=get_translation(self.language, "generating"))
         self.progress_frame.grid()
+        self.cancel_btn.configure(state="normal")
         self.generate_btn.configure(state="disabled")
         
         if hasattr(self, 'append_btn'):
             self.append_btn.configure(state="disabled")
         
-        self.root.update()
-        
-        sentences_generated = 0
-        
-        for i, word in enumerate(words):
-            # Add context to prompt if available
-            current_prompt = prompt
-            if hasattr(self, 'context') and self.context:
-                context_attachment_prompt = self.settings_service.get_settings("context_attachment_prompt")
+        # Build the prompt once; it is shared by every word in the batch
+        current_prompt = prompt
+        if hasattr(self, 'context') and self.context:
+            context_attachment_prompt = self.settings_service.get_settings("context_attachment_prompt")
 
-                if r'{context}' not in context_attachment_prompt:
-                    messagebox.showerror(
-                        get_translation(self.language, "error_title"),
-                        get_translation(self.language, "invalid_prompt_format")
-                    )
-                    return
+            if r'{context}' not in context_attachment_prompt:
+                messagebox.showerror(
+                    get_translation(self.language, "error_title"),
+                    get_translation(self.language, "invalid_prompt_format")
+                )
+                self._finish_generation(0)
+                return
 
-                current_prompt = context_attachment_prompt.format(context=self.context) + "\n" + prompt
+            current_prompt = context_attachment_prompt.format(context=self.context) + "\n" + prompt
+        
+        if not self.api_service.server_connected:
+            messagebox.showerror(
+                get_translation(self.language, "server_error_title"),
+                get_translation(self.language, "server_connection_guide")
+            )
+            self._finish_generation(0)
+            return
+        
+        # With profiling on, record the Tk thread and the batch and worker threads started
+        # from here until the batch is over. Started before any batch state changes, so a
+        # failing profiler cannot strand it.
+        self._batch_profile = start_profile("generate_sentences", self.settings_service, all_threads=True)
+        
+        # Results arrive from worker threads in completion order; keep them until
+        # every earlier word is done so sentences are added in input order
+        self._batch_words = words
+        self._batch_results = {}
+        self._batch_next_index = 0
+        self._batch_completed = 0
+        self._batch_sentences_generated = 0
+        self._batch_error = None
+        self._batch_running = True
+        self._batch_prompt = current_prompt
+        # Cancelled by the Cancel button or once the whole batch runs past its deadline
+        job = GenerationJob(timeout=self.generation_service.get_batch_timeout())
+        self._batch_job = job
+        
+        # Background prefetching must not compete with the foreground batch
+        self.candidate_pool.pause()
+        
+        # With tracing on, every stage of this batch is recorded under one root span
+        self._batch_span = tracer.start_span("generate_sentences", words=len(words))
+        batch_span = self._batch_span
+        
+        # When streaming, every word gets its row up front and text is shown as it arrives
+        self._batch_frames = None
+        partial_callback = None
+        if self.api_service.is_streaming_enabled():
+            self._batch_frames = [self.sentence_manager.add_pending_sentence(word) for word in words]
+            partial_callback = lambda index, text: self.ui_queue.put(("batch_partial", (index, text)))
+        
+        def progress_callback(index, word, sentence, error):
+            self.ui_queue.put(("batch_progress", (index, word, sentence, error)))
+        
+        def batch_thread():
+            try:
+                with tracer.span("generate_batch", parent=batch_span):
+                    self.generation_service.generate_batch(words, current_prompt, on_progress=progress_callback,
+                                                           on_partial=partial_callback, job=job)
+            except Exception as e:
+                self.ui_queue.put(("batch_error", e))
+            self.ui_queue.put(("batch_done", None))
+        
+        thread = threading.Thread(target=batch_thread)
+        thread.daemon = True
+        thread.start()
+    
+    def cancel_generation(self):
+        """Stop the running batch; sentences that already finished are kept."""
+        if self._batch_job is not None:
+            self.cancel_btn.configure(state="disabled")
+            self._batch_job.cancel()
+    
+    def _process_ui_queue(self):
+        """Apply events posted by background threads on the Tk thread."""
+        # Only the latest streamed text per row matters, so partial updates are coalesced
+        partial_texts = {}
+        try:
+            while True:
+                try:
+                    event, payload = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    self._dispatch_ui_event(event, payload, partial_texts)
+                except Exception:
+                    # One failing handler must not drop the events queued behind it
+                    logger.exception("Error handling UI event %r", event)
             
-            sentence = self.api_service.generate_sentence(word, current_prompt)
+            if self._batch_frames:
+                for index, text in partial_texts.items():
+                    self.sentence_manager.update_pending_sentence(self._batch_frames[index], text)
+        except Exception:
+            logger.exception("Error applying streamed sentences")
+        finally:
+            # Keep the pump alive, or progress and buttons would never update again
+            self.root.after(50, self._process_ui_queue)
+    
+    def _dispatch_ui_event(self, event, payload, partial_texts):
+        if event == "batch_partial":
+            index, text = payload
+            partial_texts[index] = text
+        elif event == "batch_progress":
+            partial_texts.pop(payload[0], None)
+            self._on_batch_progress(*payload)
+        elif event == "batch_error":
+            if self._batch_error is None:
+                self._batch_error = payload
+        elif event == "batch_done":
+            self._finish_generation(self._batch_sentences_generated)
+        elif event == "warmup_done":
+            self._on_warmup_done(*payload)
+        elif event == "model_load":
+            self._on_model_load_progress(*payload)
+        elif event == "server_status":
+            self._on_server_status(*payload)
+        elif event == "models_updated":
+            self._on_models_updated(*payload)
+    
+    def _on_batch_progress(self, index, word, sentence, error):
+        """Update the progress bar and add every sentence whose predecessors are done."""
+        self._batch_results[index] = (word, sentence, error)
+        self._batch_completed += 1
+        # Cancelled words are not errors; the deadline is reported once when the batch ends
+        if isinstance(error, GenerationCancelled):
+            error = None
+        if error is not None and self._batch_error is None:
+            self._batch_error = error
+        
+        if self._batch_frames:
+            # Rows already exist in input order; fill in or drop this one
+            self._batch_results.pop(index)
+            frame = self._batch_frames[index]
             if sentence:
-                self.sentence_manager.add_sentence(word, sentence)
-                sentences_generated += 1
+                with tracer.span("widget_insertion", parent=self._batch_span, word=word):
+                    self.sentence_manager.complete_pending_sentence(frame, sentence)
+                self._batch_sentences_generated += 1
             else:
-                self.progress_frame.grid_remove()
-                return
-            
-            self.progress_bar['value'] = i + 1
-            self.progress_label.configure(text=f"{get_translation(self.language, 'generating')} ({i + 1}/{len(words)})")
-            self.root.update()
+                self.sentence_manager.remove_pending_sentence(frame)
         
+        while self._batch_next_index in self._batch_results:
+            word, sentence, error = self._batch_results.pop(self._batch_next_index)
+            if sentence:
+                with tracer.span("widget_insertion", parent=self._batch_span, word=word):
+                    self.sentence_manager.add_sentence(word, sentence)
+                self._batch_sentences_generated += 1
+            self._batch_next_index += 1
+        
+        total = len(self._batch_words)
+        self.progress_bar['value'] = self._batch_completed
+        self.progress_label.configure(text=f"{get_translation(self.language, 'generating')} ({self._batch_completed}/{total})")
+    
+    def _finish_generation(self, sentences_generated):
+        """Restore the input controls once a batch is over."""
+        was_running = self._batch_running
+        self._batch_running = False
+        self._batch_frames = None
         self.progress_frame.grid_remove()
+        
+        job = self._batch_job
+        self._batch_job = None
+        if job is not None:
+            job.finish()
+        
+        if self._batch_profile is not None:
+            self._batch_profile.stop()
+            self._batch_profile = None
+        if self._batch_span is not None:
+            self._batch_span.end(sentences=sentences_generated)
+            self._batch_span = None
+        
+        # Now that the backend is free, pre-generate alternates for the regenerate button
+        self.candidate_pool.resume()
+        if was_running and sentences_generated > 0:
+            self.candidate_pool.fill_batch(self._batch_words, self._batch_prompt)
+        
+        if self._batch_error is not None:
+            error = self._batch_error
+            self._batch_error = None
+            self.api_service.show_generation_error(error)
+        elif job is not None and job.expired:
+            messagebox.showwarning(
+                get_translation(self.language, "error_title"),
+                get_translation(self.language, "generation_timeout_msg").format(
+                    seconds=int(self.generation_service.get_batch_timeout()))
+            )
+        
         if self.api_service.server_connected:
             self.generate_btn.configure(state="normal")
             
             # Show append button after successful generation
-            if sentences_generated > 0:
+            if sentences_generated > 0 or self.sentence_manager.sentence_widgets:
                 if hasattr(self, 'append_btn'):
                     self.append_btn.pack(side=tk.LEFT, padx=(5, 0))
                     self.append_btn.configure(state="normal")
@@ -368,7 +564,7 @@ class MainWindow:
     def on_sentences_changed(self, has_sentences):
         """Called when sentences are added or removed."""
         if hasattr(self, 'append_btn'):
-            if has_sentences and self.api_service.server_connected:
+            if has_sentences and self.api_service.server_connected and not self._batch_running:
                 self.append_btn.configure(state="normal")
                 # Make sure it's visible when it should be
                 if not self.append_btn.winfo_ismapped():
@@ -389,6 +585,8 @@ class MainWindow:
         if new_url in default_urls or new_url == current_api_url:
             self.settings_service.set_setting("api_url", new_url)
         
+        self.warm_up_model()
+        
         # No need to check server status here - already done in settings panel
         # self.root.after(100, lambda: self.api_service.check_server_status(show_message=False, parent_window=self.root))
         self.root.after(100, lambda: self.update_server_status_display())
@@ -401,17 +599,102 @@ class MainWindow:
         # Save immediately to settings
         self.settings_service.set_setting("model", new_model)
         
+        self.warm_up_model()
+        
         # No need to check server status here - already done in settings panel
         # self.root.after(100, lambda: self.api_service.check_server_status(show_message=False, parent_window=self.root))
         self.root.after(100, lambda: self.update_server_status_display())
 
+    def warm_up_model(self):
+        """Preload the selected Ollama model in the background; the status shows warming until it is resident."""
+        if not self.settings_service.get_settings("warm_up_model"):
+            return
+        if self.api_service.using_local_model or not self.api_service.server_connected:
+            return
+        model = self.api_service.model
+        if not model or model == self._warming_model:
+            return
+        
+        self._warming_model = model
+        self.update_server_status_display()
+        
+        def warm_up_thread():
+            try:
+                load_time = self.api_service.warm_up_model(model)
+            except Exception:
+                load_time = None
+            self.ui_queue.put(("warmup_done", (model, load_time)))
+        
+        thread = threading.Thread(target=warm_up_thread)
+        thread.daemon = True
+        thread.start()
+    
+    def _on_warmup_done(self, model, load_time):
+        # A later model switch may have started another warm-up meanwhile
+        if model == self._warming_model:
+            self._warming_model = None
+            self.update_server_status_display()
+    
+    def _on_server_status(self, url, connected):
+        # Ignore results for a URL the user already switched away from
+        if url != self.api_service.api_url or self.api_service.using_local_model:
+            return
+        # A batch that ended, or was refused, while the server was down left Generate disabled
+        if connected and not self._batch_running:
+            self.generate_btn.configure(state="normal")
+        # Fetches the model list and warms up the model when the server came up
+        self.initial_setup()
+    
+    def _on_models_updated(self, tags_url, models):
+        # A refresh for a server the user already left is kept in the cache only
+        if self.api_service.using_local_model or tags_url != self.api_service.get_tags_url():
+            return
+        self.api_service.available_models = models
+        self.settings_panel.update_model_list(models)
+    
+    def _on_model_load_progress(self, state, model_name, error):
+        if state == "loading":
+            self._loading_model = model_name
+        elif model_name == self._loading_model:
+            self._loading_model = None
+        # Idle unloads and reloads are reported in the status until the next load
+        self._idle_state = state if state in ("unloaded", "reloaded") else None
+        self.update_server_status_display()
+    
     def update_server_status_display(self):
         """Update the server status display to reflect current state."""
-        if self.api_service.server_connected:
+        if self.api_service.server_connected and self._loading_model is not None:
+            self.settings_panel.status_label.config(
+                text=get_translation(self.language, "server_status_loading"),
+                foreground="orange"
+            )
+        elif self.api_service.server_connected and self._warming_model is not None:
+            self.settings_panel.status_label.config(
+                text=get_translation(self.language, "server_status_warming"),
+                foreground="orange"
+            )
+        elif self.api_service.server_connected and self._idle_state == "unloaded":
+            self.settings_panel.status_label.config(
+                text=get_translation(self.language, "server_status_idle").format(
+                    size=self.api_service.idle_stats["reclaimed_bytes"] // (1024 * 1024)),
+                foreground="green"
+            )
+        elif self.api_service.server_connected and self._idle_state == "reloaded":
+            self.settings_panel.status_label.config(
+                text=get_translation(self.language, "server_status_reloaded").format(
+                    seconds=self.api_service.idle_stats["last_reload_seconds"]),
+                foreground="green"
+            )
+        elif self.api_service.server_connected:
             self.settings_panel.status_label.config(
                 text=get_translation(self.language, "server_status_connected"),
                 foreground="green"
             )
+        elif self.api_service.api_url != "models" and self.heartbeat.get_cached_status() is None:
+            self.settings_panel.status_label.config(
+                text=get_translation(self.language, "server_status_checking"),
+                foreground="gray"
+            )
         else:
             self.settings_panel.status_label.config(
                 text=get_translation(self.language, "server_status_not_connected"),
@@ -439,6 +722,13 @@ class MainWindow:
         
         # Final save
         self.settings_service.save_settings()
+        # Stop background generation before the API service closes the session and caches under it
+        if self._batch_job is not None:
+            self._batch_job.cancel()
+        self.candidate_pool.stop()
+        self.heartbeat.stop()
+        self.api_service.close()
+        tracer.close()
         self.root.destroy()
 
     def _toggle_context_window(self, event=None):